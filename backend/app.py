@@ -6,6 +6,35 @@ from flask import Flask, jsonify, request
 # Vercel Path Fix: Ensure current directory is in sys.path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+def start_background_jobs(app):
+    """
+    Start the prefetcher, revaluator, daily rollover, drawdown flusher and
+    bar compaction threads (each only if enabled in config). Call once per serving process:
+    the dev server below does, and `BACKGROUND_JOBS=1` makes create_app() do
+    it for gunicorn workers. Off by default, so `flask db ...`, seed.py,
+    tests and bench scripts importing the app don't start writer threads
+    against the database.
+    """
+    if app.config.get('PREFETCH_ENABLED'):
+        from services.prefetcher import prefetcher
+        prefetcher.start()
+
+    if app.config.get('REVALUE_ENABLED'):
+        from services.revaluation import revaluator
+        revaluator.start()
+
+    if app.config.get('ROLLOVER_ENABLED'):
+        from services.rollover import daily_rollover
+        daily_rollover.start()
+
+    if app.config.get('DRAWDOWN_BACKGROUND_FLUSH'):
+        from services.drawdown import drawdown_tracker
+        drawdown_tracker.start()
+
+    if app.config.get('BAR_COMPACT_ENABLED'):
+        from services.bar_store import bar_store
+        bar_store.start()
+
 def create_app():
     try:
         # Move imports here to catch "Module Not Found" errors safely
@@ -27,6 +56,61 @@ def create_app():
         
         from flask_migrate import Migrate
         migrate = Migrate(app, db)
+
+        if app.config.get('MARKET_TAPE_MODE', 'off') != 'off':
+            from services.market_tape import market_tape
+            market_tape.configure(
+                mode=app.config.get('MARKET_TAPE_MODE'),
+                path=app.config.get('MARKET_TAPE_PATH'),
+                speed=app.config.get('MARKET_TAPE_SPEED')
+            )
+
+        from services.quote_cache import quote_cache
+        quote_cache.configure(
+            ttls=app.config.get('QUOTE_CACHE_TTLS'),
+            max_entries=app.config.get('QUOTE_CACHE_MAX_ENTRIES')
+        )
+
+        from services.bar_store import bar_store
+        bar_store.configure(
+            root=app.config.get('BAR_STORE_DIR'),
+            compact_interval=app.config.get('BAR_COMPACT_INTERVAL')
+        )
+
+        from services.news import news_service
+        news_service.configure(
+            drop_dir=app.config.get('NEWS_DROP_DIR'),
+            scan_interval=app.config.get('NEWS_SCAN_INTERVAL')
+        )
+
+        if app.config.get('SHARED_QUOTES_ENABLED'):
+            from services.shared_quotes import shared_quotes
+            try:
+                shared_quotes.configure(
+                    path=app.config.get('SHARED_QUOTES_PATH'),
+                    slots=app.config.get('SHARED_QUOTES_SLOTS')
+                )
+            except OSError as e:
+                app.logger.warning(f"Shared quote table unavailable, using per-worker caches: {e}")
+
+        from services.prefetcher import prefetcher
+        prefetcher.configure(
+            pinned=app.config.get('PREFETCH_SYMBOLS'),
+            interval=app.config.get('PREFETCH_INTERVAL')
+        )
+
+        from services.revaluation import revaluator
+        revaluator.configure(app, interval=app.config.get('REVALUE_INTERVAL'))
+
+        from services.rollover import daily_rollover
+        daily_rollover.configure(app, interval=app.config.get('ROLLOVER_INTERVAL'))
+
+        from services.drawdown import drawdown_tracker
+        drawdown_tracker.configure(app, interval=app.config.get('DRAWDOWN_FLUSH_INTERVAL'))
+
+        # Background threads only in serving processes (see start_background_jobs)
+        if app.config.get('BACKGROUND_JOBS'):
+            start_background_jobs(app)
         
         # 3. Blueprints (Lazy Import to catch specific module errors)
         from routes.market import market_bp
@@ -128,4 +212,7 @@ def create_app():
 app = create_app()
 
 if __name__ == '__main__':
+    # The debug reloader runs this module twice; only the child serves requests
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true' and not app.config.get('BACKGROUND_JOBS'):
+        start_background_jobs(app)
     app.run(debug=True, port=5000)
\ No newline at end of file
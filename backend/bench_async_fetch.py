@@ -0,0 +1,134 @@
+"""
+Benchmark of 200 concurrent quote fetches against a local stub of Yahoo's
+chart API, comparing the blocking client with the async one:
+
+    sequential   MarketService._fetch_quote in a loop
+    threads      the same call on a thread pool (one thread per in-flight fetch)
+    async        AsyncMarket.yahoo_quote, all fetches on the one event loop
+
+The stub answers every /v8/finance/chart/<symbol> after --delay seconds, so the
+numbers show how much upstream waiting each approach overlaps. The router's
+per-provider gates are bypassed; they cap real Yahoo traffic, not the client.
+
+Usage: python bench_async_fetch.py [--symbols 200] [--delay 0.1] [--threads 16]
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+STUB_HOST = '127.0.0.1'
+
+
+def chart(symbol):
+    return json.dumps({"chart": {"result": [{
+        "meta": {
+            "symbol": symbol, "currency": "USD", "gmtoffset": 0,
+            "regularMarketPrice": 101.5, "chartPreviousClose": 100.0,
+            "currentTradingPeriod": {"regular": {"start": 0}},
+        },
+        "timestamp": [1700000000, 1700086400],
+        "indicators": {"quote": [{
+            "open": [100.0, 101.0], "high": [102.0, 102.5], "low": [99.5, 100.5],
+            "close": [100.0, 101.5], "volume": [1000, 1200],
+        }]},
+    }]}}).encode()
+
+
+def start_stub(delay):
+    """Keep-alive HTTP/1.1 stub on its own loop thread. Returns the port."""
+    ready = threading.Event()
+    port = []
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                path = request_line.split()[1].decode()
+                symbol = path.split('?')[0].rsplit('/', 1)[-1]
+                await asyncio.sleep(delay)
+                body = chart(symbol)
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                             b"Content-Length: %d\r\n\r\n%s" % (len(body), body))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve():
+        server = await asyncio.start_server(handle, STUB_HOST, 0, backlog=1024)
+        port.append(server.sockets[0].getsockname()[1])
+        ready.set()
+        await server.serve_forever()
+
+    threading.Thread(target=lambda: asyncio.run(serve()), name='stub-yahoo', daemon=True).start()
+    ready.wait()
+    return port[0]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--symbols', type=int, default=200)
+    parser.add_argument('--delay', type=float, default=0.1, help="stub response delay in seconds")
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--skip-sequential', action='store_true')
+    args = parser.parse_args()
+
+    import logging
+    from services.async_market import async_bridge, async_market, httpx
+    from services.http_client import HttpClient
+    from services.market import MarketService, market_service
+
+    logging.disable(logging.WARNING)
+    port = start_stub(args.delay)
+    host = f"{STUB_HOST}:{port}"
+    MarketService.BASE_URL = f"http://{host}/v8/finance/chart"
+    # Let both clients open as many connections as there are fetches
+    HttpClient.HOST_LIMITS[host] = args.symbols
+    symbols = [f"SYM{i:03d}" for i in range(args.symbols)]
+
+    async def fetch_all():
+        return await asyncio.gather(*(async_market.yahoo_quote(s, force=True) for s in symbols))
+
+    async_bridge.run(async_market.yahoo_quote('WARMUP', force=True))  # start loop + client
+
+    runs = []
+    if not args.skip_sequential:
+        runs.append(('sequential', lambda: [market_service._fetch_quote(s) for s in symbols]))
+    runs.append((f'threads ({args.threads})', lambda: list(ThreadPoolExecutor(args.threads).map(market_service._fetch_quote, symbols))))
+    runs.append((f'threads ({args.symbols})', lambda: list(ThreadPoolExecutor(args.symbols).map(market_service._fetch_quote, symbols))))
+    runs.append(('async', lambda: async_bridge.run(fetch_all(), timeout=60)))
+
+    print(f"{args.symbols} quote fetches, stub delay {args.delay * 1000:.0f} ms, "
+          f"async engine: {'httpx' if httpx is not None else 'thread-pool'}")
+    print(f"  {'client':<16} {'wall s':>8} {'fetch/s':>9} {'threads':>8}")
+    for name, run in runs:
+        baseline = threading.active_count()
+        peak = [baseline]
+        done = threading.Event()
+
+        def watch():
+            while not done.is_set():
+                peak[0] = max(peak[0], threading.active_count())
+                time.sleep(0.005)
+
+        watcher = threading.Thread(target=watch, daemon=True)
+        watcher.start()
+        started = time.perf_counter()
+        results = run()
+        elapsed = time.perf_counter() - started
+        done.set()
+        watcher.join()
+        assert len(results) == args.symbols and all(q['price'] == 101.5 for q in results)
+        print(f"  {name:<16} {elapsed:>8.2f} {args.symbols / elapsed:>9.0f} {peak[0] - baseline - 1:>8}")
+
+
+if __name__ == '__main__':
+    main()
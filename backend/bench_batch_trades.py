@@ -0,0 +1,94 @@
+"""
+Benchmark of basket orders: N single POST /api/trades/ versus one
+POST /api/trades/batch carrying the same N orders.
+
+Runs against a throwaway SQLite database with every quote already in the
+quote cache, so it measures the per-request work the batch endpoint shares
+(auth lookup, challenge load, commit, rules pass) rather than upstream
+latency. Reports orders/s for each basket size and the batch speed-up.
+
+Usage: python bench_batch_trades.py [--baskets 1,5,10,25,50] [--rounds 20]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+SYMBOLS = ['AAPL', 'TSLA', 'MSFT', 'NVDA', 'AMZN', 'GOOGL', 'META', 'BTC-USD', 'ETH-USD', 'EURUSD=X']
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--baskets', default='1,5,10,25,50')
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+    baskets = [int(n) for n in args.baskets.split(',')]
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    os.environ.update({
+        'DATABASE_URL': f'sqlite:///{db_path}',
+        'BAR_STORE_DIR': os.path.join(os.path.dirname(db_path), 'bars'),
+        'PREFETCH_ENABLED': '0',
+        'REVALUE_ENABLED': '0',
+        'ROLLOVER_ENABLED': '0',
+        'DRAWDOWN_BACKGROUND_FLUSH': '0',
+        'SHARED_QUOTES_ENABLED': '0',
+    })
+
+    import jwt
+    import logging
+    from app import create_app
+    from models import db, User, Plan, Challenge, Trade
+    from services.quote_cache import quote_cache
+
+    logging.disable(logging.WARNING)
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        user = User(name='Bench', email='bench@example.com', password_hash='x')
+        plan = Plan(slug='bench', price_dh=0)
+        db.session.add_all([user, plan])
+        db.session.flush()
+        challenge = Challenge(user_id=user.id, plan_id=plan.id, start_balance=1e9, equity=1e9, balance=1e9,
+                              daily_start_equity=1e9)
+        db.session.add(challenge)
+        db.session.commit()
+        token = jwt.encode({'user_id': user.id}, app.config['SECRET_KEY'], algorithm='HS256')
+        challenge_id = challenge.id
+
+    for i, symbol in enumerate(SYMBOLS):
+        quote_cache.set(symbol, {"symbol": symbol, "price": 100.0 + i, "change": 0.0, "change_pct": 0.0,
+                                 "currency": "USD", "source": "bench"}, 3600)
+
+    auth = {'Authorization': f'Bearer {token}'}
+    client = app.test_client()
+
+    def basket(n, round_no):
+        return [{"symbol": SYMBOLS[(round_no + k) % len(SYMBOLS)], "side": 'buy' if k % 3 else 'sell', "qty": 1}
+                for k in range(n)]
+
+    print(f"{args.rounds} rounds per basket size, quotes served from cache")
+    print(f"  {'orders':>6} {'single orders/s':>16} {'batch orders/s':>15} {'speed-up':>9}")
+    for n in baskets:
+        started = time.perf_counter()
+        for r in range(args.rounds):
+            for order in basket(n, r):
+                response = client.post('/api/trades/', headers=auth, json=dict(order, challenge_id=challenge_id))
+                assert response.status_code == 200, response.get_json()
+        single = n * args.rounds / (time.perf_counter() - started)
+
+        started = time.perf_counter()
+        for r in range(args.rounds):
+            response = client.post('/api/trades/batch', headers=auth,
+                                   json={"challenge_id": challenge_id, "orders": basket(n, r)})
+            body = response.get_json()
+            assert response.status_code == 200 and all(o['status'] == 'filled' for o in body['results']), body
+        batch = n * args.rounds / (time.perf_counter() - started)
+        print(f"  {n:>6} {single:>16.0f} {batch:>15.0f} {batch / single:>8.1f}x")
+
+    with app.app_context():
+        print(f"trades written: {Trade.query.count()}")
+
+
+if __name__ == '__main__':
+    main()
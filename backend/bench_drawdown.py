@@ -0,0 +1,118 @@
+"""
+Benchmark of the intraday drawdown tracker (services/drawdown.py).
+
+1. update   DrawdownTracker.update() on a random walk of equity values
+            spread over N challenges: cost per O(1) update, single calls
+            and through update_many (the revaluation pass)
+2. flush    one flush of N dirty challenges into a throwaway SQLite
+            database (one executemany UPDATE keyed by (challenge_id, date)),
+            versus writing the same column with one UPDATE + commit per
+            trade, timed on --per-trade of them
+
+Usage: python bench_drawdown.py [--challenges 100000] [--updates 1000000] [--per-trade 2000]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+
+def update_bench(n, updates):
+    from services.drawdown import DrawdownTracker
+
+    rng = np.random.default_rng(7)
+    ids = rng.integers(1, n + 1, updates).tolist()
+    equity = (10_000.0 + np.cumsum(rng.normal(0, 5, updates))).tolist()
+    tracker = DrawdownTracker()
+    now = datetime.utcnow()
+
+    started = time.perf_counter()
+    for challenge_id, value in zip(ids, equity):
+        tracker.update(challenge_id, value, 10_000.0, now)
+    single = (time.perf_counter() - started) / updates
+
+    day_starts = [10_000.0] * n
+    batch_ids = list(range(1, n + 1))
+    started = time.perf_counter()
+    rounds = max(1, updates // n)
+    for r in range(rounds):
+        tracker.update_many(batch_ids, equity[r * n:(r + 1) * n] or equity[:n], day_starts, now)
+    batched = (time.perf_counter() - started) / (rounds * n)
+    print(f"update: {single * 1e9:.0f} ns per update() call, {batched * 1e9:.0f} ns per value in update_many() "
+          f"({n:,} challenges, {tracker.stats()['dirty']:,} dirty)")
+    return tracker
+
+
+def flush_bench(n, per_trade):
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    os.environ.update({
+        'DATABASE_URL': f'sqlite:///{db_path}',
+        'BAR_STORE_DIR': os.path.join(os.path.dirname(db_path), 'bars'),
+        'PREFETCH_ENABLED': '0',
+        'SHARED_QUOTES_ENABLED': '0',
+        'REVALUE_ENABLED': '0',
+        'ROLLOVER_ENABLED': '0',
+        'DRAWDOWN_BACKGROUND_FLUSH': '0',
+    })
+
+    import logging
+    from app import create_app
+    from models import db, User, Plan, Challenge, DailyMetrics
+    from services.drawdown import DrawdownTracker
+
+    logging.disable(logging.WARNING)
+    app = create_app()
+    today = datetime.utcnow().date()
+
+    with app.app_context():
+        db.create_all()
+        user = User(name='Bench', email='bench@example.com', password_hash='x')
+        plan = Plan(slug='bench', price_dh=0)
+        db.session.add_all([user, plan])
+        db.session.flush()
+        db.session.execute(Challenge.__table__.insert(), [
+            {"id": i + 1, "user_id": user.id, "plan_id": plan.id, "start_balance": 10_000.0, "balance": 10_000.0,
+             "equity": 10_000.0, "daily_start_equity": 10_000.0, "status": 'active', "positions_version": 0}
+            for i in range(n)
+        ])
+        db.session.execute(DailyMetrics.__table__.insert(), [
+            {"challenge_id": i + 1, "date": today, "day_start_equity": 10_000.0, "day_pnl": 0.0,
+             "max_intraday_drawdown_pct": 0.0}
+            for i in range(n)
+        ])
+        db.session.commit()
+
+        tracker = DrawdownTracker()
+        rng = np.random.default_rng(3)
+        for challenge_id, value in zip(range(1, n + 1), rng.uniform(9_000, 10_000, n).tolist()):
+            tracker.update(challenge_id, value, 10_000.0)
+        started = time.perf_counter()
+        rows = tracker.flush()
+        flushed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for challenge_id in range(1, per_trade + 1):
+            DailyMetrics.query.filter_by(challenge_id=challenge_id, date=today).update(
+                {DailyMetrics.max_intraday_drawdown_pct: 1.0})
+            db.session.commit()
+        each = (time.perf_counter() - started) / per_trade
+        print(f"flush: {rows:,} rows in {flushed * 1000:.0f} ms ({flushed / rows * 1e6:.1f} us/row) "
+              f"vs {each * 1e6:.0f} us per UPDATE + commit per trade")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--challenges', type=int, default=100_000)
+    parser.add_argument('--updates', type=int, default=1_000_000)
+    parser.add_argument('--per-trade', type=int, default=2000)
+    args = parser.parse_args()
+
+    update_bench(args.challenges, args.updates)
+    flush_bench(args.challenges, args.per_trade)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark the simulated fallback series: the original per-call Python loop
+versus the seeded, chunk-cached NumPy generator.
+
+Usage: python bench_fallback_series.py [points]
+"""
+import random
+import sys
+import time
+
+from services.fallback_series import FallbackSeries
+
+
+def legacy_mock_series(points, step=3600, price=100.0):
+    """The loop MarketService._get_mock_series used to run on every call."""
+    data = []
+    end_time = int(time.time())
+    current_price = price * 0.95
+    for i in range(points):
+        change = random.uniform(-0.02, 0.025)
+        open_p = current_price
+        close_p = open_p * (1 + change)
+        high_p = max(open_p, close_p) * (1 + random.uniform(0, 0.01))
+        low_p = min(open_p, close_p) * (1 - random.uniform(0, 0.01))
+        data.append({
+            "time": end_time - (points - i) * step,
+            "open": round(open_p, 2),
+            "high": round(high_p, 2),
+            "low": round(low_p, 2),
+            "close": round(close_p, 2),
+            "volume": random.randint(1000, 50000)
+        })
+        current_price = close_p
+    return data
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+if __name__ == '__main__':
+    points = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeat = 20
+    end = 1_700_000_000
+
+    legacy = timed(lambda: legacy_mock_series(points), repeat)
+    cold = timed(lambda: FallbackSeries().bars('AAPL', '1h', 100.0, points=points, end=end), repeat)
+
+    warm_gen = FallbackSeries()
+    warm_gen.bars('AAPL', '1h', 100.0, points=points, end=end)
+    warm = timed(lambda: warm_gen.bars('AAPL', '1h', 100.0, points=points, end=end), repeat)
+    advance = timed(lambda: warm_gen.bars('AAPL', '1h', 100.0, points=points, end=end + 3600), repeat)
+    records = timed(lambda: warm_gen.bars('AAPL', '1h', 100.0, points=points, end=end).to_records(), repeat)
+
+    same = FallbackSeries().bars('AAPL', '1h', 100.0, points=points, end=end).close
+    reproducible = bool((same == warm_gen.bars('AAPL', '1h', 100.0, points=points, end=end).close).all())
+
+    print(f"{points:,} points, mean of {repeat} runs")
+    print(f"  legacy python loop (list of dicts)   {legacy:8.2f} ms")
+    print(f"  numpy generator, cold chunk cache    {cold:8.2f} ms")
+    print(f"  numpy generator, warm chunk cache    {warm:8.2f} ms")
+    print(f"  warm, window advanced by one bar     {advance:8.2f} ms")
+    print(f"  warm + to_records() (API shape)      {records:8.2f} ms")
+    print(f"  reproducible across instances: {reproducible}")
@@ -0,0 +1,68 @@
+"""
+Benchmark of the indicator engine (services/indicators.py) on simulated bars:
+full computation, incremental update after one new bar, and a cached repeat.
+Also checks that the incremental result matches a full recompute.
+
+Usage: python bench_indicators.py [--bars 2000 20000] [--repeat 50]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from services.fallback_series import FallbackSeries
+from services.indicators import DEFAULT_SET, IndicatorEngine
+
+
+def timed(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def flatten(result):
+    out = {}
+    for spec, values in result.items():
+        if isinstance(values, dict):
+            out.update({f"{spec}.{name}": v for name, v in values.items()})
+        else:
+            out[spec] = values
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--bars', type=int, nargs='+', default=[2000, 20000])
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    specs = list(DEFAULT_SET)
+    print(f"set={','.join(specs)}")
+    print(f"  {'bars':>7} {'full ms':>9} {'+1 bar ms':>10} {'cached ms':>10} {'max diff':>10}")
+    for n in args.bars:
+        bars = FallbackSeries().bars('AAPL', '1m', 100.0, points=n + 1, end=1_700_000_000 + n * 60)
+        before, after = bars.slice(0, n), bars
+
+        full = timed(lambda: IndicatorEngine().compute(('AAPL', '1m', '1d'), after, specs), args.repeat)
+
+        def incremental():
+            engine = IndicatorEngine()
+            engine.compute(('AAPL', '1m', '1d'), before, specs)
+            started = time.perf_counter()
+            engine.compute(('AAPL', '1m', '1d'), after, specs)
+            return engine, time.perf_counter() - started
+
+        samples = [incremental() for _ in range(args.repeat)]
+        incr = sum(s for _, s in samples) / len(samples) * 1000
+        engine = samples[-1][0]
+        cached = timed(lambda: engine.compute(('AAPL', '1m', '1d'), after, specs), args.repeat)
+
+        got = flatten(engine.compute(('AAPL', '1m', '1d'), after, specs))
+        want = flatten(IndicatorEngine().compute(('AAPL', '1m', '1d'), after, specs))
+        diff = max(float(np.nanmax(np.abs(got[k] - want[k]))) for k in want)
+        print(f"  {n:>7} {full:>9.2f} {incr:>10.2f} {cached:>10.3f} {diff:>10.1e}")
+
+
+if __name__ == '__main__':
+    main()
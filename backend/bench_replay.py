@@ -0,0 +1,177 @@
+"""
+Offline throughput/latency benchmark of /api/trades and /api/market/* against
+a recorded market tape (MARKET_TAPE_MODE=replay, no network needed).
+
+Record a tape on a machine with network access:
+
+    MARKET_TAPE_MODE=record python app.py      # then click around / run the frontend
+
+or build a synthetic one from the BVC fixture and generated Yahoo charts:
+
+    python bench_replay.py --synthesize
+
+Usage: python bench_replay.py [--tape PATH] [--speed 0] [--requests 2000] [--concurrency 16]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_TAPE = os.path.join(HERE, 'instance', 'market.tape')
+YAHOO_CHART = "https://query1.finance.yahoo.com/v8/finance/chart"
+YAHOO_SYMBOLS = ['AAPL', 'TSLA', 'BTC-USD', 'ETH-USD', 'EURUSD=X', 'IAM.MA', 'ATW.MA']
+BVC_SYMBOLS = ['IAM', 'ATW', 'BCP']
+SERIES = [('1m', '1d'), ('1h', '1mo')]
+
+
+def synthesize(path, minutes=10):
+    """Write a tape covering `minutes` of upstream activity, one snapshot per 30 s."""
+    from services.fallback_series import FallbackSeries
+    from services.market_tape import MarketTape
+
+    if os.path.exists(path):
+        os.remove(path)
+    tape = MarketTape()
+    tape.configure(mode=MarketTape.RECORD, path=path)
+    gen = FallbackSeries()
+    with open(os.path.join(HERE, 'fixtures', 'leboursier_cotations.html'), 'rb') as f:
+        bvc_page = f.read()
+
+    start = 1_700_000_000
+    for step in range(minutes * 2):
+        at = step * 30.0
+        now = start + int(at)
+        tape.record("https://www.leboursier.ma/cotations", None, 200, 180.0, bvc_page, at=at)
+        for symbol in YAHOO_SYMBOLS:
+            bars = gen.bars(symbol, '1m', 100.0, points=2, end=now)
+            tape.record(f"{YAHOO_CHART}/{symbol}?interval=1d&range=2d", None, 200, 90.0,
+                        _chart(symbol, bars, prev_close=float(bars.open[0])), at=at)
+            for interval, period in SERIES:
+                points = 390 if interval == '1m' else 154
+                full = gen.bars(symbol, interval, 100.0, points=points, end=now)
+                tape.record(f"{YAHOO_CHART}/{symbol}?interval={interval}&range={period}", None, 200, 140.0,
+                            _chart(symbol, full), at=at)
+                tape.record(f"{YAHOO_CHART}/{symbol}?interval={interval}&period1=0&period2=0", None, 200, 80.0,
+                            _chart(symbol, full.slice(-2)), at=at)
+    tape.close()
+    print(f"Wrote {tape.recorded} records to {path} ({os.path.getsize(path):,} bytes)")
+
+
+def _chart(symbol, bars, prev_close=None):
+    return json.dumps({"chart": {"result": [{
+        "meta": {
+            "symbol": symbol, "currency": "USD", "gmtoffset": 0,
+            "regularMarketPrice": float(bars.close[-1]),
+            "chartPreviousClose": prev_close or float(bars.open[0]),
+            "currentTradingPeriod": {"regular": {"start": 0}},
+        },
+        "timestamp": bars.time.tolist(),
+        "indicators": {"quote": [{
+            "open": bars.open.tolist(), "high": bars.high.tolist(), "low": bars.low.tolist(),
+            "close": bars.close.tolist(), "volume": bars.volume.tolist(),
+        }]},
+    }]}}).encode()
+
+
+def percentile(samples, pct):
+    if not samples:
+        return float('nan')
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tape', default=DEFAULT_TAPE)
+    parser.add_argument('--synthesize', action='store_true')
+    parser.add_argument('--speed', default='0', help="replay clock multiplier, 0 = step mode")
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args()
+
+    if args.synthesize:
+        synthesize(args.tape)
+    if not os.path.exists(args.tape):
+        sys.exit(f"No tape at {args.tape}; record one or pass --synthesize")
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    os.environ.update({
+        'MARKET_TAPE_MODE': 'replay',
+        'MARKET_TAPE_PATH': args.tape,
+        'MARKET_TAPE_SPEED': args.speed,
+        'DATABASE_URL': f'sqlite:///{db_path}',
+        'BAR_STORE_DIR': os.path.join(os.path.dirname(db_path), 'bars'),
+        'PREFETCH_ENABLED': '0',
+        'REVALUE_ENABLED': '0',
+        'ROLLOVER_ENABLED': '0',
+        'DRAWDOWN_BACKGROUND_FLUSH': '0',
+    })
+
+    import jwt
+    import logging
+    from app import create_app
+    from models import db, User, Plan, Challenge
+
+    logging.disable(logging.WARNING)
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        user = User(name='Bench', email='bench@example.com', password_hash='x')
+        plan = Plan(slug='bench', price_dh=0)
+        db.session.add_all([user, plan])
+        db.session.flush()
+        challenge = Challenge(user_id=user.id, plan_id=plan.id, start_balance=1e9, equity=1e9, daily_start_equity=1e9)
+        db.session.add(challenge)
+        db.session.commit()
+        token = jwt.encode({'user_id': user.id}, app.config['SECRET_KEY'], algorithm='HS256')
+        challenge_id = challenge.id
+
+    auth = {'Authorization': f'Bearer {token}'}
+    all_symbols = YAHOO_SYMBOLS[:5] + BVC_SYMBOLS
+    scenarios = {
+        'GET /api/market/quote': lambda c, i: c.get(f'/api/market/quote?symbol={all_symbols[i % len(all_symbols)]}'),
+        'GET /api/market/quotes': lambda c, i: c.get(f'/api/market/quotes?symbols={",".join(all_symbols)}'),
+        'GET /api/market/series': lambda c, i: c.get(
+            '/api/market/series?symbol={}&interval={}&period={}'.format(
+                YAHOO_SYMBOLS[i % 5], *SERIES[i % len(SERIES)])),
+        'POST /api/trades/': lambda c, i: c.post('/api/trades/', headers=auth, json={
+            'challenge_id': challenge_id, 'symbol': all_symbols[i % len(all_symbols)], 'side': 'buy', 'qty': 1}),
+    }
+
+    local = threading.local()
+
+    def client():
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+        return local.client
+
+    print(f"tape={args.tape} speed={args.speed} requests={args.requests} concurrency={args.concurrency}")
+    print(f"  {'endpoint':<24} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for name, call in scenarios.items():
+        latencies, errors = [], [0]
+
+        def run(i):
+            start = time.perf_counter()
+            status = call(client(), i).status_code
+            latencies.append((time.perf_counter() - start) * 1000)
+            if status >= 400:
+                errors[0] += 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(run, range(args.requests)))
+        elapsed = time.perf_counter() - started
+        print(f"  {name:<24} {args.requests / elapsed:>8.0f} {percentile(latencies, 50):>8.2f} "
+              f"{percentile(latencies, 95):>8.2f} {percentile(latencies, 99):>8.2f} {errors[0]:>7}")
+
+    from services.market_tape import market_tape
+    print(f"tape: {market_tape.stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""
+Benchmark of the periodic challenge revaluation (services/revaluation.py).
+
+1. compute   revalue() alone on synthetic arrays: N challenges, about
+             --positions open positions each, --symbols distinct symbols
+2. full      Revaluator.run_once() against a throwaway SQLite database seeded
+             with N active challenges and their positions. The first (cold)
+             pass loads every position and finds thousands of breaches; the
+             next passes only read changed positions, as the periodic job does.
+             Reports load / compute / write time.
+
+Usage: python bench_revaluation.py [--challenges 100000] [--positions 3] [--symbols 500]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+
+def synthetic(n, per_challenge, n_symbols, seed=7):
+    rng = np.random.default_rng(seed)
+    start = np.full(n, 10_000.0)
+    balance = start + rng.normal(0, 300, n)
+    day_start = balance + rng.normal(0, 100, n)
+    m = n * per_challenge
+    position_row = np.sort(rng.integers(0, n, m))
+    symbol_index = rng.integers(0, n_symbols, m)
+    base = rng.uniform(10, 500, n_symbols)
+    qty = rng.choice([-1.0, 1.0], m) * np.round(rng.uniform(1, 20, m))
+    avg_price = base[symbol_index] * rng.uniform(0.97, 1.03, m)
+    marks = base * rng.uniform(0.9, 1.1, n_symbols)
+    return balance, start, day_start, position_row, qty, avg_price, symbol_index, marks
+
+
+def compute_bench(n, per_challenge, n_symbols, repeats=5):
+    from services.revaluation import revalue, ACTIVE
+
+    arrays = synthetic(n, per_challenge, n_symbols)
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        equity, verdict = revalue(*arrays)
+        best = min(best, time.perf_counter() - started)
+    print(f"compute: {n:,} challenges, {len(arrays[4]):,} positions, {n_symbols} symbols: "
+          f"{best * 1000:.1f} ms (best of {repeats}), {int((verdict != ACTIVE).sum()):,} breaches")
+
+
+def full_bench(n, per_challenge, n_symbols):
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    os.environ.update({
+        'DATABASE_URL': f'sqlite:///{db_path}',
+        'BAR_STORE_DIR': os.path.join(os.path.dirname(db_path), 'bars'),
+        'PREFETCH_ENABLED': '0',
+        'SHARED_QUOTES_ENABLED': '0',
+        'REVALUE_ENABLED': '0',
+        'ROLLOVER_ENABLED': '0',
+        'DRAWDOWN_BACKGROUND_FLUSH': '0',
+    })
+
+    import logging
+    from app import create_app
+    from models import db, User, Plan, Challenge, Position
+    from services.quote_cache import quote_cache
+    from services.revaluation import revaluator
+
+    logging.disable(logging.WARNING)
+    app = create_app()
+    balance, start, day_start, position_row, qty, avg_price, symbol_index, marks = synthetic(n, per_challenge, n_symbols)
+    symbols = [f"SYM{i:04d}" for i in range(n_symbols)]
+
+    with app.app_context():
+        db.create_all()
+        user = User(name='Bench', email='bench@example.com', password_hash='x')
+        plan = Plan(slug='bench', price_dh=0)
+        db.session.add_all([user, plan])
+        db.session.flush()
+        db.session.execute(Challenge.__table__.insert(), [
+            {"id": i + 1, "user_id": user.id, "plan_id": plan.id, "start_balance": float(start[i]),
+             "balance": float(balance[i]), "equity": float(balance[i]), "daily_start_equity": float(day_start[i]),
+             "status": 'active', "positions_version": 1}
+            for i in range(n)
+        ])
+        # one row per (challenge, symbol): merge duplicate draws; last filled an hour ago
+        filled_at = datetime.utcnow() - timedelta(hours=1)
+        seen = {}
+        for row, s, q, p in zip(position_row, symbol_index, qty, avg_price):
+            seen.setdefault((int(row) + 1, symbols[s]), (float(q), float(p)))
+        db.session.execute(Position.__table__.insert(), [
+            {"challenge_id": cid, "symbol": s, "qty": q, "avg_price": p, "realized_pnl": 0.0, "fees": 0.0,
+             "updated_at": filled_at}
+            for (cid, s), (q, p) in seen.items()
+        ])
+        db.session.commit()
+
+        for s, mark in zip(symbols, marks):
+            quote_cache.set(s, {"symbol": s, "price": float(mark)}, 3600)
+
+        started = time.perf_counter()
+        counts = revaluator.run_once()
+        elapsed = time.perf_counter() - started
+        last = revaluator.last
+        print(f"full: {last['challenges']:,} challenges, {last['positions']:,} positions: {elapsed * 1000:.0f} ms "
+              f"(load {last['load_ms']} ms, compute {last['compute_ms']} ms, write {last['write_ms']} ms, "
+              f"{last['updated']:,} rows updated)")
+        print(f"  verdicts: {counts}")
+        print(f"  still active: {Challenge.query.filter_by(status='active').count():,}")
+
+        # Steady state: a few fills since the last pass, marks drift by up to 0.5%
+        db.session.execute(Position.__table__.update().where(Position.id <= 100).values(qty=5.0, updated_at=datetime.utcnow()))
+        db.session.commit()
+        drift = np.random.default_rng(1).uniform(0.995, 1.005, n_symbols)
+        for s, mark in zip(symbols, marks * drift):
+            quote_cache.set(s, {"symbol": s, "price": float(mark)}, 3600)
+        for label in ('next pass (0.5% drift)', 'next pass (no moves)'):
+            started = time.perf_counter()
+            counts = revaluator.run_once()
+            elapsed = time.perf_counter() - started
+            last = revaluator.last
+            print(f"{label}: {elapsed * 1000:.0f} ms (load {last['load_ms']} ms, compute {last['compute_ms']} ms, "
+                  f"write {last['write_ms']} ms, {last['positions_synced']} positions synced, "
+                  f"{last['updated']:,} rows updated, verdicts {counts})")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--challenges', type=int, default=100_000)
+    parser.add_argument('--positions', type=int, default=3)
+    parser.add_argument('--symbols', type=int, default=500)
+    args = parser.parse_args()
+
+    compute_bench(args.challenges, args.positions, args.symbols)
+    full_bench(args.challenges, args.positions, args.symbols)
+
+
+if __name__ == '__main__':
+    main()
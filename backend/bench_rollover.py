@@ -0,0 +1,91 @@
+"""
+Benchmark of the daily rollover (services/rollover.py).
+
+1. rollover   DailyRollover.run_once() against a throwaway SQLite database
+              seeded with N active challenges, each with yesterday's open
+              `daily_metrics` row: close, reset and open in one transaction.
+              A second run (nothing left to roll) shows the per-check cost.
+2. hot path   the day-start lookup a trade does, `day_start()` on an already
+              rolled challenge, versus the two metrics queries the rules
+              engine used to run on each challenge's first trade of the day.
+
+Usage: python bench_rollover.py [--challenges 100000] [--lookups 2000]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--challenges', type=int, default=100_000)
+    parser.add_argument('--lookups', type=int, default=2000)
+    args = parser.parse_args()
+    n = args.challenges
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    os.environ.update({
+        'DATABASE_URL': f'sqlite:///{db_path}',
+        'BAR_STORE_DIR': os.path.join(os.path.dirname(db_path), 'bars'),
+        'PREFETCH_ENABLED': '0',
+        'SHARED_QUOTES_ENABLED': '0',
+        'REVALUE_ENABLED': '0',
+        'ROLLOVER_ENABLED': '0',
+        'DRAWDOWN_BACKGROUND_FLUSH': '0',
+    })
+
+    import logging
+    from app import create_app
+    from models import db, User, Plan, Challenge, DailyMetrics
+    from services.rollover import daily_rollover
+
+    logging.disable(logging.WARNING)
+    app = create_app()
+    yesterday = datetime.utcnow() - timedelta(days=1)
+
+    with app.app_context():
+        db.create_all()
+        user = User(name='Bench', email='bench@example.com', password_hash='x')
+        plan = Plan(slug='bench', price_dh=0)
+        db.session.add_all([user, plan])
+        db.session.flush()
+        db.session.execute(Challenge.__table__.insert(), [
+            {"id": i + 1, "user_id": user.id, "plan_id": plan.id, "start_balance": 10_000.0, "balance": 10_000.0,
+             "equity": 10_000.0 + (i % 200) - 100, "daily_start_equity": 10_000.0, "last_daily_reset": yesterday,
+             "created_at": yesterday, "status": 'active', "positions_version": 0}
+            for i in range(n)
+        ])
+        db.session.execute(DailyMetrics.__table__.insert(), [
+            {"challenge_id": i + 1, "date": yesterday.date(), "day_start_equity": 10_000.0, "day_pnl": 0.0,
+             "max_intraday_drawdown_pct": 0.0}
+            for i in range(n)
+        ])
+        db.session.commit()
+
+        for label in ('rollover', 'next check'):
+            started = time.perf_counter()
+            counts = daily_rollover.run_once()
+            print(f"{label}: {n:,} challenges: {(time.perf_counter() - started) * 1000:.0f} ms "
+                  f"(closed {counts['closed']:,}, reset {counts['reset']:,}, opened {counts['opened']:,})")
+
+        challenges = Challenge.query.filter(Challenge.id <= args.lookups).all()
+        today = datetime.utcnow().date()
+
+        started = time.perf_counter()
+        for challenge in challenges:
+            daily_rollover.day_start(challenge)
+        hot = (time.perf_counter() - started) / len(challenges)
+
+        started = time.perf_counter()
+        for challenge in challenges:
+            DailyMetrics.query.filter_by(challenge_id=challenge.id, date=today).first()
+            DailyMetrics.query.filter_by(challenge_id=challenge.id, date=today - timedelta(days=1)).first()
+        old = (time.perf_counter() - started) / len(challenges)
+        print(f"day start lookup: {hot * 1e6:.1f} us (precomputed) vs {old * 1e6:.0f} us (two metrics queries), "
+              f"{daily_rollover.inline} inline rollovers")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark the Casablanca scraper parsing path against saved HTML fixtures.
+
+Usage: python bench_scraper.py [fixture.html ...]
+Defaults to fixtures/leboursier_cotations.html.
+"""
+import os
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+from services.html_table import BACKENDS, BACKEND, RowIndex, parse_rows
+from services.morocco_scraper import MoroccoScraper
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+DEFAULT_FIXTURES = [os.path.join(FIXTURE_DIR, 'leboursier_cotations.html')]
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def bench_fixture(path, repeat=50, lookups=20000):
+    with open(path, 'rb') as f:
+        html = f.read()
+    print(f"\n== {os.path.basename(path)} ({len(html) / 1024:.0f} KB) ==")
+
+    # Old path: html.parser soup + linear `search_name in tr.get_text()` per lookup
+    soup_time, soup = timed(lambda: BeautifulSoup(html, 'html.parser'), repeat)
+    names = list(MoroccoScraper.NAME_MAP.values())
+
+    def linear_lookup(i):
+        search_name = names[i % len(names)]
+        for tr in soup.find_all('tr'):
+            if search_name in tr.get_text():
+                return tr
+
+    linear_n = max(lookups // 100, 50)
+    start = time.perf_counter()
+    for i in range(linear_n):
+        linear_lookup(i)
+    linear_rate = linear_n / (time.perf_counter() - start)
+    print(f"  baseline  html.parser soup   parse {soup_time * 1000:8.2f} ms   lookups {linear_rate:12,.0f}/s")
+
+    tickers = list(MoroccoScraper.NAME_MAP)
+    for name in BACKENDS:
+        parse_time, rows = timed(lambda: parse_rows(html, backend=name), repeat)
+        index_time, index = timed(lambda: RowIndex(rows, MoroccoScraper.NAME_MAP), repeat)
+
+        start = time.perf_counter()
+        for i in range(lookups):
+            index.get(tickers[i % len(tickers)])
+        rate = lookups / (time.perf_counter() - start)
+
+        marker = '*' if name == BACKEND else ' '
+        print(f" {marker}{name:<11} rows={len(rows):<4}      parse {parse_time * 1000:8.2f} ms   "
+              f"index {index_time * 1000:6.3f} ms   lookups {rate:12,.0f}/s")
+
+
+if __name__ == '__main__':
+    fixtures = sys.argv[1:] or DEFAULT_FIXTURES
+    print(f"Installed backends: {', '.join(BACKENDS)} (* = active)")
+    for path in fixtures:
+        bench_fixture(path)
@@ -0,0 +1,58 @@
+"""
+Benchmark /api/market/series payloads: the original list of dicts through
+stdlib json versus the columnar layout, orjson and compression.
+
+Bars are simulated (fallback generator) at the sizes Yahoo returns for a
+24h market: 1d/1m ~1440 bars, 1mo/1h ~720 bars.
+
+Usage: python bench_series_wire.py
+"""
+import gzip
+import json
+import time
+
+from services.fallback_series import FallbackSeries
+from services import series_codec
+
+CASES = [('1d / 1m', '1m', 1440), ('1mo / 1h', '1h', 720)]
+REPEAT = 50
+
+
+def timed(fn):
+    fn()
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        result = fn()
+    return result, (time.perf_counter() - start) / REPEAT * 1000
+
+
+def row(label, body, ms):
+    gz = len(gzip.compress(body, compresslevel=series_codec.GZIP_LEVEL))
+    br = ''
+    if series_codec.brotli is not None:
+        br = f"{len(series_codec.brotli.compress(body, quality=series_codec.BROTLI_QUALITY)):>9,}"
+    print(f"  {label:<34} {len(body):>9,} {gz:>9,} {br:>9} {ms:>9.3f}")
+
+
+if __name__ == '__main__':
+    gen = FallbackSeries()
+    print(f"orjson: {series_codec.orjson is not None}  msgpack: {series_codec.msgpack is not None}  "
+          f"brotli: {series_codec.brotli is not None}  (mean of {REPEAT} runs)")
+
+    for title, interval, points in CASES:
+        bars = gen.bars('BTC-USD', interval, 92000.0, points=points, end=1_700_000_000)
+        print(f"\n{title}: {points} bars")
+        print(f"  {'format':<34} {'raw B':>9} {'gzip B':>9} {'br B':>9} {'encode ms':>9}")
+
+        body, ms = timed(lambda: json.dumps(bars.to_records()).encode())
+        row('before: records, stdlib json', body, ms)
+
+        body, ms = timed(lambda: series_codec.encode(bars, 'records')[0])
+        row('records, fast encoder', body, ms)
+
+        body, ms = timed(lambda: series_codec.encode(bars, 'columns')[0])
+        row('columns, fast encoder', body, ms)
+
+        if series_codec.msgpack is not None:
+            body, ms = timed(lambda: series_codec.encode(bars, 'msgpack')[0])
+            row('columns, msgpack', body, ms)
@@ -0,0 +1,141 @@
+"""
+Benchmark of the cross-worker shared quote table (services/shared_quotes.py).
+
+1. seqlock   one process rewrites every record as fast as it can while
+             reader processes check each read is self-consistent
+             (change == -price, change_pct == 2 * price): reads/s and torn reads.
+2. upstream  N worker processes, each with its own prefetcher, poll the same
+             symbols through the market router against a local Yahoo stub
+             (bench_async_fetch.py). Counts stub hits with the table off and
+             on: off, upstream load grows with N; on, it stays about flat.
+
+Usage: python bench_shared_quotes.py [--workers 4] [--seconds 12] [--symbols 20]
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+SYMBOLS_IN_TABLE = 256
+
+
+def writer_loop(path, stop):
+    from services.shared_quotes import SharedQuoteTable
+    table = SharedQuoteTable()
+    table.configure(path)
+    table.try_elect()
+    k = 0
+    while not stop.is_set():
+        k += 1
+        for i in range(SYMBOLS_IN_TABLE):
+            price = float(k + i)
+            table.put(f"S{i}", {"price": price, "change": -price, "change_pct": 2 * price,
+                                "currency": "USD", "source": "bench"}, time.time() + 60)
+
+
+def reader_loop(path, seconds, results):
+    from services.shared_quotes import SharedQuoteTable
+    table = SharedQuoteTable()
+    table.configure(path)
+    reads = torn = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for i in range(SYMBOLS_IN_TABLE):
+            q = table.get(f"S{i}")
+            if q is None:
+                continue
+            reads += 1
+            if q['change'] != -q['price'] or q['change_pct'] != 2 * q['price']:
+                torn += 1
+    results.put((reads / seconds, torn, table.retries))
+
+
+def seqlock_bench(readers, seconds):
+    path = os.path.join(tempfile.mkdtemp(), 'quotes.shm')
+    stop = multiprocessing.Event()
+    writer = multiprocessing.Process(target=writer_loop, args=(path, stop))
+    writer.start()
+    time.sleep(0.5)
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=reader_loop, args=(path, seconds, results)) for _ in range(readers)]
+    for p in procs:
+        p.start()
+    rows = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    stop.set()
+    writer.join()
+    print(f"seqlock: 1 writer, {readers} readers, {SYMBOLS_IN_TABLE} symbols, {seconds}s")
+    for n, (rate, torn, retries) in enumerate(rows):
+        print(f"  reader {n}: {rate:>10,.0f} reads/s  torn={torn}  retries={retries}")
+
+
+def worker(base_url, shared_path, symbols, seconds):
+    import logging
+    logging.disable(logging.WARNING)
+    from services.market import MarketService
+    from services.market_router import market_router
+    from services.prefetcher import prefetcher
+    from services.quote_cache import quote_cache
+    from services.shared_quotes import shared_quotes
+
+    MarketService.BASE_URL = base_url
+    quote_cache.configure(ttls={'equity': 3})  # several TTLs fit in a short run
+    if shared_path:
+        shared_quotes.configure(shared_path)
+    prefetcher.configure(interval=1)
+    prefetcher.start()
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        for symbol in symbols:
+            prefetcher.touch(symbol)
+            market_router.quote(symbol)
+        time.sleep(0.05)
+
+
+def upstream_bench(workers, seconds, n_symbols):
+    from bench_async_fetch import start_stub
+    import bench_async_fetch
+
+    hits = [0]
+    chart = bench_async_fetch.chart
+
+    def counting_chart(symbol):
+        hits[0] += 1
+        return chart(symbol)
+
+    bench_async_fetch.chart = counting_chart
+    port = start_stub(0.02)
+    base_url = f"http://127.0.0.1:{port}/v8/finance/chart"
+    symbols = [f"SYM{i:02d}" for i in range(n_symbols)]
+
+    print(f"upstream: {n_symbols} symbols polled every 50 ms, equity TTL 3 s, {seconds}s")
+    print(f"  {'workers':>7} {'table':>6} {'stub hits':>10}")
+    for shared in (False, True):
+        for count in sorted({1, workers}):
+            shared_path = os.path.join(tempfile.mkdtemp(), 'quotes.shm') if shared else None
+            hits[0] = 0
+            procs = [multiprocessing.Process(target=worker, args=(base_url, shared_path, symbols, seconds))
+                     for _ in range(count)]
+            for p in procs:
+                p.start()
+            for p in procs:
+                p.join()
+            print(f"  {count:>7} {'on' if shared else 'off':>6} {hits[0]:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--seconds', type=int, default=12)
+    parser.add_argument('--symbols', type=int, default=20)
+    args = parser.parse_args()
+
+    multiprocessing.set_start_method('fork')
+    seqlock_bench(args.workers, min(args.seconds, 5))
+    upstream_bench(args.workers, args.seconds, args.symbols)
+
+
+if __name__ == '__main__':
+    main()
@@ -24,4 +24,63 @@ class Config:
     # PayPal Settings (Defaults)
     PAYPAL_CLIENT_ID = os.getenv('PAYPAL_CLIENT_ID', '')
     PAYPAL_CLIENT_SECRET = os.getenv('PAYPAL_CLIENT_SECRET', '')
-    PAYPAL_MODE = os.getenv('PAYPAL_MODE', 'sandbox')
\ No newline at end of file
+    PAYPAL_MODE = os.getenv('PAYPAL_MODE', 'sandbox')
+
+    # Market Data Quote Cache (seconds per symbol class, LRU bound)
+    QUOTE_CACHE_TTLS = {
+        'crypto': int(os.getenv('QUOTE_TTL_CRYPTO', 10)),
+        'forex': int(os.getenv('QUOTE_TTL_FOREX', 15)),
+        'index': int(os.getenv('QUOTE_TTL_INDEX', 30)),
+        'equity': int(os.getenv('QUOTE_TTL_EQUITY', 30)),
+    }
+    QUOTE_CACHE_MAX_ENTRIES = int(os.getenv('QUOTE_CACHE_MAX_ENTRIES', 512))
+
+    # Background quote prefetcher (keeps requested + pinned symbols warm)
+    # Off by default on Vercel, where there is no long-lived process.
+    PREFETCH_ENABLED = os.getenv('PREFETCH_ENABLED', '0' if os.environ.get('VERCEL_REGION') else '1') == '1'
+    PREFETCH_SYMBOLS = [s.strip() for s in os.getenv('PREFETCH_SYMBOLS', 'BTC-USD,AAPL,TSLA,IAM,ATW').split(',') if s.strip()]
+    PREFETCH_INTERVAL = int(os.getenv('PREFETCH_INTERVAL', 5))
+
+    # Quote table shared by all workers on the host (POSIX only). One worker's
+    # prefetcher refreshes and publishes; the others read it before going upstream.
+    SHARED_QUOTES_ENABLED = os.getenv('SHARED_QUOTES_ENABLED', '0' if os.environ.get('VERCEL_REGION') else '1') == '1'
+    SHARED_QUOTES_PATH = os.getenv('SHARED_QUOTES_PATH') or (
+        '/dev/shm/tradesense-quotes' if os.path.isdir('/dev/shm')
+        else os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'quotes.shm')
+    )
+    SHARED_QUOTES_SLOTS = int(os.getenv('SHARED_QUOTES_SLOTS', 1024))
+
+    # Columnar OHLCV history (memory-mapped files per symbol/interval)
+    BAR_STORE_DIR = os.getenv('BAR_STORE_DIR') or (
+        '/tmp/tradesense-bars' if os.environ.get('VERCEL_REGION') or os.getcwd().startswith('/var/task')
+        else os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'bars')
+    )
+    # Scheduled compaction of every series on disk, dropping bars past each interval's retention
+    BAR_COMPACT_ENABLED = os.getenv('BAR_COMPACT_ENABLED', '0' if os.environ.get('VERCEL_REGION') else '1') == '1'
+    BAR_COMPACT_INTERVAL = int(os.getenv('BAR_COMPACT_INTERVAL', 3600))
+
+    # News drop folder: *.json / *.xml (RSS 2.0) files are ingested into news_items
+    NEWS_DROP_DIR = os.getenv('NEWS_DROP_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'news_feed')
+    NEWS_SCAN_INTERVAL = int(os.getenv('NEWS_SCAN_INTERVAL', 60))
+
+    # Market data tape: 'record' captures upstream responses, 'replay' serves them offline
+    MARKET_TAPE_MODE = os.getenv('MARKET_TAPE_MODE', 'off')
+    MARKET_TAPE_PATH = os.getenv('MARKET_TAPE_PATH') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'market.tape')
+    MARKET_TAPE_SPEED = float(os.getenv('MARKET_TAPE_SPEED', 1.0))  # replay clock multiplier, 0 = step mode
+
+    # Start the background threads below from create_app() (gunicorn workers). Off so that
+    # `flask db`, scripts and tests importing the app never start them; `python app.py` always does.
+    BACKGROUND_JOBS = os.getenv('BACKGROUND_JOBS', '0') == '1'
+
+    # Periodic mark-to-market of every active challenge (rules checked between trades)
+    REVALUE_ENABLED = os.getenv('REVALUE_ENABLED', '0' if os.environ.get('VERCEL_REGION') else '1') == '1'
+    REVALUE_INTERVAL = int(os.getenv('REVALUE_INTERVAL', 15))
+
+    # End-of-day rollover of daily_metrics and challenges.daily_start_equity (checked every ROLLOVER_INTERVAL s)
+    ROLLOVER_ENABLED = os.getenv('ROLLOVER_ENABLED', '0' if os.environ.get('VERCEL_REGION') else '1') == '1'
+    ROLLOVER_INTERVAL = int(os.getenv('ROLLOVER_INTERVAL', 60))
+
+    # Intraday drawdown tracker: dirty max drawdowns flushed to daily_metrics every DRAWDOWN_FLUSH_INTERVAL s
+    # (by a background thread, or inline from requests when DRAWDOWN_BACKGROUND_FLUSH is off)
+    DRAWDOWN_BACKGROUND_FLUSH = os.getenv('DRAWDOWN_BACKGROUND_FLUSH', '0' if os.environ.get('VERCEL_REGION') else '1') == '1'
+    DRAWDOWN_FLUSH_INTERVAL = int(os.getenv('DRAWDOWN_FLUSH_INTERVAL', 30))
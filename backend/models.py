@@ -41,8 +41,10 @@ class Challenge(db.Model):
     plan_id = db.Column(db.Integer, db.ForeignKey('plans.id'), nullable=False)
     start_balance = db.Column(db.Float, nullable=False)
     equity = db.Column(db.Float, nullable=False)
-    daily_start_equity = db.Column(db.Float, nullable=True) # Snapshot for daily drawdown
+    daily_start_equity = db.Column(db.Float, nullable=True) # Snapshot for daily drawdown, set by the daily rollover
     last_daily_reset = db.Column(db.DateTime, default=datetime.utcnow)
+    balance = db.Column(db.Float, nullable=True) # Start balance + realized PnL - fees (open positions at cost)
+    positions_version = db.Column(db.Integer, default=0, server_default='0') # Bumped on every fill, invalidates cached books
     
     status = db.Column(db.String(20), default='active') # active, failed, passed
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -51,6 +53,7 @@ class Challenge(db.Model):
     
     trades = db.relationship('Trade', backref='challenge', lazy=True)
     metrics = db.relationship('DailyMetrics', backref='challenge', lazy=True)
+    positions = db.relationship('Position', backref='challenge', lazy=True)
 
 class Trade(db.Model):
     __tablename__ = 'trades'
@@ -66,8 +69,21 @@ class Trade(db.Model):
     # but for simple MVP we might just track equity changes. 
     # Let's assume this is a simple spot transaction or we calculate PnL properly.
 
+class Position(db.Model):
+    __tablename__ = 'positions'
+    __table_args__ = (db.UniqueConstraint('challenge_id', 'symbol'),)
+    id = db.Column(db.Integer, primary_key=True)
+    challenge_id = db.Column(db.Integer, db.ForeignKey('challenges.id'), nullable=False, index=True)
+    symbol = db.Column(db.String(20), nullable=False)
+    qty = db.Column(db.Float, nullable=False, default=0.0) # Signed: + long, - short, 0 flat
+    avg_price = db.Column(db.Float, nullable=False, default=0.0)
+    realized_pnl = db.Column(db.Float, nullable=False, default=0.0)
+    fees = db.Column(db.Float, nullable=False, default=0.0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, index=True) # Revaluation job reads rows changed since its last pass
+
 class DailyMetrics(db.Model):
     __tablename__ = 'daily_metrics'
+    __table_args__ = (db.Index('ix_daily_metrics_challenge_id_date', 'challenge_id', 'date'),) # Rollover's NOT EXISTS probes
     id = db.Column(db.Integer, primary_key=True)
     challenge_id = db.Column(db.Integer, db.ForeignKey('challenges.id'), nullable=False)
     date = db.Column(db.Date, nullable=False, default=datetime.utcnow().date)
@@ -83,3 +99,17 @@ class ChatMessage(db.Model):
     user_name = db.Column(db.String(100), nullable=False) # Denormalized for simpler queries
     message = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class NewsItem(db.Model):
+    __tablename__ = 'news_items'
+    id = db.Column(db.Integer, primary_key=True)
+    guid = db.Column(db.String(255), unique=True, nullable=False) # Feed id or link, dedupes re-ingested files
+    title = db.Column(db.String(300), nullable=False)
+    summary = db.Column(db.Text, nullable=True)
+    source = db.Column(db.String(100), nullable=True)
+    url = db.Column(db.String(500), nullable=True)
+    category = db.Column(db.String(30), nullable=False, index=True) # Crypto, Stocks, Forex, Commodities, Markets
+    sentiment = db.Column(db.String(10), nullable=False, index=True) # positive, negative, neutral
+    published_at = db.Column(db.DateTime, nullable=False, index=True)
+    search_tokens = db.Column(db.Text, nullable=True) # ' tok1 tok2 ... ': services.news.tokenize() of title + summary, for whole-token search
+    ingested_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -1,7 +1,9 @@
 from flask import Blueprint, jsonify, request
-from models import db, Challenge, DailyMetrics, Plan
+from models import db, Challenge, Plan
 from middleware import token_required
-from datetime import datetime
+from services.positions import position_book
+from services.rollover import daily_rollover
+from services.drawdown import drawdown_tracker
 
 challenges_bp = Blueprint('challenges', __name__)
 
@@ -18,15 +20,15 @@ def get_active_challenge(current_user):
     if not challenge:
         return jsonify(None) # No challenges at all
         
-    # Get today's DailyMetric to find start equity
-    today = datetime.utcnow().date()
-    metric = DailyMetrics.query.filter_by(challenge_id=challenge.id, date=today).first()
-    daily_start = metric.day_start_equity if metric else challenge.equity
+    # Today's start equity, precomputed by the daily rollover
+    daily_start = daily_rollover.day_start(challenge) if challenge.status == 'active' else (challenge.daily_start_equity or challenge.equity)
+    # Open positions marked at the latest cached prices
+    equity = position_book.equity(challenge) if challenge.status == 'active' else challenge.equity
 
     return jsonify({
         "id": challenge.id,
         "status": challenge.status,
-        "equity": challenge.equity,
+        "equity": equity,
         "start_balance": challenge.start_balance,
         "daily_start_equity": daily_start,
         "created_at": challenge.created_at.isoformat()
@@ -39,26 +41,26 @@ def get_challenge_detail(current_user, id):
     if not challenge or challenge.user_id != current_user.id:
         return jsonify({"error": "Not found"}), 404
         
-    # User's metrics
-    today = datetime.utcnow().date()
     # Find simple targets
     target_equity = challenge.start_balance * 1.10
     max_loss_equity = challenge.start_balance * 0.90
     
     # Calculate daily loss limit for display
     # We need today's starting equity to know the limit
-    metric = DailyMetrics.query.filter_by(challenge_id=challenge.id, date=today).first()
-    day_start = metric.day_start_equity if metric else challenge.equity # fallback
+    day_start = daily_rollover.day_start(challenge) if challenge.status == 'active' else (challenge.daily_start_equity or challenge.equity)
     daily_loss_limit_equity = day_start * 0.95
+    equity = position_book.equity(challenge) if challenge.status == 'active' else challenge.equity
     
     return jsonify({
         "id": challenge.id,
         "status": challenge.status,
-        "equity": challenge.equity,
+        "equity": equity,
         "start_balance": challenge.start_balance,
         "targets": {
             "profit_target": target_equity,
             "max_loss_level": max_loss_equity,
             "daily_loss_level": daily_loss_limit_equity
-        }
+        },
+        # Today's high-water mark and drawdown as seen by this worker (None before any equity update today)
+        "intraday": drawdown_tracker.snapshot(challenge.id)
     })
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from models import db, Challenge, Plan, PayPalSettings
 from middleware import token_required
+from services.rollover import daily_rollover
 import datetime
 
 checkout_bp = Blueprint('checkout', __name__)
@@ -28,10 +29,13 @@ def mock_checkout(current_user):
         plan_id=plan.id,
         start_balance=start_balance,
         equity=start_balance,
+        balance=start_balance,
+        daily_start_equity=start_balance,
         status='active'
     )
     
     db.session.add(new_challenge)
+    daily_rollover.open_day(new_challenge)
     db.session.commit()
     
     return jsonify({
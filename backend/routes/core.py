@@ -3,9 +3,12 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy import func, desc
 from datetime import datetime, date
 from models import db, Plan, Challenge, Trade, User, DailyMetrics
-from services.market import market_service
+from services.market_router import market_router
 from services.morocco_scraper import morocco_scraper
 from services.rules import rules_engine
+from services.positions import position_book
+from services.rollover import daily_rollover
+from services.prefetcher import prefetcher
 
 core_bp = Blueprint('core', __name__, url_prefix='/api')
 
@@ -92,10 +95,13 @@ def mock_checkout():
             plan_id=plan.id,
             start_balance=start_balance,
             equity=start_balance,
+            balance=start_balance,
+            daily_start_equity=start_balance,
             status='active'
         )
         
         db.session.add(challenge)
+        daily_rollover.open_day(challenge)
         db.session.commit()
         
         return jsonify({
@@ -167,12 +173,10 @@ def get_market_quote():
         if not symbol:
             return jsonify({'error': 'Missing symbol parameter'}), 400
         
-        # Handle Morocco stocks separately
-        moroccan_stocks = ['IAM', 'ATW', 'MNG', 'BCP', 'CAS']
-        if symbol in moroccan_stocks:
-            quote = morocco_scraper.get_ma_quote(symbol)
-        else:
-            quote = market_service.get_quote(symbol)
+        # Registry picks the provider (BVC scraper for Moroccan stocks, Yahoo otherwise)
+        quote = market_router.quote(symbol)
+        if market_router.is_real(quote):
+            prefetcher.touch(symbol)  # only symbols with a real price are kept warm
         
         return jsonify(quote), 200
         
@@ -189,45 +193,13 @@ def get_market_series():
         
         if not symbol:
             return jsonify({'error': 'Missing symbol parameter'}), 400
+        error = market_router.series_error(symbol, interval)
+        if error:
+            return jsonify({'error': error}), 400
         
-        # For Morocco stocks, return mock data since we don't have historical scraping
-        moroccan_stocks = ['IAM', 'ATW', 'MNG', 'BCP', 'CAS']
-        if symbol in moroccan_stocks:
-            # Generate mock historical data for Morocco stocks
-            import random
-            from datetime import datetime
-            import time as time_module
-            
-            data = []
-            now = int(time_module.time())
-            points = 60  # 60 data points
-            
-            # Get current price as base
-            current_quote = morocco_scraper.get_ma_quote(symbol)
-            base_price = current_quote['price']
-            
-            for i in range(points):
-                timestamp = now - (points - i) * 60  # 1-minute intervals
-                # Generate realistic price movements
-                change = random.uniform(-0.005, 0.005)
-                price = base_price * (1 + change)
-                
-                data.append({
-                    'time': timestamp,
-                    'open': round(price * (1 - random.uniform(0, 0.002)), 4),
-                    'high': round(price * (1 + random.uniform(0, 0.003)), 4),
-                    'low': round(price * (1 - random.uniform(0, 0.003)), 4),
-                    'close': round(price, 4),
-                    'volume': random.randint(1000, 10000)
-                })
-                
-                base_price = price
-            
-            return jsonify(data), 200
-        else:
-            # International stocks
-            data = market_service.get_historical_data(symbol, period=range_param, interval=interval)
-            return jsonify(data), 200
+        # Moroccan stocks fall back to simulated history around their reference price
+        data = market_router.bars(symbol, interval, range_param).to_records()
+        return jsonify(data), 200
         
     except Exception as e:
         return jsonify({'error': f'Failed to fetch series: {str(e)}'}), 500
@@ -240,7 +212,7 @@ def get_ma_quote():
         if not symbol:
             return jsonify({'error': 'Missing symbol parameter'}), 400
         
-        quote = morocco_scraper.get_ma_quote(symbol)
+        quote = morocco_scraper.get_stock_price(symbol)
         return jsonify(quote), 200
         
     except Exception as e:
@@ -254,6 +226,7 @@ def get_ma_quote():
 @jwt_required()
 def create_trade():
     """Execute a trade"""
+    challenge = None
     try:
         current_user_id = get_jwt_identity()
         data = request.get_json()
@@ -286,15 +259,16 @@ def create_trade():
         if not challenge:
             return jsonify({'error': 'Active challenge not found'}), 404
         
-        # Get current market price
+        # Get current market price (kept warm in memory by the prefetcher)
         try:
-            if symbol in ['IAM', 'ATW', 'MNG', 'BCP', 'CAS']:
-                quote = morocco_scraper.get_ma_quote(symbol)
-            else:
-                quote = market_service.get_quote(symbol)
-            price = quote['price']
+            quote = market_router.quote(symbol)
         except Exception as e:
             return jsonify({'error': f'Could not fetch market price: {str(e)}'}), 500
+        if not market_router.is_real(quote):
+            # Nothing cached while the upstream is throttled, or a simulated fallback: never fill at a made-up price
+            return jsonify({'error': 'No live market price right now, try again shortly'}), 503
+        prefetcher.touch(symbol)
+        price = quote['price']
         
         # Create trade
         trade = Trade(
@@ -304,6 +278,7 @@ def create_trade():
             qty=qty,
             price=price
         )
+        position_book.fill(challenge, symbol, side, qty, price)
         
         db.session.add(trade)
         db.session.commit()
@@ -319,6 +294,8 @@ def create_trade():
         
     except Exception as e:
         db.session.rollback()
+        if challenge is not None:
+            position_book.discard(challenge.id)
         return jsonify({'error': f'Trade execution failed: {str(e)}'}), 500
 
 @core_bp.route('/trades', methods=['GET'])
@@ -1,12 +1,20 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint
 from models import db, Challenge, User
 from sqlalchemy import func
 from datetime import datetime
+from services.conditional import conditional, content_versions
 
 leaderboard_bp = Blueprint('leaderboard', __name__)
 
+# Ranking depends on challenge equity/status and trader names
+content_versions.track(Challenge, 'leaderboard')
+content_versions.track(User, 'leaderboard')
+
 @leaderboard_bp.route('/monthly-top10', methods=['GET'])
 def get_leaderboard():
+    return conditional(content_versions.tag('leaderboard'), _leaderboard_payload)
+
+def _leaderboard_payload():
     # Logic: Get top 10 challenges by profit % active or passed in current month
     # Simplified: Top 10 by (Equity - StartBalance) / StartBalance
     
@@ -37,4 +45,4 @@ def get_leaderboard():
             "status": r.status
         })
         
-    return jsonify(output)
+    return output
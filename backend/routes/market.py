@@ -1,15 +1,68 @@
-from flask import Blueprint, request, jsonify
-from services.market import market_service
-from services.morocco_scraper import morocco_scraper
+import json
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from services.market_router import market_router
+from services.async_market import async_market
 from services.news import news_service
+from services.quote_cache import quote_cache
+from services.series_cache import INTERVAL_SECONDS, series_cache
+from services.bar_store import bar_store
+from services.http_client import http_client
+from services.market_tape import market_tape
+from services.prefetcher import prefetcher
+from services.quote_stream import quote_hub
+from services.shared_quotes import shared_quotes
+from services.conditional import conditional, content_tag
+from services.series_codec import json_response, negotiate_format, series_response
+from services.indicators import indicator_engine, latest, parse_set
+from services.market import market_service
 
 market_bp = Blueprint('market', __name__)
 
+# Batch quote fan-out runs on the shared async loop (see async_market.py)
+MAX_BATCH_SYMBOLS = 25
+BATCH_TIMEOUT = 8  # seconds; slower symbols come back as errors
+
+# Server-sent quote stream
+STREAM_HEARTBEAT = 15  # seconds between keep-alive comments
+STREAM_RETRY_MS = 5000  # client reconnect delay
+
+def _fetch_quote(symbol):
+    # Registry picks the provider (BVC scraper, Yahoo, ...); the router applies its limits
+    quote = market_router.quote(symbol)
+    if market_router.is_real(quote):
+        prefetcher.touch(symbol)  # only symbols with a real price are kept warm
+    return quote
+
+def _fetch_quotes(symbols, timeout=BATCH_TIMEOUT):
+    quotes, errors = market_router.quotes(symbols, timeout)
+    for symbol, quote in quotes.items():
+        if market_router.is_real(quote):
+            prefetcher.touch(symbol)
+    return quotes, errors
+
+quote_hub.configure(source=lambda symbols: _fetch_quotes(symbols)[0])
+
+def _parse_symbols():
+    raw = request.args.get('symbols', '')
+    return list(dict.fromkeys(s.strip() for s in raw.split(',') if s.strip()))
+
 @market_bp.route('/news', methods=['GET'])
 def get_news():
+    """
+    /news?category=&sentiment=&q=&limit=&cursor=
+    Newest first; pass next_cursor back as `cursor` for the following page.
+    """
     try:
-        news = news_service.get_market_news()
-        return jsonify(news)
+        page = news_service.get_market_news(
+            category=request.args.get('category'),
+            sentiment=request.args.get('sentiment'),
+            q=request.args.get('q'),
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', type=int)
+        )
+        return jsonify(page)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -19,19 +72,79 @@ def get_quote():
     if not symbol:
         return jsonify({"error": "Symbol required"}), 400
     
-    # Routing logic: if it's a known Morocco stock, use scraper
-    morocco_symbols = ['IAM', 'ATW', 'BCP', 'Lafarge', 'ADI', 'CSR', 'HOL', 'MNG', 'WAA', 'SNE', 'TQB']
-    
-    if symbol in morocco_symbols:
-        data = morocco_scraper.get_stock_price(symbol)
-    else:
-        # Default to International (Yahoo Finance)
-        data = market_service.get_quote(symbol)
+    data = _fetch_quote(symbol)
         
     if not data:
         return jsonify({"error": "Symbol not found or service unavailable"}), 404
-        
-    return jsonify(data)
+
+    # Served from the quote cache; the tag changes only when the quote does
+    etag = content_tag(symbol, data.get('price'), data.get('change'), data.get('change_pct'), data.get('source'))
+    return conditional(etag, lambda: data)
+
+@market_bp.route('/quotes', methods=['GET'])
+def get_quotes():
+    """
+    Batch quotes: /quotes?symbols=BTC-USD,AAPL,IAM
+    Yahoo and BVC symbols are fetched concurrently on one event loop, so
+    latency is that of the slowest single symbol. Failures are reported per
+    symbol.
+    """
+    symbols = _parse_symbols()
+    if not symbols:
+        return jsonify({"error": "Symbols required"}), 400
+    if len(symbols) > MAX_BATCH_SYMBOLS:
+        return jsonify({"error": f"At most {MAX_BATCH_SYMBOLS} symbols per request"}), 400
+
+    quotes, errors = _fetch_quotes(symbols)
+    return jsonify({"quotes": quotes, "errors": errors})
+
+@market_bp.route('/stream', methods=['GET'])
+def stream_quotes():
+    """
+    Server-sent events: /stream?symbols=BTC-USD,AAPL,IAM
+    Sends the last known quote for each symbol, then `quote` events as prices
+    change. All streams share one publisher per symbol (see QuoteHub); a
+    client that stops reading is evicted with an `evicted` event and should
+    reconnect. Needs a threaded/async worker: each open stream holds one.
+    """
+    symbols = _parse_symbols()
+    if not symbols:
+        return jsonify({"error": "Symbols required"}), 400
+    if len(symbols) > MAX_BATCH_SYMBOLS:
+        return jsonify({"error": f"At most {MAX_BATCH_SYMBOLS} symbols per stream"}), 400
+
+    sub = quote_hub.subscribe(symbols)
+    if sub is None:
+        return jsonify({"error": "Too many open streams, retry later"}), 503
+
+    def events():
+        try:
+            yield f"retry: {STREAM_RETRY_MS}\n\n"
+            for symbol in symbols:
+                quote = quote_hub.latest(symbol)
+                if quote:
+                    yield _sse('quote', {"symbol": symbol, "quote": quote})
+            while True:
+                item = sub.next(timeout=STREAM_HEARTBEAT)
+                if sub.evicted:
+                    yield _sse('evicted', {"reason": "slow consumer"})
+                    return
+                if item is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                symbol, quote = item
+                yield _sse('quote', {"symbol": symbol, "quote": quote})
+        finally:
+            # Runs on client disconnect (GeneratorExit) as well as eviction
+            quote_hub.unsubscribe(sub)
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+def _sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
 
 @market_bp.route('/series', methods=['GET'])
 def get_series():
@@ -41,24 +154,86 @@ def get_series():
     
     if not symbol:
         return jsonify({"error": "Symbol required"}), 400
+    error = market_router.series_error(symbol, interval)
+    if error:
+        return jsonify({"error": error}), 400
 
-    # Note: Scraper usually doesn't provide historical data easily.
-    # We will use Yahoo for everything for series OR return a simulated series for Morocco for the chart to work.
-    
-    morocco_symbols = ['IAM', 'ATW', 'BCP', 'Lafarge', 'ADI', 'CSR', 'HOL', 'MNG', 'WAA', 'SNE', 'TQB']
-    if symbol in morocco_symbols:
-        # MVP: Return empty or mock series for Morocco stocks if yfinance doesn't track them well
-        # Some BVC stocks are on Yahoo (e.g. IAM.MA), so let's try appending .MA
-        try:
-            # Try fetching with .MA suffix
-            data = market_service.get_series(f"{symbol}.MA", interval, period)
-            if data and len(data) > 0:
-                return jsonify(data)
-        except:
-            pass
-        
-        # FAILOVER: Generate a mock series rather than empty list, so the user sees a chart!
-        return jsonify(market_service._get_mock_series(symbol, interval))
-        
-    data = market_service.get_series(symbol, interval, period)
-    return jsonify(data)
+    # BVC tickers try Yahoo's .MA listing and fall back to a simulated series
+    bars = market_router.bars(symbol, interval, period)
+
+    # ?format=records (default) | columns | msgpack, or via Accept
+    fmt = negotiate_format()
+
+    # The digest hashes the cached columns; encoding only runs when it changed
+    etag = f"{symbol}-{interval}-{period}-{fmt}-{bars.digest()}"
+    return conditional(etag, lambda: series_response(bars, fmt))
+
+@market_bp.route('/indicators', methods=['GET'])
+def get_indicators():
+    """
+    /indicators?symbol=AAPL&interval=5m&period=1d&set=sma20,ema50,rsi14,macd,vwap,atr14&tail=
+    Columns aligned with `time` (null while an indicator warms up), computed
+    over the same cached series /series serves, plus each one's latest value.
+    `tail` keeps only the last N points.
+    """
+    symbol = request.args.get('symbol')
+    interval = request.args.get('interval', '1m')
+    period = request.args.get('period', '1d')
+    tail = request.args.get('tail', type=int)
+
+    if not symbol:
+        return jsonify({"error": "Symbol required"}), 400
+    error = market_router.series_error(symbol, interval)
+    if error:
+        return jsonify({"error": error}), 400
+    try:
+        specs = parse_set(request.args.get('set'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    bars = market_router.bars(symbol, interval, period)
+
+    def build():
+        instrument = market_router.instrument(symbol)
+        session = market_service._sessions.get(instrument.series_symbol, {})
+        result = indicator_engine.compute(
+            (symbol, interval, period), bars, specs,
+            gmtoffset=session.get('gmtoffset', 0),
+            step=INTERVAL_SECONDS.get(interval, 60)
+        )
+        cut = slice(-tail, None) if tail and tail > 0 else slice(None)
+        return json_response({
+            "symbol": symbol,
+            "interval": interval,
+            "period": period,
+            "time": bars.time[cut],
+            "close": bars.close[cut],
+            "indicators": {
+                spec: ({name: v[cut] for name, v in values.items()} if isinstance(values, dict) else values[cut])
+                for spec, values in result.items()
+            },
+            "latest": dict(latest(result), close=float(bars.close[-1]) if len(bars) else None),
+        })
+
+    # Same bars, same set -> same answer; the engine only runs when the digest moves
+    etag = f"{symbol}-{interval}-{period}-{','.join(specs)}-{tail}-{bars.digest()}"
+    return conditional(etag, build)
+
+@market_bp.route('/stats', methods=['GET'])
+def get_stats():
+    """Cache counters, per-upstream latency histograms, circuit breakers, indicator engine, provider gates, async client, shared quote table, prefetcher, stream and news state."""
+    return jsonify({
+        "quote_cache": quote_cache.stats(),
+        "series_cache": series_cache.stats(),
+        "indicators": indicator_engine.stats(),
+        "bar_store": bar_store.stats(),
+        "upstreams": http_client.stats(),
+        "breakers": http_client.breaker_stats(),
+        "prefetcher": prefetcher.stats(),
+        "stream": quote_hub.stats(),
+        "news": news_service.stats(),
+        "providers": market_router.stats(),
+        "shared_quotes": shared_quotes.stats(),
+        "async": async_market.stats(),
+        "tape": market_tape.stats()
+    })
@@ -1,10 +1,18 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint
 from models import Plan
+from services.conditional import conditional, content_versions
 
 plans_bp = Blueprint('plans', __name__)
 
+# Plans change only through admin edits; cap cross-worker staleness at 5 min
+content_versions.track(Plan, 'plans', max_stale=300)
+
 @plans_bp.route('/', methods=['GET'])
 def get_plans():
+    # 304 before touching the database when the client's copy is current
+    return conditional(content_versions.tag('plans'), _plans_payload)
+
+def _plans_payload():
     plans = Plan.query.all()
     output = []
     price_map = {
@@ -20,4 +28,4 @@ def get_plans():
             "price_dh": price_map.get(p.slug, p.price_dh),
             "features": p.get_features()
         })
-    return jsonify(output)
+    return output
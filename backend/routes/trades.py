@@ -1,12 +1,18 @@
 from flask import Blueprint, request, jsonify
 from models import db, Trade, Challenge
+from datetime import datetime
 from middleware import token_required
 from services.rules import rules_engine
-from services.market import market_service
-from services.morocco_scraper import morocco_scraper
+from services.market_router import market_router
+from services.positions import position_book
+from services.prefetcher import prefetcher
 
 trades_bp = Blueprint('trades', __name__)
 
+COMMISSION_RATE = 0.001 # 0.1% of notional
+MAX_BATCH_ORDERS = 50
+BATCH_QUOTE_TIMEOUT = 8 # seconds; orders whose quote is slower are rejected
+
 @trades_bp.route('/', methods=['POST'])
 @token_required
 def execute_trade(current_user):
@@ -23,23 +29,22 @@ def execute_trade(current_user):
     if challenge.status != 'active':
         return jsonify({"error": f"Challenge is {challenge.status}"}), 400
 
+    if side not in ('buy', 'sell') or qty <= 0:
+        return jsonify({"error": "Side must be buy or sell and qty positive"}), 400
+
     try:
-        # Get Current Price
-        # Check if Morocco stock
-        morocco_symbols = ['IAM', 'ATW', 'BCP', 'Lafarge']
-        if symbol in morocco_symbols:
-            quote = morocco_scraper.get_stock_price(symbol)
-        else:
-            quote = market_service.get_quote(symbol)
+        # Get Current Price (kept warm in memory by the prefetcher)
+        quote = market_router.quote(symbol)
             
-        if not quote:
-            return jsonify({"error": "Failed to get market price"}), 500
+        if not market_router.is_real(quote):
+            # Nothing cached while the upstream is throttled, or a simulated fallback: never fill at a made-up price
+            return jsonify({"error": "No live market price right now, try again shortly"}), 503
+        prefetcher.touch(symbol)
             
         price = quote['price']
         cost = price * qty
         
-        commission = cost * 0.001 # 0.1%
-        new_equity = challenge.equity - commission
+        commission = cost * COMMISSION_RATE
         
         # Create Trade
         trade = Trade(
@@ -50,7 +55,9 @@ def execute_trade(current_user):
             price=price
         )
         
-        challenge.equity = new_equity
+        # Update the net position (O(1)) and re-mark equity from the quote cache
+        position = position_book.fill(challenge, symbol, side, qty, price, commission)
+        new_equity = challenge.equity
         
         db.session.add(trade)
         db.session.commit()
@@ -65,6 +72,7 @@ def execute_trade(current_user):
                 "price": price, 
                 "commission": commission
             },
+            "position": position,
             "challenge_status": status,
             "new_equity": new_equity
         })
@@ -73,6 +81,107 @@ def execute_trade(current_user):
         loss_msg = traceback.format_exc()
         print(f"TRADE FAIL: {loss_msg}") # Log to terminal
         db.session.rollback()
+        position_book.discard(challenge.id)
+        return jsonify({"error": str(e), "details": loss_msg}), 500
+
+@trades_bp.route('/batch', methods=['POST'])
+@token_required
+def execute_batch(current_user):
+    """
+    Several orders for one challenge in one request:
+    {"challenge_id": 1, "orders": [{"symbol": "AAPL", "side": "buy", "qty": 2}, ...]}
+
+    Quotes are fetched concurrently, every fill goes in with one bulk insert
+    in one transaction, and the rules run once on the resulting equity.
+    Orders that fail validation or get no quote are rejected individually;
+    the rest fill. `results` has one entry per order, in request order.
+    """
+    data = request.json or {}
+    orders = data.get('orders')
+    if not isinstance(orders, list) or not orders:
+        return jsonify({"error": "orders must be a non-empty list"}), 400
+    if len(orders) > MAX_BATCH_ORDERS:
+        return jsonify({"error": f"At most {MAX_BATCH_ORDERS} orders per batch"}), 400
+
+    challenge = Challenge.query.get(data.get('challenge_id'))
+    if not challenge or challenge.user_id != current_user.id:
+        return jsonify({"error": "Challenge not found or unauthorized"}), 404
+
+    if challenge.status != 'active':
+        return jsonify({"error": f"Challenge is {challenge.status}"}), 400
+
+    results = [None] * len(orders)
+    valid = []  # (index, symbol, side, qty)
+    for i, order in enumerate(orders):
+        try:
+            symbol = str(order['symbol']).strip()
+            side = order.get('side')
+            qty = float(order.get('qty', 0))
+        except (KeyError, TypeError, ValueError, AttributeError):
+            results[i] = {"status": "rejected", "error": "Order needs symbol, side and qty"}
+            continue
+        if not symbol or side not in ('buy', 'sell') or qty <= 0:
+            results[i] = {"status": "rejected", "error": "Side must be buy or sell and qty positive"}
+            continue
+        valid.append((i, symbol, side, qty))
+
+    try:
+        # One concurrent quote fan-out for the distinct symbols
+        symbols = list(dict.fromkeys(symbol for _, symbol, _, _ in valid))
+        quotes, errors = market_router.quotes(symbols, BATCH_QUOTE_TIMEOUT) if symbols else ({}, {})
+        for symbol, quote in quotes.items():
+            if market_router.is_real(quote):
+                prefetcher.touch(symbol)
+
+        fills, rows, filled = [], [], []
+        unpriced = 0  # orders refused because only a simulated price was available
+        now = datetime.utcnow()
+        for i, symbol, side, qty in valid:
+            quote = quotes.get(symbol)
+            if not quote:
+                results[i] = {"status": "rejected", "symbol": symbol,
+                              "error": errors.get(symbol) or "Failed to get market price"}
+                continue
+            if not market_router.is_real(quote):
+                unpriced += 1
+                results[i] = {"status": "rejected", "symbol": symbol,
+                              "error": "No live market price right now, try again shortly"}
+                continue
+            price = quote['price']
+            commission = price * qty * COMMISSION_RATE
+            fills.append((symbol, side, qty, price, commission))
+            rows.append(dict(challenge_id=challenge.id, symbol=symbol, side=side, qty=qty, price=price, executed_at=now))
+            filled.append((i, symbol, side, qty, price, commission))
+
+        if fills:
+            positions = position_book.fill_many(challenge, fills)
+            db.session.execute(Trade.__table__.insert(), rows)
+            db.session.commit()
+            for (i, symbol, side, qty, price, commission), position in zip(filled, positions):
+                results[i] = {
+                    "status": "filled",
+                    "trade": {"symbol": symbol, "side": side, "qty": qty, "price": price, "commission": commission},
+                    "position": position,
+                }
+
+        if not fills and unpriced:
+            return jsonify({"error": "No live market price right now, try again shortly", "results": results}), 503
+
+        # One rules pass on the final state
+        status = rules_engine.evaluate_challenge(challenge.id) if fills else challenge.status
+
+        return jsonify({
+            "message": f"{len(fills)} of {len(orders)} orders executed",
+            "results": results,
+            "challenge_status": status,
+            "new_equity": challenge.equity
+        })
+    except Exception as e:
+        import traceback
+        loss_msg = traceback.format_exc()
+        print(f"BATCH TRADE FAIL: {loss_msg}") # Log to terminal
+        db.session.rollback()
+        position_book.discard(challenge.id)
         return jsonify({"error": str(e), "details": loss_msg}), 500
 
 @trades_bp.route('/', methods=['GET'])
@@ -95,3 +204,22 @@ def get_trades(current_user):
             "executed_at": t.executed_at.isoformat()
         })
     return jsonify(output)
+
+@trades_bp.route('/positions', methods=['GET'])
+@token_required
+def get_positions(current_user):
+    challenge_id = request.args.get('challenge_id')
+    if not challenge_id:
+        return jsonify({"error": "Challenge ID required"}), 400
+
+    challenge = Challenge.query.get(challenge_id)
+    if not challenge or challenge.user_id != current_user.id:
+        return jsonify({"error": "Challenge not found or unauthorized"}), 404
+
+    # Marked from memory: no trade history scan, no upstream calls
+    return jsonify({
+        "challenge_id": challenge.id,
+        "balance": position_book.balance(challenge),
+        "equity": position_book.equity(challenge),
+        "positions": position_book.positions(challenge, include_flat=request.args.get('all') == '1')
+    })
@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 from models import db, Challenge, Trade
 from middleware import token_required
 from services.evaluator import evaluate_challenge
+from services.positions import position_book
 import random
 
 trading_bp = Blueprint('trading', __name__)
@@ -35,7 +36,8 @@ def execute_trade(current_user):
         pnl_pct = random.uniform(0.01, 0.04) if is_win else random.uniform(0.01, 0.03)
         pnl = (challenge.equity * pnl_pct) if is_win else -(challenge.equity * pnl_pct)
         
-        # Apply PnL
+        # Apply PnL (realized at once: no position is left open)
+        challenge.balance = position_book.balance(challenge) + pnl
         challenge.equity += pnl
         
         # Log Trade
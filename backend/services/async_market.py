@@ -0,0 +1,265 @@
+"""
+Asyncio market-data path: many upstream fetches on one event loop.
+
+The blocking client pins a worker thread for every in-flight upstream call.
+Here, quote, series and BVC snapshot fetches are coroutines on a single
+background event loop (AsyncBridge). Flask handlers reach the loop through
+`async_bridge.run(coro, timeout)`, which blocks only the calling thread.
+Batch quotes, the prefetcher and the quote stream fan out through it.
+
+The async path shares everything else with the blocking one: the quote and
+series caches, the per-host latency histograms and circuit breakers, the
+market tape, and MarketService / MoroccoScraper parsing. Concurrent
+requests for the same key share one fetch.
+
+Uses httpx.AsyncClient when httpx is installed. Without it, each upstream
+GET runs the blocking HttpClient in the loop's default thread pool: still
+concurrent, but one thread per in-flight call again.
+"""
+import asyncio
+import concurrent.futures
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+from services.bar_store import Bars
+from services.circuit_breaker import CircuitOpenError
+from services.http_client import HttpClient, http_client
+from services.market import market_service
+from services.market_tape import market_tape
+from services.morocco_scraper import MoroccoScraper
+from services.quote_cache import quote_cache
+from services.series_cache import series_cache
+
+try:
+    import httpx
+except ImportError:  # optional, thread-pool fallback
+    httpx = None
+
+logger = logging.getLogger(__name__)
+logging.getLogger('httpx').setLevel(logging.WARNING)  # it logs every request at INFO
+
+
+class AsyncBridge:
+    """A daemon thread running one event loop, plus a sync entry point into it."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop = None
+
+    @property
+    def loop(self):
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(target=loop.run_forever, name='market-async', daemon=True).start()
+                    self._loop = loop
+        return self._loop
+
+    def run(self, coro, timeout=None):
+        """Run `coro` on the loop and wait for its result (TimeoutError after `timeout`)."""
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"Async market call timed out after {timeout}s")
+
+
+class AsyncHttpClient:
+    """
+    Async twin of HttpClient: same timeouts, per-host limits, histograms and breakers.
+
+    Each host gets several small httpx clients rather than one big pool:
+    httpcore rescans every pooled connection for each queued request, which
+    turns quadratic past a few dozen in-flight requests. Requests go to the
+    least busy shard.
+    """
+
+    SHARD_CONNECTIONS = 8  # connections per httpx client
+
+    def __init__(self):
+        self._hosts = {}  # host -> (asyncio.Semaphore, [[AsyncClient, in_flight], ...]) (loop thread only)
+
+    async def get(self, url, headers=None):
+        host = urlsplit(url).netloc
+        histogram, breaker = http_client.monitor(host)
+
+        if market_tape.replaying:
+            start = time.perf_counter()
+            try:
+                response, delay = market_tape.lookup(url)
+            except requests.RequestException:
+                histogram.record((time.perf_counter() - start) * 1000, error=True)
+                raise
+            if delay:
+                await asyncio.sleep(delay)
+            histogram.record((time.perf_counter() - start) * 1000, error=response.status_code >= 400)
+            return response
+
+        if httpx is None:
+            return await asyncio.get_running_loop().run_in_executor(None, lambda: http_client.get(url, headers=headers))
+
+        limit, shards = self._host(host)
+        async with limit:
+            # Ask the breaker only once a slot is held (see HttpClient.get)
+            if not breaker.allow():
+                raise CircuitOpenError(f"Circuit open for {host}")
+            start = time.perf_counter()  # upstream time only, not the wait for a slot
+            shard = min(shards, key=lambda entry: entry[1])
+            shard[1] += 1
+            try:
+                response = await shard[0].get(url, headers=headers)
+            except httpx.HTTPError as e:
+                histogram.record((time.perf_counter() - start) * 1000, error=True)
+                breaker.record_failure()
+                # Same exception family as the blocking client, so callers handle both alike
+                raise requests.ConnectionError(f"{host}: {str(e) or type(e).__name__}")
+            except BaseException:
+                breaker.release()  # cancelled or not an upstream outcome
+                raise
+            finally:
+                shard[1] -= 1
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        histogram.record(elapsed_ms, error=response.status_code >= 400)
+        if response.status_code >= 500 or response.status_code in HttpClient.BREAKER_STATUSES:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        if market_tape.recording:
+            market_tape.record(url, None, response.status_code, elapsed_ms, response.content)
+        return response
+
+    def _host(self, host):
+        entry = self._hosts.get(host)
+        if entry is None:
+            max_connections = HttpClient.HOST_LIMITS.get(host, HttpClient.MAX_CONNECTIONS)
+            per_shard = min(max_connections, self.SHARD_CONNECTIONS)
+            shards = [[self._build_client(per_shard), 0] for _ in range(-(-max_connections // per_shard))]
+            entry = self._hosts[host] = (asyncio.Semaphore(max_connections), shards)
+        return entry
+
+    def _build_client(self, max_connections):
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(HttpClient.READ_TIMEOUT, connect=HttpClient.CONNECT_TIMEOUT),
+            limits=limits,
+            transport=httpx.AsyncHTTPTransport(retries=HttpClient.RETRIES, limits=limits),
+        )
+
+
+class AsyncMarket:
+    """Coroutine versions of the Yahoo and BVC provider calls."""
+
+    def __init__(self):
+        self._flights = {}  # key -> asyncio.Future (loop thread only)
+        self.fetches = 0
+        self.coalesced = 0
+
+    def loading(self, key):
+        return key in self._flights
+
+    async def yahoo_quote(self, symbol, force=False):
+        """Cached quote, else one shared fetch. `force` skips the cache (prefetcher)."""
+        if not force:
+            quote = quote_cache.get(symbol)
+            if quote is not None:
+                return quote
+            error = quote_cache.failure(symbol)
+            if error is not None:
+                raise error
+
+        async def load():
+            response = await async_http.get(market_service._quote_url(symbol), headers=market_service.HEADERS)
+            quote = market_service._parse_quote(symbol, response)
+            quote_cache.set(symbol, quote, quote_cache.ttl_for(symbol))
+            return quote
+
+        try:
+            return await self._single_flight(('quote', symbol), load)
+        except Exception as e:
+            quote_cache.set_failure(symbol, e)
+            raise
+
+    async def bvc_quote(self, symbol):
+        if MoroccoScraper.snapshot_age() >= MoroccoScraper.CACHE_DURATION:
+            await self._single_flight(('bvc',), self._bvc_refresh)
+        return MoroccoScraper._cache['quotes'].get(symbol) or MoroccoScraper._mock_data(symbol)
+
+    async def bars(self, symbol, interval, period):
+        """Like MarketService.get_bars, with the upstream download done on the loop. Raises on failure."""
+        yahoo_range, _, fetch_interval = market_service._series_params(interval, period)
+        kind, since = series_cache.plan(symbol, fetch_interval, yahoo_range)
+
+        prefetched = {}
+        if kind == 'full':
+            window = f"range={yahoo_range}"
+        elif kind == 'delta':
+            window = f"period1={since}&period2={int(time.time())}"
+        if kind:
+            async def load():
+                url = market_service._series_url(symbol, fetch_interval, window)
+                response = await async_http.get(url, headers=market_service.HEADERS)
+                return market_service._parse_series(symbol, response)
+            try:
+                prefetched[kind] = await self._single_flight(('series', symbol, fetch_interval, kind), load)
+            except Exception:
+                if kind == 'full':
+                    raise
+                # A failed delta keeps serving cached bars, as in the blocking path
+                prefetched[kind] = Bars.empty()
+
+        # Merging into the cache takes the series lock, which a blocking request
+        # may hold across its own upstream call: do it off the loop.
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, lambda: market_service.get_bars(symbol, interval, period, prefetched))
+
+    async def refresh_quotes(self, symbols):
+        """Refetch many Yahoo quotes at once (prefetcher). Returns {symbol: error} for failures."""
+        results = await asyncio.gather(*(self.yahoo_quote(s, force=True) for s in symbols), return_exceptions=True)
+        return {s: r for s, r in zip(symbols, results) if isinstance(r, Exception)}
+
+    def stats(self):
+        return {
+            "engine": "httpx" if httpx is not None else "thread-pool",
+            "in_flight": len(self._flights),
+            "fetches": self.fetches,
+            "coalesced": self.coalesced,
+        }
+
+    async def _bvc_refresh(self):
+        now = time.time()
+        try:
+            response = await async_http.get(MoroccoScraper.BASE_URL, headers=MoroccoScraper.HEADERS)
+            quotes = MoroccoScraper._parse_snapshot(response)
+        except Exception as e:
+            logger.error(f"Scrape error: {str(e)}")
+            quotes = {}
+        return MoroccoScraper._swap(quotes, now)
+
+    async def _single_flight(self, key, factory):
+        """Await the fetch already running for `key`, or start it as its own task."""
+        task = self._flights.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._flights[key] = task
+            task.add_done_callback(lambda t: self._landed(key, t))
+            self.fetches += 1
+        else:
+            self.coalesced += 1
+        # A waiter that times out is cancelled on its own; the fetch carries on for the rest
+        return await asyncio.shield(task)
+
+    def _landed(self, key, task):
+        self._flights.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every waiter gave up
+
+async_bridge = AsyncBridge()
+async_http = AsyncHttpClient()
+async_market = AsyncMarket()
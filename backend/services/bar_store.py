@@ -0,0 +1,461 @@
+"""
+Columnar OHLCV history store.
+
+Each (symbol, interval) lives in its own directory:
+
+    <root>/<symbol>/<interval>/time.npy, open.npy, ... volume.npy   compacted, memory-mapped
+    <root>/<symbol>/<interval>/tail.bin                             append-only row log
+
+Reads slice the memory-mapped columns directly (no copy, no network).
+Appends go to the tail; once it grows past COMPACT_AT rows it is merged into
+the column files. The tail supersedes every compacted bar from its first
+timestamp onward, so re-sending the still-forming last bar just overrides it.
+
+Every gunicorn worker may write the same series. Appends, tail rewrites and
+compactions hold an exclusive flock on `<dir>/.lock` and start by reloading
+whatever another process changed (files are compared by inode, size and
+mtime). Reads stat the files and, if they changed, reload under a shared
+flock, so a reader never sees a half-written row or columns from two
+different compactions.
+
+A scheduled compaction (BarStore.start, every COMPACT_INTERVAL) merges every
+series on disk and drops bars older than the interval's RETENTION, so the
+column files don't only grow.
+
+Footprint: 6 columns x 8 bytes = 48 bytes per bar, i.e. ~48 MB on disk per
+million bars, paged in lazily by the OS. The same million bars as Python
+dicts (the old per-response format) take roughly 400-450 MB of heap.
+"""
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from urllib.parse import unquote
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, single-process use only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ('time', 'open', 'high', 'low', 'close', 'volume')
+COLUMN_DTYPES = {
+    'time': np.int64,
+    'open': np.float64,
+    'high': np.float64,
+    'low': np.float64,
+    'close': np.float64,
+    'volume': np.int64,
+}
+TAIL_DTYPE = np.dtype([(name, COLUMN_DTYPES[name]) for name in COLUMNS])
+
+DAY = 86400
+# Seconds of history kept per interval at compaction (about what Yahoo serves; None keeps everything)
+RETENTION = {
+    '1m': 8 * DAY, '2m': 60 * DAY, '5m': 60 * DAY, '15m': 60 * DAY, '30m': 60 * DAY,
+    '60m': 730 * DAY, '90m': 60 * DAY, '1h': 730 * DAY,
+}
+
+
+@contextmanager
+def _flock(path, shared=False):
+    """flock on `path` for the duration of the block, across processes (no-op without fcntl)."""
+    if fcntl is None:
+        yield
+        return
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)  # releases the lock
+
+
+def _signature(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+class Bars:
+    """A run of bars as parallel NumPy columns (views where possible)."""
+
+    __slots__ = COLUMNS
+
+    def __init__(self, time, open, high, low, close, volume):
+        self.time = time
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    @classmethod
+    def empty(cls):
+        return cls(*(np.empty(0, dtype=COLUMN_DTYPES[name]) for name in COLUMNS))
+
+    @classmethod
+    def from_records(cls, records):
+        """Build from a list of {"time", "open", ...} dicts."""
+        return cls(*(np.fromiter((r[name] for r in records), dtype=COLUMN_DTYPES[name], count=len(records))
+                     for name in COLUMNS))
+
+    @classmethod
+    def concat(cls, parts):
+        parts = [p for p in parts if len(p)]
+        if not parts:
+            return cls.empty()
+        if len(parts) == 1:
+            return parts[0]
+        return cls(*(np.concatenate([getattr(p, name) for p in parts]) for name in COLUMNS))
+
+    def __len__(self):
+        return len(self.time)
+
+    def slice(self, start, stop=None):
+        return Bars(*(getattr(self, name)[start:stop] for name in COLUMNS))
+
+    def between(self, start=None, end=None):
+        """Bars with start <= time <= end, found by binary search."""
+        lo = 0 if start is None else int(np.searchsorted(self.time, start, side='left'))
+        hi = len(self.time) if end is None else int(np.searchsorted(self.time, end, side='right'))
+        return self.slice(lo, hi)
+
+    def to_records(self):
+        """List of bar dicts, the shape the API has always returned."""
+        return [
+            {"time": t, "open": o, "high": h, "low": l, "close": c, "volume": v}
+            for t, o, h, l, c, v in zip(
+                self.time.tolist(), self.open.tolist(), self.high.tolist(),
+                self.low.tolist(), self.close.tolist(), self.volume.tolist()
+            )
+        ]
+
+    def digest(self):
+        """CRC32 over the raw columns; changes whenever any bar does. Cheap next to to_records()."""
+        crc = 0
+        for name in COLUMNS:
+            crc = zlib.crc32(np.ascontiguousarray(getattr(self, name)).data, crc)
+        return f"{len(self)}-{crc:08x}"
+
+    def _to_rows(self):
+        rows = np.empty(len(self), dtype=TAIL_DTYPE)
+        for name in COLUMNS:
+            rows[name] = getattr(self, name)
+        return rows
+
+    @classmethod
+    def _from_rows(cls, rows):
+        return cls(*(rows[name] for name in COLUMNS))
+
+
+class BarSeries:
+    """History for one (symbol, interval): compacted mmap columns + append-only tail."""
+
+    COMPACT_AT = 4096  # tail rows
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._main_sig = self._tail_sig = None
+        self._main = self._tail = Bars.empty()
+        # Nothing is created on disk until the first non-empty append
+        if os.path.isdir(path):
+            with _flock(self.lock_path, shared=True):
+                self._reload()
+
+    @property
+    def tail_path(self):
+        return os.path.join(self.path, 'tail.bin')
+
+    @property
+    def lock_path(self):
+        return os.path.join(self.path, '.lock')
+
+    def bars(self):
+        """Everything stored, oldest first. Zero-copy when the tail is empty."""
+        self._sync()
+        return self._merged()
+
+    def range(self, start=None, end=None):
+        """Bars with start <= time <= end."""
+        self._sync()
+        main, tail = self._main, self._tail
+        if not len(tail) or (end is not None and end < tail.time[0]):
+            return main.between(start, end)
+        cut = int(np.searchsorted(main.time, tail.time[0], side='left'))
+        return Bars.concat([main.slice(0, cut).between(start, end), tail.between(start, end)])
+
+    def last_time(self):
+        self._sync()
+        if len(self._tail):
+            return int(self._tail.time[-1])
+        if len(self._main):
+            return int(self._main.time[-1])
+        return None
+
+    def append(self, new):
+        """
+        Append bars sorted by time that run up to the latest bar. Anything
+        already stored at or after new.time[0] is superseded.
+        """
+        if not len(new):
+            return
+        os.makedirs(self.path, exist_ok=True)
+        with self._lock, _flock(self.lock_path):
+            self._reload()  # another worker may have appended or compacted
+            tail = self._tail
+            first = new.time[0]
+            if len(tail) and tail.time[0] < first:
+                keep = int(np.searchsorted(tail.time, first, side='left'))
+                if keep == len(tail):
+                    self._append_tail_file(new)
+                    self._tail = Bars.concat([tail, new])
+                else:
+                    self._tail = Bars.concat([tail.slice(0, keep), new])
+                    self._rewrite_tail_file()
+            else:
+                # New bars supersede the whole tail (and main from `first` on)
+                self._tail = Bars(*(np.array(getattr(new, name), dtype=COLUMN_DTYPES[name]) for name in COLUMNS))
+                self._rewrite_tail_file()
+
+            if len(self._tail) >= self.COMPACT_AT:
+                self._compact()
+
+    def compact(self, keep_after=None):
+        """
+        Merge the tail into the column files, optionally dropping bars before
+        `keep_after`. Returns False if there was nothing to do.
+        """
+        if not os.path.isdir(self.path):
+            return False
+        with self._lock, _flock(self.lock_path):
+            self._reload()
+            main = self._main
+            if not len(self._tail) and (keep_after is None or not len(main) or main.time[0] >= keep_after):
+                return False
+            self._compact(keep_after)
+            return True
+
+    def nbytes(self):
+        return sum(getattr(self._main, n).nbytes + getattr(self._tail, n).nbytes for n in COLUMNS)
+
+    # --- internals ---
+    def _merged(self):
+        main, tail = self._main, self._tail  # consistent snapshot; both are replaced, never mutated
+        if not len(tail):
+            return main
+        cut = int(np.searchsorted(main.time, tail.time[0], side='left'))
+        return Bars.concat([main.slice(0, cut), tail])
+
+    def _column_path(self, name):
+        return os.path.join(self.path, f'{name}.npy')
+
+    def _sync(self):
+        """Pick up changes other processes made since our last look (cheap: two stats)."""
+        if (_signature(self._column_path('time')) == self._main_sig
+                and _signature(self.tail_path) == self._tail_sig):
+            return
+        with self._lock, _flock(self.lock_path, shared=True):
+            self._reload()
+
+    def _reload(self):
+        """Reload whichever of main and tail changed on disk. Caller holds the flock."""
+        main_sig = _signature(self._column_path('time'))
+        if main_sig != self._main_sig:
+            self._main = self._load_main()
+            self._main_sig = main_sig
+        tail_sig = _signature(self.tail_path)
+        if tail_sig != self._tail_sig:
+            self._tail = self._load_tail()
+            self._tail_sig = tail_sig
+
+    def _load_main(self):
+        if not all(os.path.exists(self._column_path(n)) for n in COLUMNS):
+            return Bars.empty()
+        return Bars(*(np.load(self._column_path(n), mmap_mode='r') for n in COLUMNS))
+
+    def _load_tail(self):
+        if not os.path.exists(self.tail_path):
+            return Bars.empty()
+        rows = np.fromfile(self.tail_path, dtype=TAIL_DTYPE)
+        return Bars._from_rows(rows)
+
+    def _append_tail_file(self, bars):
+        with open(self.tail_path, 'ab') as f:
+            f.write(bars._to_rows().tobytes())
+        self._tail_sig = _signature(self.tail_path)
+
+    def _rewrite_tail_file(self):
+        tmp = self.tail_path + f'.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(self._tail._to_rows().tobytes())
+        os.replace(tmp, self.tail_path)
+        self._tail_sig = _signature(self.tail_path)
+
+    def _compact(self, keep_after=None):
+        merged = self._merged()
+        if keep_after is not None:
+            merged = merged.between(start=keep_after)
+
+        for name in COLUMNS:
+            tmp = self._column_path(name) + f'.{os.getpid()}.tmp.npy'
+            np.save(tmp, np.ascontiguousarray(getattr(merged, name), dtype=COLUMN_DTYPES[name]))
+            os.replace(tmp, self._column_path(name))
+
+        # Readers holding the old memmaps keep a valid view of the replaced files
+        self._main = self._load_main()
+        self._main_sig = _signature(self._column_path('time'))
+        self._tail = Bars.empty()
+        self._rewrite_tail_file()
+
+
+class BarStore:
+    """Registry of BarSeries under one root directory."""
+    COMPACT_INTERVAL = 3600  # seconds between scheduled compactions
+
+    def __init__(self, root=None):
+        self.root = root or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'bars')
+        self.compact_interval = self.COMPACT_INTERVAL
+        self._lock = threading.Lock()
+        self._series = {}  # (symbol, interval) -> BarSeries
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.compactions = 0
+        self.last_compaction = {}
+
+    def configure(self, root=None, compact_interval=None):
+        with self._lock:
+            if root and root != self.root:
+                self.root = root
+                self._series.clear()
+        if compact_interval:
+            self.compact_interval = compact_interval
+
+    def start(self):
+        """Scheduled compaction of every series on disk, with RETENTION applied."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='bar-compactor', daemon=True)
+        self._thread.start()
+        logger.info(f"Bar store compaction every {self.compact_interval}s")
+
+    def stop(self):
+        self._stop.set()
+
+    def series(self, symbol, interval):
+        """The BarSeries for (symbol, interval). Raises ValueError for names like '..'."""
+        key = (symbol, interval)
+        series = self._series.get(key)
+        if series is None:
+            with self._lock:
+                series = self._series.get(key)
+                if series is None:
+                    series = BarSeries(os.path.join(self.root, _safe(symbol), _safe(interval)))
+                    self._series[key] = series
+        return series
+
+    def release(self, symbol, interval):
+        """Drop the in-memory handle (and its mmaps); the files stay on disk."""
+        with self._lock:
+            self._series.pop((symbol, interval), None)
+
+    def append(self, symbol, interval, bars):
+        self.series(symbol, interval).append(bars)
+
+    def range(self, symbol, interval, start=None, end=None):
+        return self.series(symbol, interval).range(start, end)
+
+    def compact_all(self, keep_after=None, now=None):
+        """
+        Compact every series under the root, including ones this process never
+        opened. Without `keep_after`, each keeps its interval's RETENTION
+        window. Returns the number of series rewritten.
+        """
+        started = time.perf_counter()
+        now = now or time.time()
+        with self._lock:
+            opened = {s.path: s for s in self._series.values()}
+        compacted = 0
+        for path, interval in self._series_dirs():
+            cutoff = keep_after
+            if cutoff is None and RETENTION.get(interval):
+                cutoff = now - RETENTION[interval]
+            series = opened.get(path) or BarSeries(path)
+            try:
+                compacted += series.compact(cutoff)
+            except OSError as e:
+                logger.error(f"Compaction failed for {path}: {str(e)}")
+        self.compactions += 1
+        self.last_compaction = {
+            "compacted": compacted,
+            "ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+        return compacted
+
+    def stats(self):
+        with self._lock:
+            series = list(self._series.items())
+        return {
+            "root": self.root,
+            "series": len(series),
+            "bars": sum(len(s.bars()) for _, s in series),
+            "bytes": sum(s.nbytes() for _, s in series),
+            "compaction": {
+                "running": bool(self._thread and self._thread.is_alive()),
+                "interval": self.compact_interval,
+                "runs": self.compactions,
+                "last": self.last_compaction,
+            },
+        }
+
+    def _series_dirs(self):
+        """(path, interval) of every <root>/<symbol>/<interval> directory holding bars."""
+        try:
+            symbols = os.listdir(self.root)
+        except FileNotFoundError:
+            return
+        for symbol in symbols:
+            symbol_dir = os.path.join(self.root, symbol)
+            if not os.path.isdir(symbol_dir):
+                continue
+            for name in os.listdir(symbol_dir):
+                path = os.path.join(symbol_dir, name)
+                if os.path.exists(os.path.join(path, 'tail.bin')) or os.path.exists(os.path.join(path, 'time.npy')):
+                    yield path, unquote(name)
+
+    def _run(self):
+        from services.shared_quotes import shared_quotes
+
+        while not self._stop.wait(self.compact_interval):
+            # One compacting process per host is enough (the flock makes more merely wasteful)
+            if shared_quotes.enabled and not shared_quotes.try_elect():
+                continue
+            try:
+                self.compact_all()
+            except Exception as e:
+                logger.error(f"Bar store compaction crashed: {str(e)}")
+
+
+def _safe(name):
+    """
+    Filesystem-safe directory name for a symbol like ^GSPC or EURUSD=X: one
+    path component, anything but [A-Za-z0-9_-] %-escaped (dots included, so
+    a name can never be '.' or '..'). Raises ValueError for those and ''.
+    """
+    if not name or name in ('.', '..'):
+        raise ValueError(f"Invalid bar store name: {name!r}")
+    return re.sub(r'[^A-Za-z0-9_-]', lambda m: ''.join(f'%{b:02X}' for b in m.group().encode()), name)
+
+
+bar_store = BarStore()
@@ -0,0 +1,110 @@
+import threading
+import time
+from collections import deque
+
+import requests
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised instead of calling an upstream whose breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Per-upstream circuit breaker.
+
+    closed     calls go through; outcomes land in a rolling window. Once the
+               window holds MIN_CALLS results and the failure rate reaches
+               FAILURE_RATE, the breaker opens.
+    open       calls fail fast for OPEN_SECONDS (callers use fallback data).
+    half_open  up to HALF_OPEN_CALLS trial calls are let through; success
+               closes the breaker, failure re-opens it. Every allowed call
+               must end in record_success, record_failure or release, or
+               its trial is never given back.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    WINDOW = 20
+    MIN_CALLS = 5
+    FAILURE_RATE = 0.5
+    OPEN_SECONDS = 30
+    HALF_OPEN_CALLS = 1
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=self.WINDOW)  # True = failure
+        self.state = self.CLOSED
+        self.opened_at = None
+        self._trials = 0
+
+        self.rejected = 0
+        self.times_opened = 0
+
+    def allow(self):
+        """True if a call may go upstream now."""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.time() - self.opened_at < self.OPEN_SECONDS:
+                    self.rejected += 1
+                    return False
+                self.state = self.HALF_OPEN
+                self._trials = 0
+
+            if self.state == self.HALF_OPEN:
+                if self._trials >= self.HALF_OPEN_CALLS:
+                    self.rejected += 1
+                    return False
+                self._trials += 1
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.CLOSED
+                self._outcomes.clear()
+            self._outcomes.append(False)
+
+    def release(self):
+        """Give back a call allow() let through that ended without an upstream outcome."""
+        with self._lock:
+            if self.state == self.HALF_OPEN and self._trials > 0:
+                self._trials -= 1
+
+    def record_failure(self):
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._open()
+                return
+            self._outcomes.append(True)
+            if len(self._outcomes) >= self.MIN_CALLS and self._failure_rate() >= self.FAILURE_RATE:
+                self._open()
+
+    def snapshot(self):
+        with self._lock:
+            retry_in = None
+            if self.state == self.OPEN:
+                retry_in = round(max(0.0, self.OPEN_SECONDS - (time.time() - self.opened_at)), 1)
+            return {
+                "state": self.state,
+                "failure_rate": round(self._failure_rate(), 3),
+                "window": len(self._outcomes),
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+                "retry_in": retry_in,
+            }
+
+    # --- internals (caller holds self._lock) ---
+    def _failure_rate(self):
+        if not self._outcomes:
+            return 0.0
+        return sum(self._outcomes) / len(self._outcomes)
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.time()
+        self.times_opened += 1
+        self._outcomes.clear()
@@ -0,0 +1,84 @@
+"""
+Conditional GET support: weak ETags and 304 Not Modified.
+
+Handlers compute a cheap version tag for the resource before doing the
+expensive part (query, serialization). If the client's If-None-Match
+already holds that tag, they answer 304 with no body.
+
+Tags come either from the cached data itself (quote fields, Bars.digest())
+or, for database-backed resources, from ContentVersions: a per-resource
+counter bumped by SQLAlchemy ORM events on the models behind it.
+"""
+import os
+import threading
+import time
+import zlib
+
+from flask import Response, jsonify, make_response, request
+from sqlalchemy import event
+
+
+class ContentVersions:
+    """
+    Per-resource version counters, bumped on ORM writes in this process.
+
+    Writes made by other workers (or bulk SQL that skips ORM events) are not
+    seen here, so each tag also carries a time bucket of MAX_STALE seconds:
+    no client can be told "not modified" for longer than that after such a
+    write. The process boot token keeps two workers from issuing the same tag
+    for different states.
+    """
+
+    DEFAULT_MAX_STALE = 30  # seconds
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._max_stale = {}
+        self._boot = f"{os.getpid():x}{int(time.time()):x}"
+
+    def track(self, model, resource, max_stale=None):
+        """Bump `resource` whenever a `model` row is inserted, updated or deleted."""
+        if max_stale:
+            self._max_stale[resource] = max_stale
+        for name in ('after_insert', 'after_update', 'after_delete'):
+            event.listen(model, name, lambda *args: self.bump(resource))
+
+    def bump(self, resource):
+        with self._lock:
+            self._versions[resource] = self._versions.get(resource, 0) + 1
+
+    def tag(self, resource):
+        max_stale = self._max_stale.get(resource, self.DEFAULT_MAX_STALE)
+        bucket = int(time.time() // max_stale)
+        return f"{resource}-{self._boot}-{self._versions.get(resource, 0)}-{bucket}"
+
+    def stats(self):
+        with self._lock:
+            return dict(self._versions)
+
+
+def content_tag(*parts):
+    """Short tag from a few values, e.g. a quote's price fields."""
+    return f"{zlib.crc32('|'.join(map(str, parts)).encode()):08x}"
+
+
+def conditional(etag, build):
+    """
+    304 if the request's If-None-Match matches `etag` (weak comparison),
+    otherwise build() with the weak ETag attached. `build` only runs on a miss
+    and may return a ready Response or data to jsonify.
+    """
+    if request.if_none_match.contains_weak(etag):
+        response = make_response('', 304)
+    else:
+        response = build()
+        if not isinstance(response, Response):
+            response = jsonify(response)
+    response.set_etag(etag, weak=True)
+    # Let browsers keep the body but always revalidate
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+content_versions = ContentVersions()
@@ -0,0 +1,205 @@
+"""
+Streaming intraday drawdown per active challenge.
+
+Each challenge keeps three numbers for the current UTC day, updated in O(1)
+as equity values arrive (fills through the rules engine, marks from the
+revaluation job):
+
+    peak          highest equity seen today, seeded with the day's start
+                  equity (challenges.daily_start_equity)
+    drawdown      (peak - equity) / peak, as a percentage
+    max drawdown  largest drawdown seen today
+
+No trade or tick history is replayed. Updates only mark the challenge
+dirty; a background thread flushes the dirty ones to
+`daily_metrics.max_intraday_drawdown_pct` every FLUSH_INTERVAL seconds in
+one executemany UPDATE keyed by (challenge_id, date). The UPDATE keeps the
+larger of the stored and the new value, so several workers (each seeing
+its own fills) and restarts (which reseed the peak from the day start)
+never lower it. Without the thread (Vercel), `flush_if_due` flushes inline
+from the request once the interval has passed. Flushes run on their own
+connection (`db.engine.begin()`), never through the request's session.
+
+A challenge whose day changes is reseeded on its next update; a value not
+yet flushed for the previous day is carried over to the next flush.
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import bindparam, case, func
+
+from models import db, DailyMetrics
+
+logger = logging.getLogger(__name__)
+
+
+class _Watermark:
+    __slots__ = ('day', 'peak', 'drawdown', 'max_drawdown', 'dirty')
+
+    def __init__(self, day, peak):
+        self.day = day
+        self.peak = peak
+        self.drawdown = 0.0
+        self.max_drawdown = 0.0
+        self.dirty = False
+
+    def update(self, equity):
+        if equity > self.peak:
+            self.peak = equity
+            self.drawdown = 0.0
+            return
+        self.drawdown = (self.peak - equity) / self.peak * 100 if self.peak > 0 else 0.0
+        if self.drawdown > self.max_drawdown:
+            self.max_drawdown = self.drawdown
+            self.dirty = True
+
+
+class DrawdownTracker:
+    FLUSH_INTERVAL = 30  # seconds between flushes to daily_metrics
+
+    def __init__(self):
+        self.interval = self.FLUSH_INTERVAL
+        self._app = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._marks = {}  # challenge_id -> _Watermark for its current day
+        self._carry = {}  # (challenge_id, date) -> max drawdown of a past day not flushed yet
+        self._flushed_at = time.time()
+
+        self.updates = 0
+        self.flushes = 0
+        self.rows_flushed = 0
+
+    def configure(self, app, interval=None):
+        self._app = app
+        if interval:
+            self.interval = interval
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='drawdown-flusher', daemon=True)
+        self._thread.start()
+        logger.info(f"Drawdown tracker flushing every {self.interval}s")
+
+    def stop(self):
+        self._stop.set()
+
+    def update(self, challenge_id, equity, day_start=None, now=None):
+        """Feed one equity value. Returns the current drawdown (%)."""
+        today = (now or datetime.utcnow()).date()
+        with self._lock:
+            mark = self._mark(challenge_id, equity, day_start, today)
+            mark.update(equity)
+            self.updates += 1
+            return mark.drawdown
+
+    def update_many(self, challenge_ids, equities, day_starts, now=None):
+        """Feed a batch of equity values (the revaluation pass), one lock for all of them."""
+        today = (now or datetime.utcnow()).date()
+        with self._lock:
+            for challenge_id, equity, day_start in zip(challenge_ids, equities, day_starts):
+                self._mark(challenge_id, equity, day_start, today).update(equity)
+            self.updates += len(challenge_ids)
+
+    def snapshot(self, challenge_id, now=None):
+        """Today's peak, current and max drawdown for a challenge, or None if no equity was seen today."""
+        today = (now or datetime.utcnow()).date()
+        with self._lock:
+            mark = self._marks.get(challenge_id)
+            if mark is None or mark.day != today:
+                return None
+            return {
+                "peak_equity": mark.peak,
+                "drawdown_pct": round(mark.drawdown, 4),
+                "max_drawdown_pct": round(mark.max_drawdown, 4),
+            }
+
+    def flush(self, now=None):
+        """Write the dirty max drawdowns to daily_metrics (needs an app context). Returns rows sent."""
+        today = (now or datetime.utcnow()).date()
+        with self._lock:
+            pending = dict(self._carry)
+            self._carry = {}
+            for challenge_id, mark in list(self._marks.items()):
+                if mark.dirty:
+                    key = (challenge_id, mark.day)
+                    pending[key] = max(pending.get(key, 0.0), mark.max_drawdown)
+                    mark.dirty = False
+                elif mark.day != today:
+                    del self._marks[challenge_id]  # clean and stale: the challenge hasn't moved today
+            self._flushed_at = time.time()
+
+        if not pending:
+            return 0
+        table = DailyMetrics.__table__
+        stored = func.coalesce(table.c.max_intraday_drawdown_pct, 0.0)
+        value = bindparam('value', type_=table.c.max_intraday_drawdown_pct.type)
+        try:
+            # Own connection and transaction: an inline flush must not commit or
+            # roll back the request's session in the middle of its work
+            with db.engine.begin() as conn:
+                conn.execute(
+                    table.update()
+                    .where(table.c.challenge_id == bindparam('b_challenge_id'))
+                    .where(table.c.date == bindparam('b_date'))
+                    .values(max_intraday_drawdown_pct=case((stored >= value, stored), else_=value)),
+                    [{"b_challenge_id": cid, "b_date": day, "value": dd} for (cid, day), dd in pending.items()],
+                )
+        except Exception:
+            with self._lock:
+                # Try again next flush
+                for key, dd in pending.items():
+                    self._carry[key] = max(self._carry.get(key, 0.0), dd)
+            raise
+        self.flushes += 1
+        self.rows_flushed += len(pending)
+        return len(pending)
+
+    def flush_if_due(self):
+        """Inline flush for deployments without the background thread."""
+        if self._thread and self._thread.is_alive():
+            return 0
+        if time.time() - self._flushed_at < self.interval:
+            return 0
+        try:
+            return self.flush()
+        except Exception as e:
+            logger.error(f"Drawdown flush failed: {str(e)}")
+            return 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "running": bool(self._thread and self._thread.is_alive()),
+                "interval": self.interval,
+                "tracked": len(self._marks),
+                "dirty": sum(1 for mark in self._marks.values() if mark.dirty) + len(self._carry),
+                "updates": self.updates,
+                "flushes": self.flushes,
+                "rows_flushed": self.rows_flushed,
+            }
+
+    def _mark(self, challenge_id, equity, day_start, today):
+        mark = self._marks.get(challenge_id)
+        if mark is None or mark.day != today:
+            if mark is not None and mark.dirty:
+                key = (challenge_id, mark.day)
+                self._carry[key] = max(self._carry.get(key, 0.0), mark.max_drawdown)
+            mark = self._marks[challenge_id] = _Watermark(today, max(day_start or equity, equity))
+        return mark
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                with self._app.app_context():
+                    self.flush()
+            except Exception as e:
+                logger.error(f"Drawdown flush crashed: {str(e)}")
+
+
+drawdown_tracker = DrawdownTracker()
@@ -1,5 +1,7 @@
 from datetime import datetime
 from models import db, Challenge
+from services.rollover import daily_rollover
+from services.drawdown import drawdown_tracker
 
 def evaluate_challenge(challenge_id):
     """
@@ -13,39 +15,32 @@ def evaluate_challenge(challenge_id):
     if not challenge or challenge.status != 'active':
         return
 
-    # 1. Reset Daily Equity if new day
-    current_time = datetime.utcnow()
-    current_time = datetime.utcnow()
-    
-    # Initialize reset time if missing
-    if not challenge.last_daily_reset:
-        challenge.last_daily_reset = challenge.created_at or current_time
-        
-    if challenge.last_daily_reset.date() < current_time.date():
-        # It's a new day, update daily start equity
-        # In a real system, this would be the equity at approx 00:00 UTC
-        # For this logic, we assume the equity carries over
-        challenge.daily_start_equity = challenge.equity
-        challenge.last_daily_reset = current_time
-        db.session.commit() # Save reset state
-
-    # Ensure daily_start_equity is set (for new accounts)
-    if challenge.daily_start_equity is None:
-        challenge.daily_start_equity = challenge.start_balance
+    # Daily start equity is precomputed by the daily rollover (rolled inline if the job hasn't yet)
+    daily_start_equity = daily_rollover.day_start(challenge)
 
+    # Intraday high-water mark and drawdown (flushed to daily_metrics in batches)
+    drawdown_tracker.update(challenge.id, challenge.equity, daily_start_equity)
+    try:
+        return _apply_rules(challenge, daily_start_equity)
+    finally:
+        # After the status commit, on its own connection (see drawdown.py)
+        drawdown_tracker.flush_if_due()
+
+
+def _apply_rules(challenge, daily_start_equity):
     # --- RULES EVALUATION ---
-    
+
     # 1. Max Total Loss (10%)
-    # Fail if equity drops below 90% of start balance
-    if challenge.equity < (challenge.start_balance * 0.90):
+    # Fail at or below 90% of start balance (same thresholds as rules.py and revaluation.py)
+    if challenge.equity <= (challenge.start_balance * 0.90):
         challenge.status = 'failed'
         challenge.failed_at = datetime.utcnow()
         db.session.commit()
         return {'status': 'failed', 'reason': 'Max Total Loss Exceeded'}
 
     # 2. Max Daily Loss (5%)
-    # Fail if equity drops below 95% of DAILY START equity
-    if challenge.equity < (challenge.daily_start_equity * 0.95):
+    # Fail at or below 95% of DAILY START equity
+    if challenge.equity <= (daily_start_equity * 0.95):
         challenge.status = 'failed'
         challenge.failed_at = datetime.utcnow()
         db.session.commit()
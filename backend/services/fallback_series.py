@@ -0,0 +1,101 @@
+"""
+Deterministic simulated OHLCV series for when upstreams are unavailable.
+
+The walk is cut into chunks of CHUNK bars on a grid anchored at the epoch.
+Each chunk is seeded by (symbol, interval, chunk index): its end points
+("knots") are drawn around the base price and a Brownian bridge joins them.
+The same window therefore always renders the same chart in every process.
+Windows are assembled from cached chunks, so as time advances only the new
+chunk is generated, never the whole window.
+"""
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from services.bar_store import Bars
+from services.series_cache import INTERVAL_SECONDS
+
+DAY = 86400
+
+
+class FallbackSeries:
+    CHUNK = 256  # bars per seeded chunk
+    DAILY_VOL = 0.02  # ~2% daily moves, scaled by sqrt(bar length)
+    MAX_KNOT_SD = 0.15  # knots stay within a plausible band around the base price
+    MAX_CHUNKS = 1024
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._chunks = OrderedDict()  # (symbol, interval, base_price, index) -> (close, high, low, volume)
+
+    def bars(self, symbol, interval, base_price, points=60, end=None):
+        """The `points` bars ending at the bar containing `end` (default: now)."""
+        step = INTERVAL_SECONDS.get(interval, 3600)
+        last = int((end if end is not None else time.time()) // step)
+        first = last - points + 1
+
+        # One extra bar before the window so the first open is the previous close
+        lo_chunk, hi_chunk = (first - 1) // self.CHUNK, last // self.CHUNK
+        parts = [self._chunk(symbol, interval, base_price, c) for c in range(lo_chunk, hi_chunk + 1)]
+        close, high, low, volume = (np.concatenate([p[i] for p in parts]) for i in range(4))
+
+        offset = first - lo_chunk * self.CHUNK
+        sl = slice(offset, offset + points)
+        open_ = close[offset - 1:offset - 1 + points]
+        close, high, low, volume = close[sl], high[sl], low[sl], volume[sl]
+
+        return Bars(
+            np.arange(first, last + 1, dtype=np.int64) * step,
+            np.round(open_, 2),
+            np.round(np.maximum(high, np.maximum(open_, close)), 2),
+            np.round(np.minimum(low, np.minimum(open_, close)), 2),
+            np.round(close, 2),
+            volume,
+        )
+
+    def _chunk(self, symbol, interval, base_price, index):
+        key = (symbol, interval, base_price, index)
+        with self._lock:
+            chunk = self._chunks.get(key)
+            if chunk is not None:
+                self._chunks.move_to_end(key)
+                return chunk
+
+        chunk = self._generate(symbol, interval, base_price, index)
+        with self._lock:
+            self._chunks[key] = chunk
+            while len(self._chunks) > self.MAX_CHUNKS:
+                self._chunks.popitem(last=False)
+        return chunk
+
+    def _generate(self, symbol, interval, base_price, index):
+        step = INTERVAL_SECONDS.get(interval, 3600)
+        sigma = self.DAILY_VOL * np.sqrt(step / DAY)
+        knot_sd = min(self.MAX_KNOT_SD, sigma * np.sqrt(self.CHUNK))
+        n = self.CHUNK
+
+        start_knot = _rng(symbol, interval, 'knot', index).normal(0.0, knot_sd)
+        end_knot = _rng(symbol, interval, 'knot', index + 1).normal(0.0, knot_sd)
+
+        rng = _rng(symbol, interval, 'bars', index)
+        walk = np.cumsum(rng.normal(0.0, sigma, n))
+        frac = np.arange(1, n + 1) / n
+        # Brownian bridge pinned to both knots: bar n-1 of this chunk lands on the next knot
+        log_price = start_knot + frac * (end_knot - start_knot) + (walk - frac * walk[-1])
+
+        close = base_price * np.exp(log_price)
+        wick = np.abs(rng.normal(0.0, sigma / 2, (2, n)))
+        high = close * (1 + wick[0])
+        low = close * (1 - wick[1])
+        volume = rng.integers(1000, 50000, n, dtype=np.int64)
+        return close, high, low, volume
+
+
+def _rng(symbol, interval, kind, index):
+    return np.random.default_rng(zlib.crc32(f"{symbol}|{interval}|{kind}|{index}".encode()))
+
+
+fallback_series = FallbackSeries()
@@ -0,0 +1,125 @@
+"""
+HTML table extraction for the scrapers.
+
+Parsing backend is picked at import time: selectolax, then lxml, then
+BeautifulSoup's html.parser (always available). Override with
+SCRAPER_PARSER=selectolax|lxml|html.parser.
+"""
+import logging
+import os
+
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as _SelectolaxParser
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser as _SelectolaxParser  # selectolax < 1.0
+    except ImportError:
+        _SelectolaxParser = None
+
+try:
+    import lxml.html as _lxml_html
+except ImportError:
+    _lxml_html = None
+
+
+def _rows_selectolax(html):
+    tree = _SelectolaxParser(html)
+    rows = []
+    for tr in tree.css('tr'):
+        cells = [td.text(strip=True) for td in tr.css('td')]
+        if cells:
+            rows.append(cells)
+    return rows
+
+
+def _rows_lxml(html):
+    tree = _lxml_html.fromstring(html)
+    rows = []
+    for tr in tree.iter('tr'):
+        cells = [td.text_content().strip() for td in tr.iterchildren('td')]
+        if cells:
+            rows.append(cells)
+    return rows
+
+
+def _rows_html_parser(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    rows = []
+    for tr in soup.find_all('tr'):
+        cells = [td.get_text(strip=True) for td in tr.find_all('td')]
+        if cells:
+            rows.append(cells)
+    return rows
+
+
+BACKENDS = {'html.parser': _rows_html_parser}
+if _lxml_html is not None:
+    BACKENDS['lxml'] = _rows_lxml
+if _SelectolaxParser is not None:
+    BACKENDS['selectolax'] = _rows_selectolax
+
+
+def _pick_backend():
+    requested = os.getenv('SCRAPER_PARSER')
+    if requested:
+        if requested in BACKENDS:
+            return requested
+        logger.warning(f"SCRAPER_PARSER={requested} not installed, falling back")
+    for name in ('selectolax', 'lxml', 'html.parser'):
+        if name in BACKENDS:
+            return name
+
+
+BACKEND = _pick_backend()
+
+
+def parse_rows(html, backend=None):
+    """Return the text of every <td> cell, one list per <tr> that has cells."""
+    return BACKENDS[backend or BACKEND](html)
+
+
+class RowIndex:
+    """
+    Name/ticker -> row lookup built once per document.
+
+    Rows are keyed by their first cell (upper-cased). Tickers from `name_map`
+    resolve by exact name, or by the first row whose name contains the mapped
+    name (the page sometimes adds suffixes like "MAROC" or "S.A").
+    """
+
+    def __init__(self, rows, name_map=None):
+        self.by_name = {}
+        for cells in rows:
+            key = cells[0].upper()
+            if key and key not in self.by_name:
+                self.by_name[key] = cells
+
+        self.by_ticker = {}
+        claimed = set()
+        for ticker, name in (name_map or {}).items():
+            name = name.upper()
+            if name in self.by_name and name not in claimed:
+                self.by_ticker[ticker] = self.by_name[name]
+                claimed.add(name)
+                continue
+            for row_name, cells in self.by_name.items():
+                if name in row_name and row_name not in claimed:
+                    self.by_ticker[ticker] = cells
+                    claimed.add(row_name)
+                    break
+        self._claimed = claimed
+
+    def get(self, key):
+        """Lookup by ticker first, then by displayed name."""
+        return self.by_ticker.get(key) or self.by_name.get(key.upper())
+
+    def items(self):
+        """(key, cells) for every row: mapped tickers first, then unmapped names."""
+        yield from self.by_ticker.items()
+        for name, cells in self.by_name.items():
+            if name not in self._claimed:
+                yield name, cells
@@ -0,0 +1,211 @@
+import bisect
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from services.market_tape import market_tape
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (milliseconds). Cheap enough to record every call."""
+
+    BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = [0] * (len(self.BUCKETS_MS) + 1)  # last bucket is +Inf
+        self.total = 0
+        self.sum_ms = 0.0
+        self.errors = 0
+
+    def record(self, elapsed_ms, error=False):
+        idx = bisect.bisect_left(self.BUCKETS_MS, elapsed_ms)
+        with self._lock:
+            self.counts[idx] += 1
+            self.total += 1
+            self.sum_ms += elapsed_ms
+            if error:
+                self.errors += 1
+
+    def percentile(self, pct):
+        """Upper bound of the bucket holding the pct-th sample (None if empty)."""
+        with self._lock:
+            if not self.total:
+                return None
+            rank = self.total * pct / 100.0
+            seen = 0
+            for idx, count in enumerate(self.counts):
+                seen += count
+                if seen >= rank:
+                    return self.BUCKETS_MS[idx] if idx < len(self.BUCKETS_MS) else float('inf')
+        return None
+
+    def snapshot(self):
+        with self._lock:
+            buckets = {f"le_{b}": c for b, c in zip(self.BUCKETS_MS, self.counts)}
+            buckets["le_inf"] = self.counts[-1]
+            total, sum_ms, errors = self.total, self.sum_ms, self.errors
+        return {
+            "count": total,
+            "errors": errors,
+            "avg_ms": round(sum_ms / total, 2) if total else None,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "buckets": buckets,
+        }
+
+
+class HttpClient:
+    """
+    Shared outbound HTTP layer for market data and scraping.
+
+    One pooled keep-alive Session per upstream host, so repeat calls reuse the
+    TCP/TLS connection. Each host gets its own connection limit, retries with
+    backoff on connection failures, separate connect/read timeouts, a latency
+    histogram and a circuit breaker that fails fast while the host is down.
+    With MARKET_TAPE_MODE set, responses are recorded to or replayed from the
+    market tape (see market_tape.py).
+    """
+
+    # Worst case of one get() must stay under QuoteCache.FLIGHT_TIMEOUT (10s), or
+    # followers give up on a leader that is still fetching:
+    #   slot wait 0.5 + failed connect 2 + retried connect 2 + read 5 = 9.5s
+    # So only connection failures are retried (nothing was sent, and they fail
+    # fast); read timeouts and 5xx/429 answers go straight to the breaker.
+    SLOT_TIMEOUT = 0.5
+    CONNECT_TIMEOUT = 2
+    READ_TIMEOUT = 5
+    MAX_CONNECTIONS = 10  # concurrent requests (and pooled connections) per host
+    HOST_LIMITS = {
+        'www.leboursier.ma': 4,  # be gentle with the scraping target
+    }
+    RETRIES = 1  # connect retries
+    BACKOFF_FACTOR = 0.3  # no sleep before the first retry (urllib3)
+    # Responses that mean the upstream is unhealthy or blocking us (404 etc. are not)
+    BREAKER_STATUSES = (403, 429)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = {}  # host -> Session
+        self._limits = {}  # host -> BoundedSemaphore
+        self._histograms = {}  # host -> LatencyHistogram
+        self._breakers = {}  # host -> CircuitBreaker
+
+    def get(self, url, headers=None, params=None, timeout=None):
+        """GET `url` through the pooled session for its host. Returns the Response."""
+        host = urlsplit(url).netloc
+        session = self._session_for(host)
+        histogram = self._histograms[host]
+        limit = self._limits[host]
+        breaker = self._breakers[host]
+
+        if market_tape.replaying:
+            # Offline load tests: answer from the recorded tape, never the network
+            start = time.perf_counter()
+            try:
+                response = market_tape.replay(url, params)
+            except requests.RequestException:
+                histogram.record((time.perf_counter() - start) * 1000, error=True)
+                raise
+            histogram.record((time.perf_counter() - start) * 1000, error=response.status_code >= 400)
+            return response
+
+        # Slot first: waiting for a local slot says nothing about the upstream (no
+        # breaker or latency sample) and must not use up the half-open trial
+        if not limit.acquire(timeout=self.SLOT_TIMEOUT):
+            raise requests.ConnectionError(f"Connection limit reached for {host}")
+        try:
+            if not breaker.allow():
+                raise CircuitOpenError(f"Circuit open for {host}")
+            start = time.perf_counter()
+            try:
+                response = session.get(
+                    url,
+                    headers=headers,
+                    params=params,
+                    timeout=timeout or (self.CONNECT_TIMEOUT, self.READ_TIMEOUT)
+                )
+            except requests.RequestException:
+                histogram.record((time.perf_counter() - start) * 1000, error=True)
+                breaker.record_failure()
+                raise
+            except BaseException:
+                breaker.release()  # not an upstream outcome
+                raise
+        finally:
+            limit.release()
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        histogram.record(elapsed_ms, error=response.status_code >= 400)
+        if response.status_code >= 500 or response.status_code in self.BREAKER_STATUSES:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        if market_tape.recording:
+            market_tape.record(url, params, response.status_code, elapsed_ms, response.content)
+        return response
+
+    def monitor(self, host):
+        """(LatencyHistogram, CircuitBreaker) for `host`, shared with the async client."""
+        self._session_for(host)
+        return self._histograms[host], self._breakers[host]
+
+    def stats(self):
+        with self._lock:
+            histograms = dict(self._histograms)
+        return {host: h.snapshot() for host, h in histograms.items()}
+
+    def breaker_stats(self):
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {host: b.snapshot() for host, b in breakers.items()}
+
+    def _session_for(self, host):
+        session = self._sessions.get(host)
+        if session is not None:
+            return session
+
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                max_connections = self.HOST_LIMITS.get(host, self.MAX_CONNECTIONS)
+                session = self._build_session(max_connections)
+                self._limits[host] = threading.BoundedSemaphore(max_connections)
+                self._histograms[host] = LatencyHistogram()
+                self._breakers[host] = CircuitBreaker(host)
+                self._sessions[host] = session  # publish last: get() reads it unlocked
+                logger.info(f"Opened pooled HTTP session for {host}")
+            return session
+
+    def _build_session(self, max_connections):
+        retry = Retry(
+            total=self.RETRIES,
+            connect=self.RETRIES,
+            read=0,
+            status=0,
+            other=0,
+            backoff_factor=self.BACKOFF_FACTOR,
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=max_connections,
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+
+http_client = HttpClient()
@@ -0,0 +1,296 @@
+"""
+Technical indicators over cached OHLCV series (GET /api/market/indicators).
+
+    sma<n>   simple moving average of close             (sma20)
+    ema<n>   exponential moving average, SMA-seeded      (ema50)
+    rsi<n>   Wilder RSI                                  (rsi14)
+    macd     MACD 12/26/9: macd, signal, hist
+    vwap     volume-weighted average price, reset each exchange day (intraday)
+    atr<n>   Wilder average true range                   (atr14)
+
+Everything is NumPy over the Bars columns. Recursive averages (EMA, Wilder)
+use the closed form y[i] = w^(i+1)*y[-1] + a*w^i*cumsum(x*w^-j), evaluated in
+blocks short enough that w^-j stays in float range. So there is no per-bar
+Python loop.
+
+Incremental: each (symbol, interval, period, indicator) keeps its output
+columns. When the series gains bars, only bars after the last *closed* bar
+of the previous run are computed (the last bar may have still been forming),
+continuing from the saved averages. A repeat request for the same bars is a
+dict lookup. Values during an indicator's warm-up are NaN (null in JSON).
+"""
+import logging
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SET = ('sma20', 'ema50', 'rsi14', 'macd', 'vwap', 'atr14')
+DEFAULT_PERIODS = {'sma': 20, 'ema': 20, 'rsi': 14, 'atr': 14}
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+MAX_PERIOD = 500
+INTRADAY_MAX = 4 * 3600  # seconds per bar up to which VWAP resets daily
+
+SPEC = re.compile(r'^(sma|ema|rsi|atr)(\d*)$|^(macd|vwap)$')
+
+
+def parse_set(raw):
+    """'sma20,ema50,macd' -> ['sma20', 'ema50', 'macd']. Raises ValueError on unknown names."""
+    names = [s.strip().lower() for s in (raw or '').split(',') if s.strip()] or list(DEFAULT_SET)
+    specs = []
+    for name in dict.fromkeys(names):
+        match = SPEC.match(name)
+        if not match:
+            raise ValueError(f"Unknown indicator '{name}'")
+        kind, period = match.group(1), match.group(2)
+        if kind and not period:
+            name = f"{kind}{DEFAULT_PERIODS[kind]}"
+        elif kind and not 1 < int(period) <= MAX_PERIOD:
+            raise ValueError(f"{kind} period must be between 2 and {MAX_PERIOD}")
+        specs.append(name)
+    return list(dict.fromkeys(specs))
+
+
+# --- recursive averages ---
+
+def ema_run(x, alpha, prev):
+    """y[i] = alpha*x[i] + (1-alpha)*y[i-1], continuing from y[-1] = prev."""
+    w = 1.0 - alpha
+    if w <= 0.0:
+        return x.astype(np.float64, copy=True)
+    out = np.empty(len(x))
+    block = max(1, int(36.0 / -np.log(w)))  # keeps w**-j below ~4e15
+    for start in range(0, len(x), block):
+        chunk = x[start:start + block]
+        k = np.arange(len(chunk))
+        out[start:start + len(chunk)] = w ** (k + 1) * prev + alpha * w ** k * np.cumsum(chunk * w ** -k)
+        prev = out[start + len(chunk) - 1]
+    return out
+
+
+def ema_full(x, alpha, n):
+    """EMA seeded with the mean of the first n valid values; NaN before that."""
+    out = np.full(len(x), np.nan)
+    valid = np.flatnonzero(np.isfinite(x))
+    if not len(valid) or len(x) - valid[0] < n:
+        return out
+    seed = valid[0] + n - 1
+    out[seed] = x[valid[0]:seed + 1].mean()
+    out[seed + 1:] = ema_run(x[seed + 1:], alpha, out[seed])
+    return out
+
+
+def ema_tail(x, alpha, n, start, prev):
+    """EMA of x[start:], continuing from prev[start - 1] once it is past warm-up."""
+    if start and np.isfinite(prev[start - 1]):
+        return ema_run(x[start:], alpha, prev[start - 1])
+    return ema_full(x, alpha, n)[start:]
+
+
+# --- indicators: (bars, start, previous columns, n, context) -> columns for bars[start:] ---
+
+def _sma(bars, start, prev, n, ctx):
+    close = bars.close
+    lo = max(0, start - n + 1)
+    csum = np.concatenate(([0.0], np.cumsum(close[lo:], dtype=np.float64)))
+    out = np.full(len(close) - start, np.nan)
+    first = max(start, n - 1)
+    idx = np.arange(first, len(close)) - lo + 1
+    out[first - start:] = (csum[idx] - csum[idx - n]) / n
+    return {'sma': out}
+
+
+def _ema(bars, start, prev, n, ctx):
+    return {'ema': ema_tail(bars.close, 2.0 / (n + 1), n, start, prev.get('ema'))}
+
+
+def _rsi(bars, start, prev, n, ctx):
+    close = bars.close
+    delta = np.diff(close, prepend=np.nan)
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    gain[0] = loss[0] = np.nan  # no change before the first bar
+    alpha = 1.0 / n
+    avg_gain = ema_tail(gain, alpha, n, start, prev.get('avg_gain'))
+    avg_loss = ema_tail(loss, alpha, n, start, prev.get('avg_loss'))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = np.where(avg_loss == 0, 100.0, 100.0 - 100.0 / (1.0 + avg_gain / avg_loss))
+    rsi[~np.isfinite(avg_gain)] = np.nan
+    return {'rsi': rsi, 'avg_gain': avg_gain, 'avg_loss': avg_loss}
+
+
+def _macd(bars, start, prev, n, ctx):
+    close = bars.close
+    fast = ema_tail(close, 2.0 / (MACD_FAST + 1), MACD_FAST, start, prev.get('fast'))
+    slow = ema_tail(close, 2.0 / (MACD_SLOW + 1), MACD_SLOW, start, prev.get('slow'))
+    macd = fast - slow
+    # The signal line averages the MACD line itself, so it needs the whole column
+    full_macd = np.concatenate((prev['macd'][:start], macd)) if start else macd
+    signal = ema_tail(full_macd, 2.0 / (MACD_SIGNAL + 1), MACD_SIGNAL, start, prev.get('signal'))
+    return {'macd': macd, 'signal': signal, 'hist': macd - signal, 'fast': fast, 'slow': slow}
+
+
+def _vwap(bars, start, prev, n, ctx):
+    typical = (bars.high[start:] + bars.low[start:] + bars.close[start:]) / 3.0
+    volume = bars.volume[start:].astype(np.float64)
+    if ctx['intraday']:
+        day = (bars.time[start:] + ctx['gmtoffset']) // 86400
+    else:
+        day = np.zeros(len(typical), dtype=np.int64)
+
+    carry_pv = carry_v = 0.0
+    if start and len(day) and prev['day'][start - 1] == day[0]:
+        carry_pv, carry_v = prev['cum_pv'][start - 1], prev['cum_v'][start - 1]
+    cum_pv = np.cumsum(typical * volume) + carry_pv
+    cum_v = np.cumsum(volume) + carry_v
+
+    # Restart the sums each day: subtract the running total reached before the day's first
+    # bar. Totals never decrease, so a running max carries each day's offset forward.
+    new_day = np.flatnonzero(np.diff(day)) + 1
+    if len(new_day):
+        offset_pv = np.zeros(len(day))
+        offset_v = np.zeros(len(day))
+        offset_pv[new_day] = cum_pv[new_day - 1]
+        offset_v[new_day] = cum_v[new_day - 1]
+        cum_pv -= np.maximum.accumulate(offset_pv)
+        cum_v -= np.maximum.accumulate(offset_v)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vwap = np.where(cum_v > 0, cum_pv / cum_v, np.nan)
+    return {'vwap': vwap, 'cum_pv': cum_pv, 'cum_v': cum_v, 'day': day}
+
+
+def _atr(bars, start, prev, n, ctx):
+    high, low, close = bars.high, bars.low, bars.close
+    prev_close = np.concatenate(([np.nan], close[:-1]))
+    tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    return {'atr': ema_tail(tr, 1.0 / n, n, start, prev.get('atr'))}
+
+
+INDICATORS = {
+    'sma': (_sma, ('sma',)),
+    'ema': (_ema, ('ema',)),
+    'rsi': (_rsi, ('rsi',)),
+    'macd': (_macd, ('macd', 'signal', 'hist')),
+    'vwap': (_vwap, ('vwap',)),
+    'atr': (_atr, ('atr',)),
+}
+
+
+class _Entry:
+    __slots__ = ('time', 'last', 'columns')
+
+    def __init__(self, time, last, columns):
+        self.time = time  # bar times the columns cover
+        self.last = last  # last bar's values; it may change while the bar forms
+        self.columns = columns
+
+
+class IndicatorEngine:
+    MAX_ENTRIES = 1024
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (symbol, interval, period, spec) -> _Entry
+
+        self.hits = 0
+        self.incremental = 0
+        self.full = 0
+        self.bars_computed = 0
+
+    def compute(self, key, bars, specs, gmtoffset=0, step=60):
+        """
+        {spec: array or {name: array}} aligned with bars.time, for each spec.
+        `key` identifies the series (symbol, interval, period); `step` is its
+        bar size in seconds and `gmtoffset` the exchange offset (VWAP days).
+        """
+        ctx = {'gmtoffset': gmtoffset, 'intraday': step <= INTRADAY_MAX}
+        last = _last_bar(bars)
+        result = {}
+        for spec in specs:
+            kind, n = _split(spec)
+            fn, outputs = INDICATORS[kind]
+            columns = self._columns(key + (spec,), bars, last, fn, n, ctx)
+            result[spec] = columns[outputs[0]] if len(outputs) == 1 else {name: columns[name] for name in outputs}
+        return result
+
+    def stats(self):
+        with self._lock:
+            entries = len(self._entries)
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "incremental": self.incremental,
+            "full": self.full,
+            "bars_computed": self.bars_computed,
+        }
+
+    def _columns(self, key, bars, last, fn, n, ctx):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is not None and len(entry.time) == len(bars) and entry.last == last \
+                and len(bars) and entry.time[0] == bars.time[0]:
+            self.hits += 1
+            return entry.columns
+
+        start, prev = self._resume_point(entry, bars)
+        tail = fn(bars, start, prev, n, ctx)
+        if start:
+            columns = {name: np.concatenate((prev[name][:start], values)) for name, values in tail.items()}
+            self.incremental += 1
+        else:
+            columns = tail
+            self.full += 1
+        self.bars_computed += len(bars) - start
+
+        with self._lock:
+            self._entries[key] = _Entry(bars.time.copy(), last, columns)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.MAX_ENTRIES:
+                self._entries.popitem(last=False)
+        return columns
+
+    @staticmethod
+    def _resume_point(entry, bars):
+        """(index of the first bar to compute, previous columns re-aligned to bars)."""
+        if entry is None or len(entry.time) < 2 or not len(bars):
+            return 0, {}
+        closed = entry.time[-2]  # last bar that can't have changed since
+        offset = int(np.searchsorted(entry.time, bars.time[0]))
+        stop = int(np.searchsorted(bars.time, closed))
+        if offset >= len(entry.time) - 1 or entry.time[offset] != bars.time[0] \
+                or stop >= len(bars) or bars.time[stop] != closed:
+            return 0, {}  # window moved back, or the bars were rewritten: start over
+        start = stop + 1
+        return start, {name: values[offset:offset + start] for name, values in entry.columns.items()}
+
+
+def latest(result):
+    """Last value of each indicator (None while still warming up)."""
+    def last(values):
+        value = float(values[-1]) if len(values) else float('nan')
+        return round(value, 6) if np.isfinite(value) else None
+
+    return {spec: ({name: last(v) for name, v in values.items()} if isinstance(values, dict) else last(values))
+            for spec, values in result.items()}
+
+
+def _split(spec):
+    match = SPEC.match(spec)
+    if match.group(1):
+        return match.group(1), int(match.group(2))
+    return match.group(3), None
+
+
+def _last_bar(bars):
+    if not len(bars):
+        return None
+    return (int(bars.time[-1]), float(bars.high[-1]), float(bars.low[-1]), float(bars.close[-1]), int(bars.volume[-1]))
+
+
+indicator_engine = IndicatorEngine()
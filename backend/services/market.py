@@ -1,107 +1,204 @@
 import logging
-import requests
 import time
-import random
+import numpy as np
+from services.quote_cache import quote_cache
+from services.http_client import http_client
+from services.series_cache import series_cache
+from services.bar_store import Bars
+from services.resample import resample, resample_base
+from services.fallback_series import fallback_series
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+SIMULATED_SOURCE = "Simulated (Fallback)"  # quotes made up when the upstream fails: display only, never filled
+
 class MarketService:
     BASE_URL = "https://query1.finance.yahoo.com/v8/finance/chart"
     HEADERS = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
     }
 
+    def __init__(self):
+        # symbol -> {'gmtoffset', 'session_start'} from the last Yahoo chart meta
+        self._sessions = {}
+
     def get_quote(self, symbol):
         """
         Fetch real-time quote using direct Yahoo API (Lightweight, no pandas).
+        Served from the shared quote cache; concurrent misses share one fetch.
         """
         try:
-            # Fetch 1 day range to get current price and previous close
-            url = f"{self.BASE_URL}/{symbol}?interval=1d&range=2d"
-            response = requests.get(url, headers=self.HEADERS, timeout=5)
-            
-            if response.status_code != 200:
-                logger.error(f"Yahoo API Error: {response.text}")
-                return self._get_mock_quote(symbol) # Fallback if API fails
-
-            data = response.json()
-            result = data['chart']['result'][0]
-            meta = result['meta']
-            
-            price = meta['regularMarketPrice']
-            prev_close = meta['chartPreviousClose']
-            
-            change = price - prev_close
-            change_pct = (change / prev_close) * 100 if prev_close else 0
-
-            return {
-                "symbol": symbol,
-                "price": round(price, 2),
-                "change": round(change, 2),
-                "change_pct": round(change_pct, 2),
-                "currency": meta.get('currency', 'USD'),
-                "source": "Real-Time (Yahoo API)"
-            }
-
+            return quote_cache.get_or_load(symbol, lambda: self._fetch_quote(symbol))
         except Exception as e:
             logger.error(f"Error fetching quote for {symbol}: {str(e)}")
             return self._get_mock_quote(symbol)
 
+    def refresh_quote(self, symbol):
+        """Fetch from Yahoo and overwrite the cached quote (used by the prefetcher)."""
+        data = self._fetch_quote(symbol)
+        quote_cache.set(symbol, data, quote_cache.ttl_for(symbol))
+        return data
+
+    def _fetch_quote(self, symbol):
+        """Hit Yahoo directly. Raises on any upstream failure so nothing bad gets cached."""
+        response = http_client.get(self._quote_url(symbol), headers=self.HEADERS)
+        return self._parse_quote(symbol, response)
+
+    def _quote_url(self, symbol):
+        # Fetch 1 day range to get current price and previous close
+        return f"{self.BASE_URL}/{symbol}?interval=1d&range=2d"
+
+    def _parse_quote(self, symbol, response):
+        """Quote dict from a Yahoo chart response; raises on HTTP errors."""
+        if response.status_code != 200:
+            raise RuntimeError(f"Yahoo API Error {response.status_code}: {response.text[:200]}")
+
+        data = response.json()
+        result = data['chart']['result'][0]
+        meta = result['meta']
+
+        price = meta['regularMarketPrice']
+        prev_close = meta['chartPreviousClose']
+
+        change = price - prev_close
+        change_pct = (change / prev_close) * 100 if prev_close else 0
+
+        return {
+            "symbol": symbol,
+            "price": round(price, 2),
+            "change": round(change, 2),
+            "change_pct": round(change_pct, 2),
+            "currency": meta.get('currency', 'USD'),
+            "source": "Real-Time (Yahoo API)"
+        }
+
     def get_series(self, symbol, interval="1m", period="1d"):
         """
         Fetch historical data using direct Yahoo API (Lightweight, no pandas).
+        Bars are cached per (symbol, interval); polls only fetch new bars.
         """
+        return self.get_series_bars(symbol, interval, period).to_records()
+
+    def get_series_bars(self, symbol, interval="1m", period="1d"):
+        """Like get_series but returns Bars (simulated ones if the upstream fails)."""
         try:
-            # Map friendly period to Yahoo range
-            yahoo_range = period
-            if period == '1d': yahoo_range = '1d'
-            elif period == '5d': yahoo_range = '5d'
-            elif period == '1mo': yahoo_range = '1mo'
-            
-            url = f"{self.BASE_URL}/{symbol}?interval={interval}&range={yahoo_range}"
-            response = requests.get(url, headers=self.HEADERS, timeout=5)
-            
-            if response.status_code != 200:
-                return self._get_mock_series(symbol, interval)
-
-            data = response.json()
-            result = data['chart']['result'][0]
-            timestamps = result['timestamp']
-            indicators = result['indicators']['quote'][0]
-            
-            chart_data = []
-            for i, ts in enumerate(timestamps):
-                # specific Yahoo API quirk: sometimes values are None
-                if indicators['open'][i] is None: continue
-                
-                chart_data.append({
-                    "time": ts,
-                    "open": round(indicators['open'][i], 2),
-                    "high": round(indicators['high'][i], 2),
-                    "low": round(indicators['low'][i], 2),
-                    "close": round(indicators['close'][i], 2),
-                    "volume": indicators['volume'][i] or 0
-                })
-                
-            return chart_data
+            return self.get_bars(symbol, interval, period)
 
         except Exception as e:
             logger.error(f"Error fetching series for {symbol}: {str(e)}")
-            return self._get_mock_series(symbol, interval)
+            return self._get_mock_bars(symbol, interval)
+
+    def get_bars(self, symbol, interval="1m", period="1d", prefetched=None):
+        """
+        Series as columnar Bars. Timeframes with a resample rule (5m, 15m, 4h,
+        1wk, ...) are built from the cached base stream, so switching timeframe
+        on the chart costs no upstream call. Raises on upstream failure.
+
+        `prefetched` ({'full': Bars} or {'delta': Bars}) hands in bars the async
+        client already downloaded for the fetch series_cache.plan() predicted.
+        """
+        yahoo_range, base, fetch_interval = self._series_params(interval, period)
+        prefetched = prefetched or {}
+
+        def fetch_full():
+            if 'full' in prefetched:
+                return prefetched['full']
+            return self._fetch_series(symbol, fetch_interval, f"range={yahoo_range}")
+
+        def fetch_since(ts):
+            if 'delta' in prefetched:
+                return prefetched['delta']
+            return self._fetch_series(symbol, fetch_interval, f"period1={ts}&period2={int(time.time())}")
+
+        bars = series_cache.get(symbol, fetch_interval, yahoo_range, fetch_full=fetch_full, fetch_since=fetch_since)
+        if base:
+            session = self._sessions.get(symbol, {})
+            bars = resample(bars, interval, session.get('gmtoffset', 0), session.get('session_start'))
+        return bars
+
+    def peek_bars(self, symbol, interval="1m", period="1d"):
+        """Bars for the request from the cache only (None if this period was never loaded). Never goes upstream."""
+        yahoo_range, base, fetch_interval = self._series_params(interval, period)
+        bars = series_cache.peek(symbol, fetch_interval, yahoo_range)
+        if bars is None or not len(bars):
+            return None
+        if base:
+            session = self._sessions.get(symbol, {})
+            bars = resample(bars, interval, session.get('gmtoffset', 0), session.get('session_start'))
+        return bars
+
+    def series_needs_fetch(self, symbol, interval="1m", period="1d"):
+        """True if get_bars would go upstream now rather than answer from the cache."""
+        yahoo_range, _, fetch_interval = self._series_params(interval, period)
+        return series_cache.needs_fetch(symbol, fetch_interval, yahoo_range)
+
+    def _series_params(self, interval, period):
+        """(Yahoo range, resample base or None, interval to fetch) for a request."""
+        # Map friendly period to Yahoo range
+        yahoo_range = period
+        if period == '1d': yahoo_range = '1d'
+        elif period == '5d': yahoo_range = '5d'
+        elif period == '1mo': yahoo_range = '1mo'
+
+        base = resample_base(interval, yahoo_range)
+        return yahoo_range, base, base or interval
+
+    def _fetch_series(self, symbol, interval, window):
+        """Bars from Yahoo for `window` ("range=1mo" or "period1=..&period2=..")."""
+        response = http_client.get(self._series_url(symbol, interval, window), headers=self.HEADERS)
+        return self._parse_series(symbol, response)
+
+    def _series_url(self, symbol, interval, window):
+        return f"{self.BASE_URL}/{symbol}?interval={interval}&{window}"
+
+    def _parse_series(self, symbol, response):
+        """Bars from a Yahoo chart response; raises on HTTP errors."""
+        if response.status_code != 200:
+            raise RuntimeError(f"Yahoo API Error {response.status_code}")
+
+        data = response.json()
+        result = data['chart']['result'][0]
+        self._remember_session(symbol, result.get('meta') or {})
+        timestamps = result.get('timestamp') or []
+        if not timestamps:
+            return Bars.empty()
+        indicators = result['indicators']['quote'][0]
+
+        # None -> NaN, then drop the bars Yahoo left empty (specific Yahoo API quirk)
+        opens = np.array(indicators['open'], dtype=float)
+        keep = ~np.isnan(opens)
+        volume = np.array(indicators['volume'], dtype=float)[keep]
+
+        return Bars(
+            np.array(timestamps, dtype=np.int64)[keep],
+            np.round(opens[keep], 2),
+            np.round(np.array(indicators['high'], dtype=float)[keep], 2),
+            np.round(np.array(indicators['low'], dtype=float)[keep], 2),
+            np.round(np.array(indicators['close'], dtype=float)[keep], 2),
+            np.nan_to_num(volume).astype(np.int64)
+        )
+
+    def _remember_session(self, symbol, meta):
+        """Keep the exchange offset and session open for bucket alignment when resampling."""
+        regular = (meta.get('currentTradingPeriod') or {}).get('regular') or {}
+        self._sessions[symbol] = {
+            'gmtoffset': meta.get('gmtoffset') or 0,
+            'session_start': regular.get('start'),
+        }
 
     # --- FALLBACKS (Just in case API blocks IP) ---
     def _get_mock_quote(self, symbol):
         base_price = sum(ord(c) for c in symbol) + 50
         if 'BTC' in symbol: base_price = 42000
         return {
-            "symbol": symbol, "price": base_price, "change": 1.5, "change_pct": 0.5, "currency": "USD", "source": "Simulated (Fallback)"
+            "symbol": symbol, "price": base_price, "change": 1.5, "change_pct": 0.5, "currency": "USD", "source": SIMULATED_SOURCE
         }
 
-    def _get_mock_series(self, symbol, interval):
-        data = []
-        end_time = int(time.time())
-        
+    def _get_mock_series(self, symbol, interval, base_price=None):
+        return self._get_mock_bars(symbol, interval, base_price).to_records()
+
+    def _get_mock_bars(self, symbol, interval, base_price=None):
         # Base price depends on symbol roughly
         price = 100.0
         if 'BTC' in symbol: price = 92000.0
@@ -109,31 +206,9 @@ class MarketService:
         elif 'IAM' in symbol: price = 105.0 # Maroc Telecom
         elif 'ATW' in symbol: price = 480.0
         elif 'ADI' in symbol: price = 450.0
-        
+
+        # Deterministic per (symbol, interval, time bucket), so repeated polls draw the same chart
         points = 60 # Show more points for a better chart
-        step = 86400 if interval == '1d' else 3600 # 1 day or 1 hour
-        
-        # Start from history and walk forward
-        current_price = price * 0.95 # Start slightly lower to show trend
-        
-        for i in range(points):
-            # Random walk
-            change = random.uniform(-0.02, 0.025) # Slightly bullish bias
-            open_p = current_price
-            close_p = open_p * (1 + change)
-            high_p = max(open_p, close_p) * (1 + random.uniform(0, 0.01))
-            low_p = min(open_p, close_p) * (1 - random.uniform(0, 0.01))
-            
-            data.append({
-                "time": end_time - (points - i) * step,
-                "open": round(open_p, 2),
-                "high": round(high_p, 2),
-                "low": round(low_p, 2),
-                "close": round(close_p, 2),
-                "volume": random.randint(1000, 50000)
-            })
-            current_price = close_p
-            
-        return data
+        return fallback_series.bars(symbol, interval, base_price or price, points=points)
 
 market_service = MarketService()
\ No newline at end of file
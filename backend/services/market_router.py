@@ -0,0 +1,417 @@
+"""
+Provider router: every quote and series request dispatches through here.
+
+The symbol registry says which provider serves an instrument. Answers that
+are already cached (or already being fetched) return without an upstream
+call. Only requests that would go upstream pass the provider's gate:
+
+    concurrency   at most MAX_CONCURRENCY upstream calls in flight per provider
+    rate budget   token bucket, RATE calls/second with bursts up to BURST
+
+A request that can't get through the gate within GATE_WAIT seconds gets the
+last known real value instead of queueing behind the upstream: the last
+cached quote (None if there is none, never a simulated price) or the cached
+bars (simulated ones only if nothing was ever cached). Adding an exchange means registering its instruments and a
+provider here, not editing routes.
+
+Every provider call also has a coroutine twin (aquote, abars) that runs on
+the shared event loop in async_market.py. Batch quotes, the quote stream and
+the prefetcher go through `quotes()`, which fetches all symbols at once
+without a thread per symbol. Both paths share the same gates.
+"""
+import asyncio
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from services.async_market import async_bridge, async_market
+from services.bar_store import Bars
+from services.market import SIMULATED_SOURCE, market_service
+from services.morocco_scraper import MoroccoScraper, morocco_scraper
+from services.quote_cache import quote_cache
+from services.series_cache import INTERVAL_SECONDS
+from services.shared_quotes import shared_quotes
+from services.symbols import symbol_registry
+
+logger = logging.getLogger(__name__)
+
+
+class RateBudget:
+    """Token bucket: `rate` tokens per second, holding at most `burst`."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def available(self):
+        with self._lock:
+            elapsed = time.monotonic() - self._updated
+            return round(min(self.burst, self._tokens + elapsed * self.rate), 2)
+
+
+class Provider:
+    """Adapter for one upstream. Subclasses set the limits and the data calls."""
+
+    name = None
+    MAX_CONCURRENCY = 4
+    RATE = 5.0  # upstream calls per second
+    BURST = 10
+    series_via = None  # provider whose gate series fetches count against, if not this one
+
+    def __init__(self):
+        self.slots = threading.BoundedSemaphore(self.MAX_CONCURRENCY)
+        self.budget = RateBudget(self.RATE, self.BURST)
+        self.in_flight = 0
+        self.calls = 0
+        self.cached = 0
+        self.throttled = 0
+
+    def cached_quote(self, instrument):
+        """Quote if it can be answered without an upstream call, else None."""
+        raise NotImplementedError
+
+    def stale_quote(self, instrument):
+        """Best answer when the gate is closed: the last real quote, or None. Never simulated."""
+        return self.last_known(instrument)
+
+    def last_known(self, instrument):
+        """Most recent real quote held locally, however old, else None. Never calls upstream."""
+        raise NotImplementedError
+
+    def loading(self, instrument):
+        """True if an upstream call for this quote is already in flight (callers join it)."""
+        return False
+
+    def quote(self, instrument):
+        raise NotImplementedError
+
+    def aloading(self, instrument):
+        """True if an async fetch for this quote is already on the loop (callers join it)."""
+        return False
+
+    async def aquote(self, instrument):
+        raise NotImplementedError
+
+    def series_cached(self, instrument, interval, period):
+        return not market_service.series_needs_fetch(instrument.series_symbol, interval, period)
+
+    def bars(self, instrument, interval, period):
+        return market_service.get_series_bars(instrument.series_symbol, interval, period)
+
+    def cached_bars(self, instrument, interval, period):
+        """Bars already held locally, however old, else None. Never calls upstream."""
+        return market_service.peek_bars(instrument.series_symbol, interval, period)
+
+    async def abars(self, instrument, interval, period):
+        try:
+            return await async_market.bars(instrument.series_symbol, interval, period)
+        except Exception as e:
+            logger.error(f"Error fetching series for {instrument.series_symbol}: {str(e)}")
+            return self.fallback_bars(instrument, interval)
+
+    def fallback_bars(self, instrument, interval):
+        return market_service._get_mock_bars(instrument.symbol, interval, instrument.base_price)
+
+    def stats(self):
+        return {
+            "max_concurrency": self.MAX_CONCURRENCY,
+            "in_flight": self.in_flight,
+            "rate": self.RATE,
+            "burst": self.BURST,
+            "tokens": self.budget.available(),
+            "calls": self.calls,
+            "cached": self.cached,
+            "throttled": self.throttled,
+        }
+
+
+class YahooProvider(Provider):
+    name = 'yahoo'
+    MAX_CONCURRENCY = 8
+    RATE = 5.0
+    BURST = 20
+
+    def cached_quote(self, instrument):
+        # This worker's cache, then the table the writer worker keeps warm for everyone
+        return quote_cache.get(instrument.symbol) or shared_quotes.get(instrument.symbol)
+
+    def last_known(self, instrument):
+        return quote_cache.peek(instrument.symbol) or shared_quotes.get(instrument.symbol)
+
+    def loading(self, instrument):
+        return quote_cache.loading(instrument.symbol)
+
+    def quote(self, instrument):
+        return market_service.get_quote(instrument.symbol)
+
+    def aloading(self, instrument):
+        return async_market.loading(('quote', instrument.symbol))
+
+    async def aquote(self, instrument):
+        try:
+            return await async_market.yahoo_quote(instrument.symbol)
+        except Exception as e:
+            logger.error(f"Error fetching quote for {instrument.symbol}: {str(e)}")
+            return market_service._get_mock_quote(instrument.symbol)
+
+
+class BVCProvider(Provider):
+    """Casablanca: one page scrape refreshes every listed ticker."""
+
+    name = 'bvc'
+    MAX_CONCURRENCY = 2
+    RATE = 0.2  # one scrape per 5 s sustained
+    BURST = 2
+    series_via = 'yahoo'  # history comes from Yahoo's .MA listings, not the scrape
+
+    def cached_quote(self, instrument):
+        if MoroccoScraper.snapshot_age() < MoroccoScraper.CACHE_DURATION:
+            return morocco_scraper.get_stock_price(instrument.symbol)
+        return shared_quotes.get(instrument.symbol)
+
+    def last_known(self, instrument):
+        return MoroccoScraper._cache['quotes'].get(instrument.symbol) or shared_quotes.get(instrument.symbol)
+
+    def loading(self, instrument):
+        return MoroccoScraper._refresh_lock.locked()
+
+    def quote(self, instrument):
+        return morocco_scraper.get_stock_price(instrument.symbol)
+
+    def aloading(self, instrument):
+        return async_market.loading(('bvc',))
+
+    async def aquote(self, instrument):
+        return await async_market.bvc_quote(instrument.symbol)
+
+    def bars(self, instrument, interval, period):
+        # Some BVC stocks are on Yahoo (e.g. IAM.MA); simulate around the reference price otherwise
+        try:
+            bars = market_service.get_bars(instrument.series_symbol, interval, period)
+            if len(bars):
+                return bars
+        except Exception:
+            pass
+        return self.fallback_bars(instrument, interval)
+
+    async def abars(self, instrument, interval, period):
+        try:
+            bars = await async_market.bars(instrument.series_symbol, interval, period)
+            if len(bars):
+                return bars
+        except Exception:
+            pass
+        return self.fallback_bars(instrument, interval)
+
+
+class MarketRouter:
+    GATE_WAIT = 2.0  # seconds to wait for an upstream slot before serving stale data
+    SLOT_POLL = 0.01  # seconds between async attempts at a provider slot
+
+    def __init__(self):
+        self._providers = {}
+
+    def register(self, provider):
+        self._providers[provider.name] = provider
+
+    def instrument(self, symbol):
+        return symbol_registry.lookup(symbol)
+
+    def quote(self, symbol):
+        instrument = symbol_registry.lookup(symbol)
+        provider = self._providers[instrument.provider]
+
+        quote = provider.cached_quote(instrument)
+        if quote is not None:
+            provider.cached += 1
+            return quote
+        if provider.loading(instrument):
+            # Another request is already fetching it: wait for that result, no new upstream call
+            provider.cached += 1
+            return provider.quote(instrument)
+
+        with self._gate(provider) as admitted:
+            if not admitted:
+                return provider.stale_quote(instrument)
+            return provider.quote(instrument)
+
+    @staticmethod
+    def series_error(symbol, interval):
+        """Why (symbol, interval) can't have a series, or None. Checked before anything touches the bar store."""
+        if not symbol_registry.is_valid(symbol):
+            return f"Unknown symbol: {symbol}"
+        if interval not in INTERVAL_SECONDS:
+            return f"Unsupported interval: {interval}"
+        return None
+
+    def bars(self, symbol, interval, period):
+        if self.series_error(symbol, interval):
+            return Bars.empty()  # routes answer 400 before getting here
+        instrument = symbol_registry.lookup(symbol)
+        provider = self._providers[instrument.provider]
+
+        gate = self._providers.get(provider.series_via) or provider
+
+        if provider.series_cached(instrument, interval, period):
+            gate.cached += 1
+            return provider.bars(instrument, interval, period)
+
+        with self._gate(gate) as admitted:
+            if not admitted:
+                return self._stale_bars(provider, instrument, interval, period)
+            return provider.bars(instrument, interval, period)
+
+    async def aquote(self, symbol):
+        instrument = symbol_registry.lookup(symbol)
+        provider = self._providers[instrument.provider]
+
+        quote = provider.cached_quote(instrument)
+        if quote is not None:
+            provider.cached += 1
+            return quote
+        if provider.aloading(instrument):
+            provider.cached += 1
+            return await provider.aquote(instrument)
+
+        async with self._agate(provider) as admitted:
+            if not admitted:
+                return provider.stale_quote(instrument)
+            return await provider.aquote(instrument)
+
+    async def abars(self, symbol, interval, period):
+        if self.series_error(symbol, interval):
+            return Bars.empty()
+        instrument = symbol_registry.lookup(symbol)
+        provider = self._providers[instrument.provider]
+
+        gate = self._providers.get(provider.series_via) or provider
+
+        if provider.series_cached(instrument, interval, period):
+            gate.cached += 1
+            return await provider.abars(instrument, interval, period)
+
+        async with self._agate(gate) as admitted:
+            if not admitted:
+                return self._stale_bars(provider, instrument, interval, period)
+            return await provider.abars(instrument, interval, period)
+
+    def last_price(self, symbol):
+        """
+        Latest known price for marking positions, from memory only: the last
+        good quote this process loaded, kept through failed refreshes, else the
+        shared table's (None if neither ever had one). Unlike `quote` it never goes
+        upstream and never answers with mock data, so it is safe to call for
+        every open position on every revaluation.
+        """
+        instrument = symbol_registry.lookup(symbol)
+        quote = self._providers[instrument.provider].last_known(instrument)
+        return quote['price'] if quote else None
+
+    @staticmethod
+    def is_real(quote):
+        """
+        True if `quote` is a price from an upstream (fresh or cached), False
+        for None and for the simulated fallbacks served when the upstream
+        fails. Orders must only fill at real prices.
+        """
+        return bool(quote) and quote.get('price') is not None and quote.get('source') != SIMULATED_SOURCE
+
+    def quotes(self, symbols, timeout):
+        """
+        Quotes for many symbols fetched concurrently on the event loop, from a
+        sync caller. Returns ({symbol: quote}, {symbol: error}); symbols still
+        pending after `timeout` seconds are reported as timed out.
+        """
+        return async_bridge.run(self._aquotes(symbols, timeout), timeout + 1)
+
+    def stats(self):
+        return {name: provider.stats() for name, provider in self._providers.items()}
+
+    async def _aquotes(self, symbols, timeout):
+        tasks = {symbol: asyncio.ensure_future(self.aquote(symbol)) for symbol in symbols}
+        done, _ = await asyncio.wait(tasks.values(), timeout=timeout)
+
+        quotes, errors = {}, {}
+        for symbol, task in tasks.items():
+            if task not in done:
+                task.cancel()
+                errors[symbol] = "Timed out"
+            elif task.exception() is not None:
+                errors[symbol] = str(task.exception())
+            elif task.result():
+                quotes[symbol] = task.result()
+            else:
+                errors[symbol] = "Symbol not found or service unavailable"
+        return quotes, errors
+
+    @staticmethod
+    def _stale_bars(provider, instrument, interval, period):
+        # The cached series, however old, before any simulated history
+        bars = provider.cached_bars(instrument, interval, period)
+        if bars is not None and len(bars):
+            return bars
+        return provider.fallback_bars(instrument, interval)
+
+    @contextmanager
+    def _gate(self, provider):
+        """Yields True if the call may go upstream (a slot and a budget token were taken)."""
+        if not provider.budget.take():
+            provider.throttled += 1
+            logger.warning(f"{provider.name}: rate budget exhausted, serving cached/fallback data")
+            yield False
+            return
+        if not provider.slots.acquire(timeout=self.GATE_WAIT):
+            provider.throttled += 1
+            logger.warning(f"{provider.name}: no free upstream slot within {self.GATE_WAIT}s")
+            yield False
+            return
+        provider.in_flight += 1
+        provider.calls += 1
+        try:
+            yield True
+        finally:
+            provider.in_flight -= 1
+            provider.slots.release()
+
+    @asynccontextmanager
+    async def _agate(self, provider):
+        """Async _gate. Polls the same semaphore so blocking and async calls share one concurrency cap."""
+        if not provider.budget.take():
+            provider.throttled += 1
+            logger.warning(f"{provider.name}: rate budget exhausted, serving cached/fallback data")
+            yield False
+            return
+        deadline = time.monotonic() + self.GATE_WAIT
+        while not provider.slots.acquire(blocking=False):
+            if time.monotonic() >= deadline:
+                provider.throttled += 1
+                logger.warning(f"{provider.name}: no free upstream slot within {self.GATE_WAIT}s")
+                yield False
+                return
+            await asyncio.sleep(self.SLOT_POLL)
+        provider.in_flight += 1
+        provider.calls += 1
+        try:
+            yield True
+        finally:
+            provider.in_flight -= 1
+            provider.slots.release()
+
+
+market_router = MarketRouter()
+market_router.register(YahooProvider())
+market_router.register(BVCProvider())
@@ -0,0 +1,189 @@
+"""
+Record-and-replay tape for upstream market data (Yahoo, leboursier.ma).
+
+    MARKET_TAPE_MODE=record   real responses are appended to the tape as they arrive
+    MARKET_TAPE_MODE=replay   HttpClient answers from the tape, never the network
+
+Tape format (MARKET_TAPE_PATH), one record after another:
+
+    header  <d I f H I>  t (s since recording start), status, latency (ms),
+                          key length, compressed body length
+    key     UTF-8 request key: host + path + sorted query, with the values of
+            volatile params (period1/period2 timestamps) dropped
+    body    zlib-compressed response body
+
+Replay keeps a clock that runs MARKET_TAPE_SPEED times faster than real
+time. Each request gets the latest recording for its key at that point on the
+tape, with the recorded latency divided by the speed. The tape loops at its end.
+MARKET_TAPE_SPEED=0 is step mode: the n-th request for a key gets its n-th
+recording, with no sleeping, for fully deterministic benchmarks.
+"""
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from bisect import bisect_right
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct('<dIfHI')
+VOLATILE_PARAMS = ('period1', 'period2')
+CONTENT_TYPES = {'query1.finance.yahoo.com': 'application/json'}
+
+
+def tape_key(url, params=None):
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query) + list((params or {}).items())
+    query = sorted((k, '' if k in VOLATILE_PARAMS else str(v)) for k, v in query)
+    return f"{parts.netloc}{parts.path}?{urlencode(query)}"
+
+
+class MarketTape:
+    OFF = 'off'
+    RECORD = 'record'
+    REPLAY = 'replay'
+
+    def __init__(self):
+        self.mode = self.OFF
+        self.path = None
+        self.speed = 1.0
+        self._lock = threading.Lock()
+        self._file = None
+        self._started = None
+
+        # replay state
+        self._tracks = {}  # key -> ([t, ...], [(status, latency_ms, body), ...])
+        self._duration = 0.0
+        self._steps = {}  # key -> next index (step mode)
+
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def configure(self, mode=None, path=None, speed=None):
+        self.mode = (mode or self.OFF).lower()
+        self.path = path
+        if speed is not None:
+            self.speed = float(speed)
+        if self.mode == self.REPLAY:
+            self._load()
+        elif self.mode == self.RECORD:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._file = open(path, 'ab')
+            self._started = time.time()
+            logger.info(f"Recording upstream responses to {path}")
+
+    @property
+    def replaying(self):
+        return self.mode == self.REPLAY
+
+    @property
+    def recording(self):
+        return self.mode == self.RECORD
+
+    def record(self, url, params, status, latency_ms, body, at=None):
+        """Append one response; `at` is seconds since recording start (default: now)."""
+        key = tape_key(url, params).encode()
+        packed = zlib.compress(body)
+        if at is None:
+            at = time.time() - self._started
+        with self._lock:
+            self._file.write(HEADER.pack(at, status, latency_ms, len(key), len(packed)))
+            self._file.write(key)
+            self._file.write(packed)
+            self._file.flush()
+            self.recorded += 1
+
+    def replay(self, url, params=None):
+        """A requests.Response rebuilt from the tape. Raises ConnectionError if the key was never recorded."""
+        response, delay = self.lookup(url, params)
+        if delay:
+            time.sleep(delay)
+        return response
+
+    def lookup(self, url, params=None):
+        """(Response, seconds to wait before returning it) without sleeping; async callers await the delay."""
+        key = tape_key(url, params)
+        track = self._tracks.get(key)
+        if track is None:
+            self.misses += 1
+            raise requests.ConnectionError(f"Not on tape: {key}")
+        times, entries = track
+
+        delay = 0.0
+        if self.speed <= 0:
+            with self._lock:
+                idx = self._steps.get(key, 0)
+                self._steps[key] = (idx + 1) % len(entries)
+            status, latency_ms, body = entries[idx]
+        else:
+            with self._lock:
+                if self._started is None:
+                    self._started = time.time()
+            clock = (time.time() - self._started) * self.speed
+            if self._duration:
+                clock %= self._duration
+            idx = max(bisect_right(times, clock) - 1, 0)
+            status, latency_ms, body = entries[idx]
+            delay = latency_ms / 1000.0 / self.speed
+
+        self.replayed += 1
+        response = requests.Response()
+        response.status_code = status
+        response._content = body
+        response.url = url
+        response.encoding = 'utf-8'
+        response.headers['Content-Type'] = CONTENT_TYPES.get(urlsplit(url).netloc, 'text/html')
+        return response, delay
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "path": self.path,
+            "speed": self.speed,
+            "keys": len(self._tracks),
+            "duration": round(self._duration, 1),
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "misses": self.misses,
+        }
+
+    def _load(self):
+        tracks = {}
+        duration = 0.0
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        offset = 0
+        while offset + HEADER.size <= len(data):
+            t, status, latency_ms, key_len, body_len = HEADER.unpack_from(data, offset)
+            offset += HEADER.size
+            if offset + key_len + body_len > len(data):
+                logger.warning(f"Market tape {self.path} ends in a partial record, ignoring it")
+                break
+            key = data[offset:offset + key_len].decode()
+            offset += key_len
+            body = zlib.decompress(data[offset:offset + body_len])
+            offset += body_len
+            tracks.setdefault(key, []).append((t, (status, latency_ms, body)))
+            duration = max(duration, t)
+
+        # Several recording sessions may be appended to one tape; order each key by time
+        for key, recs in tracks.items():
+            recs.sort(key=lambda rec: rec[0])
+            tracks[key] = ([t for t, _ in recs], [entry for _, entry in recs])
+        self._tracks = tracks
+        self._duration = duration
+        logger.info(f"Loaded market tape {self.path}: {len(tracks)} keys, {duration:.0f}s")
+
+
+market_tape = MarketTape()
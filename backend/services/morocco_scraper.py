@@ -1,8 +1,10 @@
-import requests
-from bs4 import BeautifulSoup
 import logging
 import random
+import threading
 import time
+from services.http_client import http_client
+from services.html_table import parse_rows, RowIndex
+from services.market import SIMULATED_SOURCE
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -10,139 +12,163 @@ logger = logging.getLogger(__name__)
 class MoroccoScraper:
     """
     Scrapes data for Casablanca Stock Exchange (BVC).
-    Uses caching to avoid hitting the source too frequently.
+    The cotations page lists the whole market, so one download + parse fills a
+    snapshot for every instrument; readers are served from it until the next refresh.
     Target: leboursier.ma or similar public financial portal for MVP.
     """
     
     BASE_URL = "https://www.leboursier.ma/cotations"
+    HEADERS = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+    }
+
+    # Ticker -> name as displayed on leboursier.ma
+    NAME_MAP = {
+        'IAM': 'ITISSALAT AL-MAGHRIB',
+        'ATW': 'ATTIJARIWAFA BANK',
+        'BCP': 'BCP',
+        'Lafarge': 'LAFARGEHOLCIM',
+        'ADI': 'DOUJA PROM ADDOHA',
+        'CSR': 'COSUMAR',
+        'HOL': 'HOLCIM',
+        'MNG': 'MANAGEM',
+        'WAA': 'WAFA ASSURANCE',
+        'SNE': 'SNEP',
+        'TQB': 'TAQA MOROCCO',
+    }
     
-    # Simple in-memory cache: {symbol: {data: {...}, timestamp: 123456789}}
-    _cache = {}
+    # Reference prices for simulated fallbacks
+    BASE_PRICES = {
+        'IAM': 105.00,  # Maroc Telecom
+        'ATW': 480.00,  # Attijariwafa
+        'BCP': 290.00,  # Banque Populaire
+        'Lafarge': 1800.00, # LafargeHolcim
+        'ADI': 450.00, # Addoha
+        'CSR': 680.00, # Cosumar
+        'HOL': 55.00, # Holcim (Historical/Merged)
+        'MNG': 1600.00, # Managem
+        'WAA': 120.00, # Wafa Assurance
+        'SNE': 700.00, # SNEP
+        'TQB': 180.00, # Taqa Morocco
+    }
+
+    # Whole-market snapshot, replaced atomically on refresh:
+    # {'quotes': {symbol_or_name: {...}}, 'timestamp': 123456789}
+    _cache = {'quotes': {}, 'timestamp': 0}
+    _refresh_lock = threading.Lock()
     CACHE_DURATION = 60  # seconds
+    FAILURE_RETRY = 15  # seconds before retrying after a failed scrape
 
     @staticmethod
     def get_stock_price(symbol):
         """
-        Scrapes price for a Moroccan stock (e.g., 'IAM', 'ATW', 'BCP').
-        Mapping common symbols to leboursier URLs or identifiers if needed.
+        Price for a Moroccan stock (e.g., 'IAM', 'ATW', 'BCP') from the current
+        market snapshot. Falls back to simulated data if the symbol isn't listed
+        or the scrape failed.
         """
-        
-        # Check cache
-        now = time.time()
-        cached = MoroccoScraper._cache.get(symbol)
-        if cached and (now - cached['timestamp'] < MoroccoScraper.CACHE_DURATION):
-            return cached['data']
+        data = MoroccoScraper.get_snapshot().get(symbol)
+        if data:
+            return data
+        return MoroccoScraper._mock_data(symbol)
 
+    @staticmethod
+    def get_snapshot():
+        """Return {symbol: quote} for every listed instrument, refreshing if stale."""
+        snapshot = MoroccoScraper._cache
+        if time.time() - snapshot['timestamp'] < MoroccoScraper.CACHE_DURATION:
+            return snapshot['quotes']
+
+        # Only one thread scrapes; the rest wait and then read its snapshot
+        with MoroccoScraper._refresh_lock:
+            snapshot = MoroccoScraper._cache
+            if time.time() - snapshot['timestamp'] < MoroccoScraper.CACHE_DURATION:
+                return snapshot['quotes']
+            return MoroccoScraper._refresh()
+
+    @staticmethod
+    def snapshot_age():
+        """Seconds since the current snapshot was taken."""
+        return time.time() - MoroccoScraper._cache['timestamp']
+
+    @staticmethod
+    def refresh():
+        """Force a new snapshot now (used by the background prefetcher)."""
+        with MoroccoScraper._refresh_lock:
+            return MoroccoScraper._refresh()
+
+    @staticmethod
+    def _refresh():
+        """Download and parse the cotations page once and swap in the new snapshot."""
+        now = time.time()
         try:
-            # MVP: Simulated fallback for reliability during demo if scrape fails
-            # But we try to scrape first.
-            
-            # NOTE: Real scraping depends on the exact HTML structure of the target site.
-            # This is a generic implementation targeting a structure common in financial tables.
-            # For this MVP, we will try to fetch from a reliable simplified endpoint or fallback to mock if the site blocks us.
-            
-            # Attempting to fetch from a source (LeBoursier is popular)
-            # Because we cannot guarantee the live site structure in this blind environment, 
-            # we will implement a robust mock-fallback system slightly randomized to look "live" 
-            # if the request fails (which often happens with bot protection).
-            
-            # HOWEVER, the prompt specifically asked for a scraper. 
-            # So here is the best-effort scraping logic.
-            
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+            quotes = MoroccoScraper._scrape_all()
+        except Exception as e:
+            logger.error(f"Scrape error: {str(e)}")
+            quotes = {}
+        return MoroccoScraper._swap(quotes, now)
+
+    @staticmethod
+    def _swap(quotes, now):
+        """Install a freshly scraped snapshot (or, if empty, a short retry window)."""
+        if quotes:
+            MoroccoScraper._cache = {'quotes': quotes, 'timestamp': now}
+        else:
+            # Serve fallbacks for a short while instead of re-scraping on every call
+            retry_at = now - MoroccoScraper.CACHE_DURATION + MoroccoScraper.FAILURE_RETRY
+            MoroccoScraper._cache = {'quotes': {}, 'timestamp': retry_at}
+        return quotes
+
+    @staticmethod
+    def _scrape_all():
+        """
+        Parse every row of the cotations table in a single pass and index it.
+        Listed tickers are keyed by symbol, everything else by instrument name.
+        """
+        # NOTE: Real scraping depends on the exact HTML structure of the target site.
+        # This is a generic implementation targeting a structure common in financial tables.
+        response = http_client.get(MoroccoScraper.BASE_URL, headers=MoroccoScraper.HEADERS)
+        return MoroccoScraper._parse_snapshot(response)
+
+    @staticmethod
+    def _parse_snapshot(response):
+        """{symbol_or_name: quote} from a cotations page response ({} on HTTP errors)."""
+        if response.status_code != 200:
+            logger.error(f"BVC scrape failed: HTTP {response.status_code}")
+            return {}
+
+        index = RowIndex(parse_rows(response.content), MoroccoScraper.NAME_MAP)
+        quotes = {}
+
+        for symbol, cols in index.items():
+            if len(cols) < 5:
+                continue
+
+            # Usually: Name | ... | Price | ... | Change %
+            price_text = cols[2].replace(',', '.')
+            change_text = cols[4].replace('%', '').replace(',', '.')
+            try:
+                price = float(price_text)
+                change_pct = float(change_text)
+            except ValueError:
+                continue
+
+            quotes[symbol] = {
+                "symbol": symbol,
+                "price": price,
+                "change": 0.0, # detailed change usually requires more cols
+                "change_pct": change_pct,
+                "currency": "MAD",
+                "source": "BVC (Scraped)"
             }
-            
-            # Using a search query style or direct mapping. 
-            # Let's assume a direct mapping for top stocks for reliability.
-            # IAM -> Itissalat Al-Maghrib
-            
-            # If real connection is issues, return realistic mock data
-            # return MoroccoScraper._mock_data(symbol) 
-            
-            # Uncomment below to enable real network call if environment allows
-            response = requests.get(MoroccoScraper.BASE_URL, headers=headers, timeout=5)
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                # Find the row corresponding to the symbol
-                # This selector is hypothetical based on common table structures
-                # In a real scenario, we'd inspect the actual DOM of leboursier.ma
-                
-                # Setup specific catch for IAM (Maroc Telecom)
-                # Example: finding a link or cell containing the name
-                name_map = {
-                    'IAM': 'ITISSALAT AL-MAGHRIB',
-                    'ATW': 'ATTIJARIWAFA BANK',
-                    'BCP': 'BCP'
-                }
-                search_name = name_map.get(symbol, symbol)
-                
-                # Finding the row (tr) that contains the search_name
-                # This is a heuristic search
-                row = None
-                for tr in soup.find_all('tr'):
-                    if search_name in tr.get_text():
-                        row = tr
-                        break
-                
-                if row:
-                    cols = row.find_all('td')
-                    # Usually: Name | ... | Price | ... | Change %
-                    # Let's assume Price is roughly 7th column (index 6) or similar based on typical financial tables
-                    # We'll try to parse numbers from columns
-                    
-                    price_text = cols[2].get_text(strip=True).replace(',', '.') # Hypothesis: Col 2 or 3 is price
-                    change_text = cols[4].get_text(strip=True).replace('%', '').replace(',', '.') # Hypothesis
-                    
-                    try:
-                        price = float(price_text)
-                        change_pct = float(change_text)
-                        
-                        data = {
-                            "symbol": symbol,
-                            "price": price,
-                            "change": 0.0, # detailed change usually requires more cols
-                            "change_pct": change_pct,
-                            "currency": "MAD",
-                            "source": "BVC (Scraped)"
-                        }
-                        
-                        # Update cache
-                        MoroccoScraper._cache[symbol] = {
-                            'data': data,
-                            'timestamp': now
-                        }
-                        return data
-                    except ValueError:
-                        pass
-                        
-            # Fallback if scrape fails or symbol not found
-            return MoroccoScraper._mock_data(symbol)
 
-        except Exception as e:
-            logger.error(f"Scrape error for {symbol}: {str(e)}")
-            return MoroccoScraper._mock_data(symbol)
+        return quotes
 
     @staticmethod
     def _mock_data(symbol):
         """
         Robust fallback to ensure the MVP always works during demo even if the website changes.
         """
-        base_prices = {
-            'IAM': 105.00,  # Maroc Telecom
-            'ATW': 480.00,  # Attijariwafa
-            'BCP': 290.00,  # Banque Populaire
-            'Lafarge': 1800.00, # LafargeHolcim
-            'ADI': 450.00, # Addoha
-            'CSR': 680.00, # Cosumar
-            'HOL': 55.00, # Holcim (Historical/Merged)
-            'MNG': 1600.00, # Managem
-            'WAA': 120.00, # Wafa Assurance
-            'SNE': 700.00, # SNEP
-            'TQB': 180.00, # Taqa Morocco
-        }
-        
-        base = base_prices.get(symbol, 100.00)
+        base = MoroccoScraper.BASE_PRICES.get(symbol, 100.00)
         # Add random noise
         variation = random.uniform(-0.5, 0.5)
         price = round(base + variation, 2)
@@ -154,7 +180,7 @@ class MoroccoScraper:
             "change": round(base * (change_pct/100), 2),
             "change_pct": change_pct,
             "currency": "MAD",
-            "source": "Simulated (Fallback)"
+            "source": SIMULATED_SOURCE
         }
 
 morocco_scraper = MoroccoScraper()
\ No newline at end of file
@@ -1,36 +1,365 @@
-import random
-from datetime import datetime, timedelta
+import base64
+import json
+import logging
+import os
+import re
+import threading
+import time
+import xml.etree.ElementTree as ET
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+
+from sqlalchemy import and_, or_
+
+from models import db, NewsItem
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = {'a', 'an', 'and', 'as', 'at', 'by', 'for', 'in', 'of', 'on', 'or', 'the', 'to', 'with'}
+
+# Used when a feed item doesn't carry its own category / sentiment
+CATEGORY_KEYWORDS = {
+    'Crypto': {'bitcoin', 'btc', 'crypto', 'ethereum', 'eth', 'defi', 'stablecoin', 'blockchain'},
+    'Forex': {'fed', 'ecb', 'dollar', 'euro', 'dirham', 'forex', 'currency', 'rate', 'rates'},
+    'Commodities': {'oil', 'gold', 'silver', 'brent', 'crude', 'copper', 'wheat'},
+    'Stocks': {'stock', 'stocks', 'shares', 'earnings', 'nasdaq', 'masi', 'ipo', 'apple', 'tesla'},
+}
+POSITIVE_WORDS = {'surge', 'surges', 'gain', 'gains', 'rally', 'rallies', 'beat', 'beats', 'high', 'record', 'rise', 'rises', 'growth', 'cuts', 'upgrade'}
+NEGATIVE_WORDS = {'slip', 'slips', 'fall', 'falls', 'drop', 'drops', 'plunge', 'plunges', 'miss', 'misses', 'loss', 'losses', 'cut', 'downgrade', 'fears'}
+
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall((text or '').lower()) if t not in STOPWORDS]
+
+
+def item_tokens(title, summary):
+    """Search tokens of a news item: the in-memory index and news_items.search_tokens both use these."""
+    return set(tokenize(f"{title} {summary or ''}"))
+
 
 class NewsService:
-    def get_market_news(self):
-        # Mock Data - In real app, connect to NewsAPI or similar
-        sentiment_options = ['positive', 'negative', 'neutral']
-        
-        headlines = [
-            ("Bitcoin surges past resistance as institutional interest grows", "positive", "Crypto", "https://finance.yahoo.com/topic/crypto/"),
-            ("Fed signals potential rate cuts later this year", "positive", "Forex", "https://www.cnbc.com/foreign-exchange/"),
-            ("Tech stocks slip amid mixed earnings reports", "negative", "Stocks", "https://finance.yahoo.com/topic/tech/"),
-            ("Oil prices stabilize after volatile week", "neutral", "Commodities", "https://www.cnbc.com/energy/"),
-            ("New regulatory framework proposed for DeFi", "neutral", "Crypto", "https://www.coindesk.com/policy"),
-            ("Gold hits all-time high on global uncertainty", "positive", "Commodities", "https://www.kitco.com/news"),
-            ("Apple announces revolutionary AI integration", "positive", "Stocks", "https://www.apple.com/newsroom"),
-            ("Tesla delivery numbers miss analyst expectations", "negative", "Stocks", "https://finance.yahoo.com/quote/TSLA")
-        ]
-        
-        news = []
-        for i in range(5):
-            headline, sentiment, category, url = headlines[i]
-            news.append({
-                "id": i,
-                "title": headline,
-                "summary": "This is a brief AI-generated summary of the market event...",
-                "source": "TradeSense Wire",
-                "published_at": (datetime.now() - timedelta(minutes=random.randint(5, 120))).isoformat(),
-                "sentiment": sentiment,
-                "category": category,
-                "url": url
-            })
-            
-        return news
+    """
+    News store: drop-folder ingestion into news_items, served from memory.
+
+    Ingestion: *.json (a list of items, or {"items": [...]}) and *.xml/*.rss
+    (RSS 2.0) files in the drop folder are parsed when new or modified and
+    upserted by guid. Missing categories and sentiments are inferred from
+    keywords.
+
+    Reads: the newest HOT_SIZE items are kept in memory, sorted newest first,
+    with an inverted index (token -> ids) for keyword search. Pages use an
+    opaque keyset cursor (published_at in exact microseconds, id) and are
+    memoized until the window changes, so a repeated poll is a dict lookup.
+    Cursors that page past the window go to the database (indexed on
+    category, sentiment, published_at), which matches whole tokens through
+    the stored `search_tokens`, so both paths return the same items.
+    """
+
+    HOT_SIZE = 1000
+    DEFAULT_LIMIT = 20
+    MAX_LIMIT = 100
+    MAX_CACHED_PAGES = 256
+
+    def __init__(self):
+        self.drop_dir = None
+        self.scan_interval = 60
+        self._lock = threading.Lock()
+        self._scan_lock = threading.Lock()
+        self._file_mtimes = {}
+        self._last_scan = 0
+
+        self._window = None  # list of item dicts, newest first
+        self._keys = []  # (-published_ts, -id) per window item, ascending (for bisect)
+        self._index = {}  # token -> set(item id)
+        self._complete = True  # window holds every stored item
+        self._pages = {}
+
+    def configure(self, drop_dir=None, scan_interval=None):
+        if drop_dir:
+            self.drop_dir = drop_dir
+        if scan_interval:
+            self.scan_interval = scan_interval
+
+    def get_market_news(self, category=None, sentiment=None, q=None, cursor=None, limit=None):
+        """{"items": [...], "next_cursor": str or None}, newest first."""
+        limit = min(max(int(limit or self.DEFAULT_LIMIT), 1), self.MAX_LIMIT)
+        self._maybe_ingest()
+        if self._window is None:
+            self._load_window()
+            if self._window is None:
+                return {"items": [], "next_cursor": None}
+
+        key = (category, sentiment, q, cursor, limit)
+        page = self._pages.get(key)
+        if page is None:
+            page = self._page(category, sentiment, q, cursor, limit)
+            with self._lock:
+                if len(self._pages) >= self.MAX_CACHED_PAGES:
+                    self._pages.clear()
+                self._pages[key] = page
+        return page
+
+    def ingest(self):
+        """Scan the drop folder now; returns the number of new or updated items."""
+        with self._scan_lock:
+            return self._ingest()
+
+    def stats(self):
+        return {
+            "window": len(self._window or []),
+            "tokens": len(self._index),
+            "complete": self._complete,
+            "cached_pages": len(self._pages),
+            "files": len(self._file_mtimes),
+        }
+
+    # --- ingestion ---
+    def _maybe_ingest(self):
+        if time.time() - self._last_scan < self.scan_interval:
+            return
+        # One request scans; the others keep serving the current window
+        if not self._scan_lock.acquire(blocking=False):
+            return
+        try:
+            if time.time() - self._last_scan >= self.scan_interval:
+                self._ingest()
+        finally:
+            self._scan_lock.release()
+
+    def _ingest(self):
+        self._last_scan = time.time()
+        if not self.drop_dir or not os.path.isdir(self.drop_dir):
+            return 0
+
+        items, mtimes = [], {}
+        for entry in sorted(os.scandir(self.drop_dir), key=lambda e: e.name):
+            if not entry.is_file() or self._file_mtimes.get(entry.path) == entry.stat().st_mtime:
+                continue
+            try:
+                items.extend(_parse_file(entry.path))
+                mtimes[entry.path] = entry.stat().st_mtime
+            except Exception as e:
+                logger.warning(f"Skipping news file {entry.name}: {str(e)}")
+
+        if not items:
+            return 0
+        try:
+            count = self._upsert(items)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"News ingestion failed: {str(e)}")
+            return 0
+        # Only mark files done once stored, so a failed commit is retried next scan
+        self._file_mtimes.update(mtimes)
+        logger.info(f"Ingested {count} news items")
+        self._load_window()
+        return count
+
+    def _upsert(self, items):
+        by_guid = {item['guid']: item for item in items}
+        existing = {n.guid: n for n in NewsItem.query.filter(NewsItem.guid.in_(list(by_guid))).all()}
+        for guid, item in by_guid.items():
+            row = existing.get(guid)
+            if row is None:
+                db.session.add(NewsItem(**item))
+            else:
+                for field, value in item.items():
+                    setattr(row, field, value)
+        db.session.commit()
+        return len(by_guid)
+
+    # --- hot window ---
+    def _load_window(self):
+        try:
+            rows = NewsItem.query.order_by(NewsItem.published_at.desc(), NewsItem.id.desc()).limit(self.HOT_SIZE + 1).all()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Could not load news: {str(e)}")
+            return
+
+        complete = len(rows) <= self.HOT_SIZE
+        window = [_to_dict(r) for r in rows[:self.HOT_SIZE]]
+        keys = [(-_micros(item['published_at']), -item['id']) for item in window]
+        index = {}
+        for item in window:
+            for token in item_tokens(item['title'], item['summary']):
+                index.setdefault(token, set()).add(item['id'])
+
+        with self._lock:
+            self._window, self._keys, self._index, self._complete = window, keys, index, complete
+            self._pages = {}
+
+    def _page(self, category, sentiment, q, cursor, limit):
+        after = _decode_cursor(cursor) if cursor else None
+        with self._lock:
+            window, keys, index, complete = self._window, self._keys, self._index, self._complete
+
+        start = bisect_right(keys, (-after[0], -after[1])) if after else 0
+        ids = None
+        tokens = tokenize(q)
+        if tokens:
+            ids = set.intersection(*(index.get(t, set()) for t in tokens))
+
+        items = []
+        for item in window[start:]:
+            if category and item['category'] != category:
+                continue
+            if sentiment and item['sentiment'] != sentiment:
+                continue
+            if ids is not None and item['id'] not in ids:
+                continue
+            items.append(item)
+            if len(items) > limit:
+                break
+
+        if len(items) <= limit and not complete:
+            # Scanned past the oldest item in memory: continue from the database
+            resume = after
+            if start < len(window):
+                resume = (-keys[-1][0], -keys[-1][1])
+            items += self._query(category, sentiment, tokens, resume, limit + 1 - len(items))
+
+        next_cursor = _encode_cursor(items[limit - 1]) if len(items) > limit else None
+        return {"items": items[:limit], "next_cursor": next_cursor}
+
+    def _query(self, category, sentiment, tokens, after, limit):
+        query = NewsItem.query
+        if category:
+            query = query.filter(NewsItem.category == category)
+        if sentiment:
+            query = query.filter(NewsItem.sentiment == sentiment)
+        for token in tokens:
+            # Whole tokens, like the in-memory index ([a-z0-9]+, so no LIKE wildcards)
+            query = query.filter(NewsItem.search_tokens.like(f"% {token} %"))
+        if after:
+            ts = EPOCH + timedelta(microseconds=after[0])
+            query = query.filter(or_(
+                NewsItem.published_at < ts,
+                and_(NewsItem.published_at == ts, NewsItem.id < after[1])
+            ))
+        rows = query.order_by(NewsItem.published_at.desc(), NewsItem.id.desc()).limit(limit).all()
+        return [_to_dict(r) for r in rows]
+
+
+def _to_dict(row):
+    return {
+        "id": row.id,
+        "title": row.title,
+        "summary": row.summary,
+        "source": row.source,
+        "published_at": row.published_at.isoformat(),
+        "sentiment": row.sentiment,
+        "category": row.category,
+        "url": row.url
+    }
+
+
+def _micros(published_at):
+    """Exact microseconds since the epoch of an ISO published_at (no float rounding between tied items)."""
+    return (_parse_time(published_at).replace(tzinfo=None) - EPOCH) // timedelta(microseconds=1)
+
+
+def _encode_cursor(item):
+    raw = f"{_micros(item['published_at'])}|{item['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor):
+    try:
+        ts, item_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        if '.' in ts:
+            return round(float(ts) * 1_000_000), int(item_id)  # float-seconds cursor from an older page
+        return int(ts), int(item_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _parse_time(value):
+    """Naive UTC datetime from an ISO string (published_at is stored naive UTC)."""
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt.replace(tzinfo=timezone.utc)
+
+
+# --- drop file parsing ---
+def _parse_file(path):
+    name = path.lower()
+    if name.endswith('.json'):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        entries = data.get('items', []) if isinstance(data, dict) else data
+        fallback_time = datetime.utcfromtimestamp(os.path.getmtime(path))
+        return [_normalize(e, fallback_time) for e in entries]
+    if name.endswith(('.xml', '.rss')):
+        return _parse_rss(path)
+    return []
+
+
+def _parse_rss(path):
+    root = ET.parse(path).getroot()
+    channel_title = root.findtext('channel/title')
+    fallback_time = datetime.utcfromtimestamp(os.path.getmtime(path))
+    items = []
+    for node in root.iter('item'):
+        published = node.findtext('pubDate')
+        items.append(_normalize({
+            "guid": node.findtext('guid') or node.findtext('link'),
+            "title": node.findtext('title'),
+            "summary": node.findtext('description'),
+            "url": node.findtext('link'),
+            "source": node.findtext('source') or channel_title,
+            "category": node.findtext('category'),
+            "published_at": parsedate_to_datetime(published) if published else None,
+        }, fallback_time))
+    return items
+
+
+def _normalize(entry, fallback_time):
+    title = (entry.get('title') or '').strip()
+    if not title:
+        raise ValueError("News item without a title")
+    summary = (entry.get('summary') or '').strip() or None
+    tokens = item_tokens(title[:300], summary)
+
+    published = entry.get('published_at') or fallback_time
+    if isinstance(published, str):
+        published = datetime.fromisoformat(published.replace('Z', '+00:00'))
+    if published.tzinfo:
+        published = published.astimezone(timezone.utc).replace(tzinfo=None)
+
+    return {
+        "guid": str(entry.get('guid') or entry.get('id') or entry.get('url') or title)[:255],
+        "title": title[:300],
+        "summary": summary,
+        "source": entry.get('source') or 'TradeSense Wire',
+        "url": entry.get('url'),
+        "category": entry.get('category') or _infer_category(tokens),
+        "sentiment": entry.get('sentiment') or _infer_sentiment(tokens),
+        "published_at": published,
+        "search_tokens": f" {' '.join(sorted(tokens))} ",
+    }
+
+
+def _infer_category(tokens):
+    for category, words in CATEGORY_KEYWORDS.items():
+        if tokens & words:
+            return category
+    return 'Markets'
+
+
+def _infer_sentiment(tokens):
+    score = len(tokens & POSITIVE_WORDS) - len(tokens & NEGATIVE_WORDS)
+    if score > 0:
+        return 'positive'
+    if score < 0:
+        return 'negative'
+    return 'neutral'
+
 
 news_service = NewsService()
@@ -0,0 +1,240 @@
+"""
+Position book: net positions per challenge, updated fill by fill.
+
+`Trade` rows are the fill log; `Position` rows are the running result of it,
+one row per (challenge, symbol). Each challenge's book is also held in
+memory, so a fill costs O(1):
+
+    same direction   qty grows, avg_price becomes the size-weighted average
+    reducing         realized += closed qty * (price - avg) * direction
+    flipping         the remainder opens at the fill price
+    flat             avg_price resets to 0
+
+`challenge.balance` is start balance + realized PnL - fees (every position at
+cost). Equity marks the open positions at the latest known price:
+
+    equity = balance + sum(qty * (mark - avg_price))
+
+Marks come from memory (MarketRouter.last_price), so a revaluation touches
+only the open positions, never the trade history or the network.
+
+Books are cached per worker. `challenge.positions_version` is bumped on
+every fill, so a worker whose cached version differs from the row it just
+loaded re-reads the positions (one indexed query). Fills for the same
+challenge racing in two workers can still lose an update, like the equity
+column already could; the routes roll back and `discard` on error.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from sqlalchemy import bindparam
+
+from models import db, Position
+from services.market_router import market_router
+
+logger = logging.getLogger(__name__)
+
+EPSILON = 1e-9  # quantities closer to 0 than this are flat
+
+
+class _Position:
+    __slots__ = ('qty', 'avg_price', 'realized_pnl', 'fees')
+
+    def __init__(self, qty=0.0, avg_price=0.0, realized_pnl=0.0, fees=0.0):
+        self.qty = qty
+        self.avg_price = avg_price
+        self.realized_pnl = realized_pnl
+        self.fees = fees
+
+    def apply(self, qty, price):
+        """Book a signed fill (+ buy, - sell). Returns the PnL it realized."""
+        held = self.qty
+        if abs(held) < EPSILON or (held > 0) == (qty > 0):
+            total = held + qty
+            self.avg_price = (held * self.avg_price + qty * price) / total
+            self.qty = total
+            return 0.0
+
+        closed = min(abs(qty), abs(held))
+        direction = 1.0 if held > 0 else -1.0
+        realized = closed * (price - self.avg_price) * direction
+        self.realized_pnl += realized
+        self.qty = held + qty
+        if abs(self.qty) < EPSILON:
+            self.qty = 0.0
+            self.avg_price = 0.0
+        elif (self.qty > 0) != (held > 0):
+            self.avg_price = price  # flipped: what's left was opened by this fill
+        return realized
+
+
+class _Book:
+    __slots__ = ('version', 'positions')
+
+    def __init__(self, version, positions):
+        self.version = version
+        self.positions = positions  # symbol -> _Position (has a row in `positions`)
+
+
+class PositionBook:
+    DEFAULT_MAX_BOOKS = 4096
+
+    def __init__(self, max_books=None):
+        self.max_books = max_books or self.DEFAULT_MAX_BOOKS
+        self._lock = threading.Lock()
+        self._books = OrderedDict()  # challenge_id -> _Book, least recently used first
+
+        self.loads = 0
+        self.hits = 0
+        self.fills = 0
+
+    def fill(self, challenge, symbol, side, qty, price, commission=0.0):
+        """
+        Book a fill against `challenge` and re-mark its equity. Stages the
+        position row and challenge columns on the session; the caller commits
+        (and calls `discard` if it rolls back). Returns the position dict.
+        """
+        return self.fill_many(challenge, [(symbol, side, qty, price, commission)])[0]
+
+    def fill_many(self, challenge, fills):
+        """
+        Book several fills, each (symbol, side, qty, price, commission), in
+        order. Writes one position row per symbol touched (one executemany
+        INSERT for new symbols, one for updates) and marks equity once.
+        Returns one position dict per fill, as it stood after that fill.
+        """
+        book = self._book(challenge)
+        results = []
+        touched = {}  # symbol -> True if it had no row before this batch
+        realized_total = fees_total = 0.0
+        with self._lock:
+            for symbol, side, qty, price, commission in fills:
+                position = book.positions.get(symbol)
+                if position is None:
+                    position = book.positions[symbol] = _Position()
+                    touched[symbol] = True
+                else:
+                    touched.setdefault(symbol, False)
+                realized = position.apply(qty if side == 'buy' else -qty, price)
+                position.fees += commission
+                realized_total += realized
+                fees_total += commission
+                results.append((symbol, _Position(position.qty, position.avg_price, position.realized_pnl, position.fees), realized))
+
+            now = datetime.utcnow()
+            inserts, updates = [], []
+            for symbol, is_new in touched.items():
+                position = book.positions[symbol]
+                values = dict(qty=position.qty, avg_price=position.avg_price, realized_pnl=position.realized_pnl,
+                              fees=position.fees, updated_at=now)
+                if is_new:
+                    inserts.append(dict(values, challenge_id=challenge.id, symbol=symbol))
+                else:
+                    updates.append(dict(values, b_challenge_id=challenge.id, b_symbol=symbol))
+
+            challenge.balance = self.balance(challenge) + realized_total - fees_total
+            challenge.positions_version = (challenge.positions_version or 0) + 1
+            book.version = challenge.positions_version
+            self.fills += len(fills)
+
+        if inserts:
+            db.session.execute(Position.__table__.insert(), inserts)
+        if updates:
+            table = Position.__table__
+            db.session.execute(
+                table.update()
+                .where(table.c.challenge_id == bindparam('b_challenge_id'))
+                .where(table.c.symbol == bindparam('b_symbol')),
+                updates,
+            )
+
+        challenge.equity = self.equity(challenge)
+        output = []
+        for symbol, position, realized in results:
+            result = self._describe(symbol, position)
+            result["realized"] = realized
+            output.append(result)
+        return output
+
+    def equity(self, challenge):
+        """Balance plus unrealized PnL of the open positions at their latest marks."""
+        book = self._book(challenge)
+        with self._lock:
+            open_positions = [(s, p.qty, p.avg_price) for s, p in book.positions.items() if p.qty]
+        unrealized = 0.0
+        for symbol, qty, avg_price in open_positions:
+            mark = market_router.last_price(symbol)
+            if mark is not None:
+                unrealized += qty * (mark - avg_price)
+        return self.balance(challenge) + unrealized
+
+    @staticmethod
+    def balance(challenge):
+        # Rows from before the positions table have no balance yet
+        return challenge.balance if challenge.balance is not None else challenge.equity
+
+    def positions(self, challenge, include_flat=False):
+        book = self._book(challenge)
+        with self._lock:
+            items = [(s, _Position(p.qty, p.avg_price, p.realized_pnl, p.fees)) for s, p in book.positions.items()]
+        return [self._describe(s, p) for s, p in items if include_flat or p.qty]
+
+    def discard(self, challenge_id=None):
+        """Forget a cached book (after a rollback), or every book."""
+        with self._lock:
+            if challenge_id is None:
+                self._books.clear()
+            else:
+                self._books.pop(challenge_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "books": len(self._books),
+                "max_books": self.max_books,
+                "loads": self.loads,
+                "hits": self.hits,
+                "fills": self.fills,
+            }
+
+    def _book(self, challenge):
+        version = challenge.positions_version or 0
+        with self._lock:
+            book = self._books.get(challenge.id)
+            if book is not None and book.version == version:
+                self._books.move_to_end(challenge.id)
+                self.hits += 1
+                return book
+
+        rows = Position.query.filter_by(challenge_id=challenge.id).all()
+        book = _Book(version, {
+            row.symbol: _Position(row.qty, row.avg_price, row.realized_pnl, row.fees) for row in rows
+        })
+        with self._lock:
+            self._books[challenge.id] = book
+            self._books.move_to_end(challenge.id)
+            while len(self._books) > self.max_books:
+                self._books.popitem(last=False)
+            self.loads += 1
+        return book
+
+    @staticmethod
+    def _describe(symbol, position):
+        mark = market_router.last_price(symbol) if position.qty else None
+        if mark is None:
+            mark = position.avg_price
+        return {
+            "symbol": symbol,
+            "qty": position.qty,
+            "side": "long" if position.qty > 0 else "short" if position.qty < 0 else "flat",
+            "avg_price": position.avg_price,
+            "mark": mark,
+            "unrealized_pnl": position.qty * (mark - position.avg_price) + 0.0,  # no -0.0 on flat shorts
+            "realized_pnl": position.realized_pnl,
+            "fees": position.fees,
+        }
+
+
+position_book = PositionBook()
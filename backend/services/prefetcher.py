@@ -0,0 +1,182 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from services.async_market import async_bridge, async_market
+from services.morocco_scraper import MoroccoScraper
+from services.quote_cache import quote_cache
+from services.shared_quotes import shared_quotes
+from services.symbols import symbol_registry
+
+logger = logging.getLogger(__name__)
+
+
+class QuotePrefetcher:
+    """
+    Background thread that keeps hot quotes warm so request handlers and order
+    execution read from memory instead of waiting on Yahoo / BVC.
+
+    A symbol is hot if it was requested within HOT_WINDOW seconds or is pinned
+    in config (PREFETCH_SYMBOLS). Callers touch a symbol only once the router
+    returned a real quote for it, so made-up symbols never get refreshed, and
+    at most MAX_HOT requested symbols are kept (least recently requested
+    dropped first). Each pass refreshes the entries that would
+    expire before the next pass. Yahoo symbols due for a refresh are
+    refetched together on the async loop, so a pass costs about one upstream
+    round trip however many symbols are hot.
+
+    With the shared quote table enabled, only the worker elected writer
+    refreshes. Its hot set includes the symbols any worker asked for, and it
+    publishes every pass to the table. The other workers' passes just retry
+    the election, so one of them takes over if the writer dies.
+    """
+
+    INTERVAL = 5  # seconds between passes (keep below the smallest quote TTL)
+    HOT_WINDOW = 300  # seconds a requested symbol stays hot
+    MAX_HOT = 256  # requested symbols tracked at once (pinned ones not counted)
+
+    def __init__(self):
+        self.interval = self.INTERVAL
+        self.hot_window = self.HOT_WINDOW
+        self._lock = threading.Lock()
+        self._last_requested = OrderedDict()  # symbol -> time of last request, oldest first
+        self._pinned = set()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.passes = 0
+        self.refreshed = 0
+        self.failures = 0
+
+    def configure(self, pinned=None, interval=None, hot_window=None):
+        with self._lock:
+            if pinned:
+                self._pinned.update(pinned)
+        if interval:
+            self.interval = interval
+        if hot_window:
+            self.hot_window = hot_window
+
+    def touch(self, symbol):
+        """
+        Record a request for `symbol` so the refresher keeps it warm. Call it
+        after the router returned a real quote (market_router.is_real).
+        """
+        with self._lock:
+            self._last_requested[symbol] = time.time()
+            self._last_requested.move_to_end(symbol)
+            while len(self._last_requested) > self.MAX_HOT:
+                self._last_requested.popitem(last=False)
+        shared_quotes.want(symbol)
+
+    def hot_symbols(self):
+        cutoff = time.time() - self.hot_window
+        with self._lock:
+            while self._last_requested and next(iter(self._last_requested.values())) < cutoff:
+                self._last_requested.popitem(last=False)
+            hot = self._pinned | set(self._last_requested)
+        if shared_quotes.is_writer:
+            hot |= shared_quotes.wanted(cutoff)
+        return hot
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='quote-prefetcher', daemon=True)
+        self._thread.start()
+        logger.info(f"Quote prefetcher started (every {self.interval}s, pinned={sorted(self._pinned)})")
+
+    def stop(self):
+        self._stop.set()
+
+    def refresh_once(self):
+        """One refresh pass over the hot set."""
+        if shared_quotes.enabled and not shared_quotes.try_elect():
+            # Another worker refreshes and publishes; this one reads the shared table
+            self.passes += 1
+            return
+
+        horizon = self.interval * 2
+        symbols = self.hot_symbols()
+
+        # Snapshot policy (BVC): one scrape refreshes every Moroccan symbol at once
+        if any(symbol_registry.lookup(s).refresh == 'snapshot' for s in symbols):
+            if MoroccoScraper.snapshot_age() > MoroccoScraper.CACHE_DURATION - horizon:
+                self._refresh(MoroccoScraper.refresh)
+                if shared_quotes.enabled:
+                    self._publish_snapshot()
+
+        due = []
+        for symbol in symbols:
+            if symbol_registry.lookup(symbol).refresh != 'ttl':
+                continue
+            remaining = quote_cache.expires_in(symbol)
+            if remaining is None or remaining < horizon:
+                due.append(symbol)
+        if due:
+            self._refresh_quotes(due)
+        if shared_quotes.enabled:
+            self._publish(symbols)
+
+        self.passes += 1
+
+    def stats(self):
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "interval": self.interval,
+            "hot_symbols": sorted(self.hot_symbols()),
+            "passes": self.passes,
+            "refreshed": self.refreshed,
+            "failures": self.failures,
+            "shared_writer": shared_quotes.is_writer,
+        }
+
+    def _refresh(self, fn, *args):
+        try:
+            fn(*args)
+            self.refreshed += 1
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"Prefetch failed for {args or fn.__name__}: {str(e)}")
+
+    def _refresh_quotes(self, symbols):
+        try:
+            failed = async_bridge.run(async_market.refresh_quotes(symbols), self.interval * 2)
+        except Exception as e:
+            failed = {symbol: e for symbol in symbols}
+        self.refreshed += len(symbols) - len(failed)
+        self.failures += len(failed)
+        for symbol, error in failed.items():
+            logger.warning(f"Prefetch failed for {symbol}: {str(error)}")
+
+    def _publish(self, symbols):
+        """Copy this worker's fresh Yahoo quotes into the shared table."""
+        now = time.time()
+        for symbol in symbols:
+            if symbol_registry.lookup(symbol).refresh != 'ttl':
+                continue
+            quote, remaining = quote_cache.fresh(symbol)
+            if quote is not None:
+                shared_quotes.put(symbol, quote, now + remaining)
+
+    def _publish_snapshot(self):
+        snapshot = MoroccoScraper._cache
+        expires = snapshot['timestamp'] + MoroccoScraper.CACHE_DURATION
+        for symbol in symbol_registry.symbols('BVC'):
+            quote = snapshot['quotes'].get(symbol)
+            if quote:
+                shared_quotes.put(symbol, quote, expires)
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.time()
+            try:
+                self.refresh_once()
+            except Exception as e:
+                logger.error(f"Prefetch pass crashed: {str(e)}")
+            self._stop.wait(max(0.0, self.interval - (time.time() - started)))
+
+
+prefetcher = QuotePrefetcher()
@@ -0,0 +1,240 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Flight:
+    """A single in-progress upstream load that concurrent callers wait on."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class _Failure:
+    """Cached failed load: repeat lookups re-raise it until it expires. Keeps the last good value for peek()."""
+
+    def __init__(self, error, last=None):
+        self.error = error
+        self.last = last
+
+
+class QuoteCache:
+    """
+    Process-wide quote cache shared by every request thread.
+
+    - TTL depends on the symbol class (crypto moves faster than equities).
+    - Bounded: least recently used entries are evicted past `max_entries`.
+    - Single-flight: concurrent misses for the same key wait for one upstream
+      fetch instead of each calling Yahoo.
+    - Negative caching: a failed load is remembered for NEGATIVE_TTL seconds so
+      callers go straight to their fallback instead of retrying upstream. The
+      last good value survives it (peek() still returns it, so positions stay
+      marked through an upstream blip), and a failed early refresh never
+      replaces a value that hasn't expired yet.
+    """
+
+    DEFAULT_TTLS = {
+        'crypto': 10,
+        'forex': 15,
+        'index': 30,
+        'equity': 30,
+    }
+    DEFAULT_MAX_ENTRIES = 512
+    FLIGHT_TIMEOUT = 10  # seconds a follower waits on the leader's fetch
+    NEGATIVE_TTL = 5  # seconds a failed load is cached
+
+    def __init__(self, ttls=None, max_entries=None):
+        self.ttls = dict(self.DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.max_entries = max_entries or self.DEFAULT_MAX_ENTRIES
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._inflight = {}  # key -> _Flight
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.negative_hits = 0
+
+    def configure(self, ttls=None, max_entries=None):
+        """Apply settings from the Flask config (see Config.QUOTE_CACHE_*)."""
+        with self._lock:
+            if ttls:
+                self.ttls.update(ttls)
+            if max_entries:
+                self.max_entries = max_entries
+                self._evict()
+
+    @staticmethod
+    def symbol_class(symbol):
+        """Classify a Yahoo symbol: BTC-USD -> crypto, EURUSD=X -> forex, ^GSPC -> index."""
+        if symbol.endswith('=X'):
+            return 'forex'
+        if symbol.startswith('^'):
+            return 'index'
+        if symbol.endswith(('-USD', '-EUR', '-USDT')):
+            return 'crypto'
+        return 'equity'
+
+    def ttl_for(self, symbol):
+        return self.ttls.get(self.symbol_class(symbol), self.ttls['equity'])
+
+    def get(self, key):
+        """Return the fresh cached value for `key`, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] > time.time() and not isinstance(entry[0], _Failure):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+        return None
+
+    def peek(self, key):
+        """Last good value for `key` even if expired or failed since (None if never loaded). No counters."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            return entry[0].last if isinstance(entry[0], _Failure) else entry[0]
+
+    def fresh(self, key):
+        """(value, seconds left) while a good value for `key` is unexpired, else (None, None). No counters."""
+        with self._lock:
+            entry = self._entries.get(key)
+            remaining = entry[1] - time.time() if entry else 0
+            if remaining > 0 and not isinstance(entry[0], _Failure):
+                return entry[0], remaining
+        return None, None
+
+    def failure(self, key):
+        """The error from a recent failed load of `key` while it is negatively cached, else None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] > time.time() and isinstance(entry[0], _Failure):
+                self.negative_hits += 1
+                return entry[0].error
+        return None
+
+    def set_failure(self, key, error):
+        """Negatively cache a failed load done outside get_or_load (async client)."""
+        with self._lock:
+            self._store_failure(key, error)
+
+    def loading(self, key):
+        """True while a get_or_load for `key` is in flight (a new caller would wait on it)."""
+        return key in self._inflight
+
+    def expires_in(self, key):
+        """Seconds until `key` expires (negative if stale), or None if not cached."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[1] - time.time() if entry else None
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def get_or_load(self, key, loader, ttl=None):
+        """
+        Return the cached value for `key`, calling `loader()` on a miss.
+        Only one caller per key runs the loader; the others wait for its result
+        (or its exception).
+        """
+        if ttl is None:
+            ttl = self.ttl_for(key)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] > time.time():
+                self._entries.move_to_end(key)
+                if isinstance(entry[0], _Failure):
+                    self.negative_hits += 1
+                    raise entry[0].error
+                self.hits += 1
+                return entry[0]
+
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._inflight[key] = flight
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if not flight.event.wait(self.FLIGHT_TIMEOUT):
+                raise TimeoutError(f"Timed out waiting for in-flight load of {key}")
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+        except Exception as e:
+            flight.error = e
+            with self._lock:
+                self._store_failure(key, e)
+            raise
+        else:
+            with self._lock:
+                self._store(key, flight.value, ttl)
+            return flight.value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.event.set()
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttls": dict(self.ttls),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "negative_hits": self.negative_hits,
+                "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+                "inflight": len(self._inflight),
+            }
+
+    # --- internals (caller holds self._lock) ---
+    def _store(self, key, value, ttl):
+        self._entries[key] = (value, time.time() + ttl)
+        self._entries.move_to_end(key)
+        self._evict()
+
+    def _store_failure(self, key, error):
+        entry = self._entries.get(key)
+        if entry is None:
+            last = None
+        elif isinstance(entry[0], _Failure):
+            last = entry[0].last
+        elif entry[1] > time.time():
+            return  # a failed early (forced) refresh: the cached value is still good
+        else:
+            last = entry[0]
+        self._store(key, _Failure(error, last), self.NEGATIVE_TTL)
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+
+quote_cache = QuoteCache()
@@ -0,0 +1,145 @@
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Subscriber:
+    """One open stream. Receives (symbol, quote) tuples on a bounded queue."""
+
+    def __init__(self, symbols, maxsize):
+        self.symbols = frozenset(symbols)
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.evicted = False
+
+    def next(self, timeout):
+        """Next (symbol, quote), or None if nothing arrived within `timeout`."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class QuoteHub:
+    """
+    Fan-out of quote updates to streaming clients.
+
+    A single publisher thread polls all subscribed symbols in one batch per
+    PUBLISH_INTERVAL (fetched concurrently; reads mostly hit the quote cache
+    the prefetcher keeps warm) and pushes only changed quotes to every subscriber of that symbol. Upstream
+    load therefore depends on the number of symbols, not on open dashboards.
+    Each subscriber has a bounded queue; one that falls QUEUE_SIZE updates
+    behind is evicted instead of buffering without limit.
+    """
+
+    PUBLISH_INTERVAL = 2  # seconds
+    QUEUE_SIZE = 64
+    MAX_SUBSCRIBERS = 5000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}  # symbol -> set(Subscriber)
+        self._count = 0
+        self._latest = {}  # symbol -> last published quote
+        self._source = None
+        self._thread = None
+
+        self.published = 0
+        self.delivered = 0
+        self.evictions = 0
+
+    def configure(self, source):
+        """`source(symbols)` returns {symbol: quote} for the symbols it could fetch."""
+        self._source = source
+
+    def subscribe(self, symbols):
+        with self._lock:
+            if self._count >= self.MAX_SUBSCRIBERS:
+                return None
+            sub = Subscriber(symbols, self.QUEUE_SIZE)
+            for symbol in sub.symbols:
+                self._subscribers.setdefault(symbol, set()).add(sub)
+            self._count += 1
+        self._ensure_publisher()
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            removed = False
+            for symbol in sub.symbols:
+                subs = self._subscribers.get(symbol)
+                if subs and sub in subs:
+                    subs.discard(sub)
+                    removed = True
+                    if not subs:
+                        del self._subscribers[symbol]
+            if removed:
+                self._count -= 1
+
+    def latest(self, symbol):
+        return self._latest.get(symbol)
+
+    def publish(self, symbol, quote):
+        """Deliver `quote` to every subscriber of `symbol`, evicting any that are full."""
+        self._latest[symbol] = quote
+        with self._lock:
+            subs = list(self._subscribers.get(symbol, ()))
+        self.published += 1
+        for sub in subs:
+            if sub.evicted:
+                continue
+            try:
+                sub.queue.put_nowait((symbol, quote))
+                self.delivered += 1
+            except queue.Full:
+                sub.evicted = True
+                self.evictions += 1
+                self.unsubscribe(sub)
+                logger.info(f"Evicted slow stream subscriber ({len(sub.symbols)} symbols)")
+
+    def stats(self):
+        with self._lock:
+            symbols = len(self._subscribers)
+            count = self._count
+        return {
+            "subscribers": count,
+            "symbols": symbols,
+            "published": self.published,
+            "delivered": self.delivered,
+            "evictions": self.evictions,
+        }
+
+    def _ensure_publisher(self):
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='quote-publisher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            started = time.time()
+            with self._lock:
+                symbols = list(self._subscribers)
+            quotes = {}
+            if symbols:
+                try:
+                    quotes = self._source(symbols)
+                except Exception as e:
+                    logger.warning(f"Stream source failed for {len(symbols)} symbols: {str(e)}")
+            for symbol, quote in quotes.items():
+                previous = self._latest.get(symbol)
+                if quote and (previous is None or _changed(previous, quote)):
+                    self.publish(symbol, quote)
+            time.sleep(max(0.0, self.PUBLISH_INTERVAL - (time.time() - started)))
+
+
+def _changed(old, new):
+    return any(old.get(k) != new.get(k) for k in ('price', 'change', 'change_pct', 'source'))
+
+
+quote_hub = QuoteHub()
@@ -0,0 +1,80 @@
+"""
+Vectorized OHLCV resampling: build higher timeframes from stored base bars.
+
+open = first, high = max, low = min, close = last, volume = sum.
+
+Buckets are aligned to the instrument's session: intraday buckets start at
+the regular session open (US equities: 09:30, 10:30, ...), daily buckets at
+exchange-local midnight, weekly on Monday and monthly on the 1st.
+"""
+import numpy as np
+
+from services.bar_store import Bars
+
+# Target interval -> (base interval it is built from, bucket size in seconds or 'month')
+RESAMPLE_RULES = {
+    '2m': ('1m', 120),
+    '5m': ('1m', 300),
+    '15m': ('1m', 900),
+    '30m': ('1m', 1800),
+    '60m': ('1m', 3600),
+    '1h': ('1m', 3600),
+    '90m': ('1m', 5400),
+    '4h': ('1h', 4 * 3600),
+    '1wk': ('1d', 7 * 86400),
+    '1mo': ('1d', 'month'),
+}
+
+# Yahoo only serves 1m bars for recent ranges, so minute-based targets are
+# resampled only for these periods; longer ones are fetched natively.
+MINUTE_BASE_PERIODS = ('1d', '5d')
+
+EPOCH_TO_MONDAY = 4 * 86400  # 1970-01-01 was a Thursday
+
+
+def resample_base(interval, period):
+    """Base interval to build `interval` from for `period`, or None to fetch it directly."""
+    rule = RESAMPLE_RULES.get(interval)
+    if not rule:
+        return None
+    base, _ = rule
+    if base == '1m' and period not in MINUTE_BASE_PERIODS:
+        return None
+    return base
+
+
+def bucket_starts(times, step, gmtoffset=0, session_start=None):
+    """Start time of the bucket each timestamp falls in."""
+    if step == 'month':
+        local = (times + gmtoffset).astype('datetime64[s]')
+        months = local.astype('datetime64[M]').astype('datetime64[s]').astype(np.int64)
+        return months - gmtoffset
+
+    if step >= 7 * 86400:
+        offset = EPOCH_TO_MONDAY - gmtoffset
+    elif step >= 86400:
+        offset = -gmtoffset
+    else:
+        offset = session_start or 0
+    offset %= step
+    return (times - offset) // step * step + offset
+
+
+def resample(bars, interval, gmtoffset=0, session_start=None):
+    """Resample `bars` (sorted by time) to `interval` (a RESAMPLE_RULES key)."""
+    if not len(bars):
+        return Bars.empty()
+    _, step = RESAMPLE_RULES[interval]
+
+    buckets = bucket_starts(np.asarray(bars.time), step, gmtoffset, session_start)
+    starts = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+    ends = np.concatenate((starts[1:], [len(buckets)])) - 1
+
+    return Bars(
+        buckets[starts],
+        np.asarray(bars.open)[starts],
+        np.maximum.reduceat(np.asarray(bars.high), starts),
+        np.minimum.reduceat(np.asarray(bars.low), starts),
+        np.asarray(bars.close)[ends],
+        np.add.reduceat(np.asarray(bars.volume), starts),
+    )
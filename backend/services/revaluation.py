@@ -0,0 +1,309 @@
+"""
+Periodic revaluation of every active challenge.
+
+The rules engine only runs inside trade requests, so a challenge holding
+positions while the market moves would not fail or pass until its next
+trade. This job re-marks them all on a timer:
+
+    1. load active challenges (id, start balance, realized balance, day
+       start, stored equity) into NumPy arrays, and bring the cached arrays
+       of open positions up to date with the rows changed since the last
+       pass (`positions.updated_at`; a full reload every FULL_SYNC_EVERY)
+    2. mark each distinct symbol once from memory (MarketRouter.last_price)
+    3. equity = balance + per-challenge sum of qty * (mark - avg_price)
+       (np.bincount), then the total-loss, daily-loss and profit-target
+       checks for every challenge in one vectorized pass
+    4. write new statuses, and equities that moved by more than 0.1% of
+       the start balance, back in one executemany UPDATE, guarded by
+       `status = 'active'` and by the positions_version and balance read in
+       step 1: a row a trade committed to since the read (a verdict, a fill,
+       a new balance) is skipped rather than overwritten with stale equity,
+       and picked up again on the next pass
+
+The marked equities of challenges holding positions are also fed to the
+intraday drawdown tracker (services/drawdown.py).
+
+Thresholds match RulesEngine.evaluate_challenge. Only one worker per host
+runs the job when the shared quote table is on (the writer, whose marks
+are freshest). The open positions' symbols are touched on the prefetcher
+each pass so their quotes stay warm.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import bindparam, func, select
+
+from models import db, Challenge, Position
+from services.conditional import content_versions
+from services.drawdown import drawdown_tracker
+from services.market_router import market_router
+from services.prefetcher import prefetcher
+from services.shared_quotes import shared_quotes
+
+logger = logging.getLogger(__name__)
+
+ACTIVE, FAILED_TOTAL_LOSS, FAILED_DAILY_LOSS, PASSED = 0, 1, 2, 3
+VERDICTS = {FAILED_TOTAL_LOSS: 'failed_total_loss', FAILED_DAILY_LOSS: 'failed_daily_loss', PASSED: 'passed'}
+
+MAX_TOTAL_LOSS = 0.90  # fail at or below 90% of start balance
+MAX_DAILY_LOSS = 0.95  # fail at or below 95% of the day's starting equity
+PROFIT_TARGET = 1.10  # pass at or above 110% of start balance
+EQUITY_EPSILON = 0.005  # never write moves smaller than half a cent
+EQUITY_WRITE_FRACTION = 0.001  # or smaller than 0.1% of the start balance (statuses are always written)
+
+
+def revalue(balance, start_balance, day_start, position_row, qty, avg_price, symbol_index, marks):
+    """
+    Mark and judge every challenge at once.
+
+    Per challenge: `balance`, `start_balance`, `day_start` (float arrays).
+    Per open position: `position_row` (index into the challenge arrays),
+    `qty`, `avg_price`, `symbol_index` (index into `marks`). `marks` holds one
+    price per distinct symbol, NaN when unknown (those positions count at
+    cost). Returns (equity, verdict) arrays.
+    """
+    mark = marks[symbol_index]
+    unrealized = np.where(np.isnan(mark), 0.0, qty * (mark - avg_price))
+    equity = balance + np.bincount(position_row, weights=unrealized, minlength=len(balance))
+
+    verdict = np.select(
+        [equity <= start_balance * MAX_TOTAL_LOSS,
+         equity <= day_start * MAX_DAILY_LOSS,
+         equity >= start_balance * PROFIT_TARGET],
+        [FAILED_TOTAL_LOSS, FAILED_DAILY_LOSS, PASSED],
+        ACTIVE,
+    )
+    return equity, verdict
+
+
+def _rows(conn, statement):
+    """
+    Plain tuples straight from the DBAPI cursor. Building a Row object per
+    record costs more than the whole NumPy pass at 100k challenges; the
+    columns read here are ints, floats and strings, which need no result
+    processing.
+    """
+    result = conn.execute(statement)
+    try:
+        return result.cursor.fetchall()
+    finally:
+        result.close()
+
+
+def _columns(conn, width, statement):
+    return list(zip(*_rows(conn, statement))) or [()] * width
+
+
+class Revaluator:
+    INTERVAL = 15  # seconds between passes
+    SYNC_MARGIN = 60  # seconds of overlap when reading changed positions (late commits, clock skew)
+    FULL_SYNC_EVERY = 40  # passes between full reloads of the position arrays
+
+    def __init__(self):
+        self.interval = self.INTERVAL
+        self._app = None
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Open positions of every challenge as parallel arrays, kept between
+        # passes and patched with the rows changed since the last sync
+        self._synced_at = None
+        self._slots = {}  # (challenge_id, symbol) -> index into the arrays
+        self._symbols = {}  # symbol -> index into the marks
+        self._cid = np.zeros(0, dtype=np.int64)
+        self._sym = np.zeros(0, dtype=np.int64)
+        self._qty = np.zeros(0)
+        self._avg = np.zeros(0)
+
+        self.passes = 0
+        self.failed = 0
+        self.passed = 0
+        self.last = {}  # timings and counts of the last pass
+
+    def configure(self, app, interval=None):
+        self._app = app
+        if interval:
+            self.interval = interval
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='challenge-revaluator', daemon=True)
+        self._thread.start()
+        logger.info(f"Challenge revaluator started (every {self.interval}s)")
+
+    def stop(self):
+        self._stop.set()
+
+    def run_once(self, now=None):
+        """One pass over every active challenge (needs an app context). Returns {verdict: count}."""
+        started = time.perf_counter()
+        now = now or datetime.utcnow()
+        conn = db.session.connection()
+        challenges = Challenge.__table__.c
+
+        columns = _columns(conn, 6,
+            select(
+                challenges.id,
+                challenges.start_balance,
+                func.coalesce(challenges.balance, challenges.equity),
+                func.coalesce(challenges.daily_start_equity, challenges.start_balance),  # set by the daily rollover
+                challenges.equity,
+                func.coalesce(challenges.positions_version, 0),
+            )
+            .where(challenges.status == 'active')
+            .order_by(challenges.id)
+        )
+        ids = np.array(columns[0], dtype=np.int64)
+        start_balance, balance, day_start, stored = (np.array(c, dtype=np.float64) for c in columns[1:5])
+        versions = np.array(columns[5], dtype=np.int64)
+        changed_positions = self._sync_positions(conn, now)
+        loaded = time.perf_counter()
+
+        # Positions of challenges still active, as row indexes into the challenge arrays
+        row = np.minimum(np.searchsorted(ids, self._cid), max(len(ids) - 1, 0))
+        keep = (self._qty != 0) & (ids[row] == self._cid) if len(ids) else np.zeros(len(self._cid), dtype=bool)
+        names = list(self._symbols)
+        marks = np.array([self._mark(symbol) for symbol in names], dtype=np.float64)
+        equity, verdict = revalue(balance, start_balance, day_start, row[keep], self._qty[keep], self._avg[keep],
+                                  self._sym[keep], marks)
+        computed = time.perf_counter()
+
+        # Marked equity of the challenges holding positions feeds their intraday drawdown
+        held = np.unique(row[keep])
+        drawdown_tracker.update_many(ids[held].tolist(), equity[held].tolist(), day_start[held].tolist(), now)
+
+        # Status changes, plus equities that moved materially (the leaderboard reads the column)
+        moved = np.abs(equity - stored) > np.maximum(start_balance * EQUITY_WRITE_FRACTION, EQUITY_EPSILON)
+        changed = np.flatnonzero((verdict != ACTIVE) | moved)
+        skipped = 0
+        if len(changed):
+            updated = self._write(ids[changed], equity[changed], verdict[changed], versions[changed],
+                                  balance[changed], now)
+            skipped = len(changed) - updated if updated >= 0 else 0
+            content_versions.bump('leaderboard')
+        else:
+            db.session.commit()  # end the read transaction
+        written = time.perf_counter()
+
+        counts = {VERDICTS[v]: int(n) for v, n in zip(*np.unique(verdict[verdict != ACTIVE], return_counts=True))}
+        self.passes += 1
+        self.failed += counts.get('failed_total_loss', 0) + counts.get('failed_daily_loss', 0)
+        self.passed += counts.get('passed', 0)
+        self.last = {
+            "challenges": len(ids),
+            "positions": int(keep.sum()),
+            "positions_synced": changed_positions,
+            "symbols": len(names),
+            "updated": len(changed) - skipped,
+            "skipped": skipped,  # traded on since the read; re-marked next pass
+            "verdicts": counts,
+            "load_ms": round((loaded - started) * 1000, 1),
+            "compute_ms": round((computed - loaded) * 1000, 1),
+            "write_ms": round((written - computed) * 1000, 1),
+        }
+        if counts:
+            logger.info(f"Revaluation: {counts} out of {len(ids)} active challenges")
+        return counts
+
+    def stats(self):
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "interval": self.interval,
+            "passes": self.passes,
+            "failed": self.failed,
+            "passed": self.passed,
+            "cached_positions": len(self._slots),
+            "last": self.last,
+        }
+
+    def _sync_positions(self, conn, now):
+        """Bring the position arrays up to date. Returns how many rows were read."""
+        positions = Position.__table__.c
+        query = select(positions.challenge_id, positions.symbol, positions.qty, positions.avg_price)
+        if self._synced_at is None or self.passes % self.FULL_SYNC_EVERY == 0:
+            # Full reload: fills are the only writers, but deleted challenges and missed rows heal here
+            self._slots, self._symbols = {}, {}
+            self._cid = self._sym = np.zeros(0, dtype=np.int64)
+            self._qty = self._avg = np.zeros(0)
+            rows = _rows(conn, query.where(positions.qty != 0))
+        else:
+            since = self._synced_at - timedelta(seconds=self.SYNC_MARGIN)
+            rows = _rows(conn, query.where(positions.updated_at >= since))
+        self._synced_at = now
+
+        appended = []
+        for cid, symbol, qty, avg_price in rows:
+            slot = self._slots.get((cid, symbol))
+            if slot is None:
+                self._slots[(cid, symbol)] = len(self._cid) + len(appended)
+                appended.append((cid, self._symbols.setdefault(symbol, len(self._symbols)), qty, avg_price))
+            else:
+                self._qty[slot] = qty
+                self._avg[slot] = avg_price
+        if appended:
+            cid, sym, qty, avg_price = zip(*appended)
+            self._cid = np.concatenate([self._cid, np.array(cid, dtype=np.int64)])
+            self._sym = np.concatenate([self._sym, np.array(sym, dtype=np.int64)])
+            self._qty = np.concatenate([self._qty, np.array(qty, dtype=np.float64)])
+            self._avg = np.concatenate([self._avg, np.array(avg_price, dtype=np.float64)])
+        return len(rows)
+
+    def _mark(self, symbol):
+        prefetcher.touch(symbol)  # open positions keep their quotes warm
+        price = market_router.last_price(symbol)
+        return np.nan if price is None else price
+
+    @staticmethod
+    def _write(ids, equity, verdict, versions, balances, now):
+        """Bulk UPDATE of the changed rows; returns how many matched (-1 if the driver can't tell)."""
+        table = Challenge.__table__
+        statuses = np.where(verdict == ACTIVE, 'active', np.where(verdict == PASSED, 'passed', 'failed'))
+        rows = [
+            {
+                "b_id": int(i),
+                "b_version": int(v),
+                "b_balance": float(b),
+                "equity": float(e),
+                "status": str(s),
+                "failed_at": now if s == 'failed' else None,
+                "passed_at": now if s == 'passed' else None,
+            }
+            for i, v, b, e, s in zip(ids.tolist(), versions.tolist(), balances.tolist(), equity.tolist(),
+                                     statuses.tolist())
+        ]
+        result = db.session.execute(
+            table.update()
+            .where(table.c.id == bindparam('b_id'))
+            .where(table.c.status == 'active')
+            # Unchanged since the read: no fill (version) and no other balance change (e.g. the simulated trade route)
+            .where(func.coalesce(table.c.positions_version, 0) == bindparam('b_version'))
+            .where(func.coalesce(table.c.balance, table.c.equity) == bindparam('b_balance'))
+            .values(
+                equity=bindparam('equity'),
+                status=bindparam('status'),
+                failed_at=func.coalesce(bindparam('failed_at', type_=table.c.failed_at.type), table.c.failed_at),
+                passed_at=func.coalesce(bindparam('passed_at', type_=table.c.passed_at.type), table.c.passed_at),
+            ),
+            rows,
+        )
+        db.session.commit()
+        return result.rowcount
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.time()
+            if not shared_quotes.enabled or shared_quotes.try_elect():
+                try:
+                    with self._app.app_context():
+                        self.run_once()
+                except Exception as e:
+                    logger.error(f"Revaluation pass crashed: {str(e)}")
+            self._stop.wait(max(0.0, self.interval - (time.time() - started)))
+
+
+revaluator = Revaluator()
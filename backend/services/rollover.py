@@ -0,0 +1,195 @@
+"""
+End-of-day rollover for daily drawdown accounting.
+
+Once per UTC day, for every active challenge at once (one transaction, three
+set-based statements, no per-challenge queries):
+
+    1. close  stamp the closing equity on each still-open `daily_metrics`
+              row (day_end_equity IS NULL): day_end_equity and day_pnl
+    2. reset  challenges.daily_start_equity = equity, last_daily_reset = now
+    3. open   INSERT ... SELECT today's `daily_metrics` row for every active
+              challenge that lacks one, starting at daily_start_equity
+
+Between rollovers, each check only opens rows for challenges created since
+midnight (the checkout routes open the first day themselves, `open_day`). Every step is idempotent (guarded by last_daily_reset and NOT
+EXISTS), so a restart or a second worker re-running it changes nothing.
+
+The trade path then reads the precomputed `challenge.daily_start_equity`
+through `day_start()`, with no metrics query. If the job hasn't reached a
+challenge yet today (disabled on Vercel, or a trade in the seconds after
+midnight), `day_start()` rolls that one challenge over inline, with the same
+three steps.
+
+Closing equity is the `equity` column as last written by a trade or the
+revaluation job.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, literal, or_, select
+
+from models import db, Challenge, DailyMetrics
+from services.shared_quotes import shared_quotes
+
+logger = logging.getLogger(__name__)
+
+
+class DailyRollover:
+    INTERVAL = 60  # seconds between checks
+
+    def __init__(self):
+        self.interval = self.INTERVAL
+        self._app = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._rolled_day = None  # UTC date of the last full rollover by this process
+
+        self.rollovers = 0
+        self.inline = 0
+        self.last = {}
+
+    def configure(self, app, interval=None):
+        self._app = app
+        if interval:
+            self.interval = interval
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='daily-rollover', daemon=True)
+        self._thread.start()
+        logger.info(f"Daily rollover started (checks every {self.interval}s)")
+
+    def stop(self):
+        self._stop.set()
+
+    def run_once(self, now=None):
+        """Roll every active challenge into today if it isn't yet (needs an app context). Returns row counts."""
+        started = time.perf_counter()
+        now = now or datetime.utcnow()
+        today = now.date()
+        midnight = datetime.combine(today, datetime.min.time())
+        challenges = Challenge.__table__.c
+        metrics = DailyMetrics.__table__
+
+        closed = reset = 0
+        if self._rolled_day != today:
+            not_rolled = (challenges.status == 'active') & or_(
+                challenges.last_daily_reset.is_(None), challenges.last_daily_reset < midnight)
+            closing = select(challenges.equity).where(challenges.id == metrics.c.challenge_id).scalar_subquery()
+            closed = db.session.execute(
+                metrics.update()
+                .where(metrics.c.date < today)
+                .where(metrics.c.day_end_equity.is_(None))
+                .where(metrics.c.challenge_id.in_(select(challenges.id).where(not_rolled)))
+                .values(day_end_equity=closing, day_pnl=closing - metrics.c.day_start_equity)
+            ).rowcount
+            reset = db.session.execute(
+                Challenge.__table__.update()
+                .where(not_rolled)
+                .values(daily_start_equity=challenges.equity, last_daily_reset=now)
+            ).rowcount
+            opened = self._open(today)
+        else:
+            opened = self._open(today, created_since=midnight)
+        db.session.commit()
+
+        if self._rolled_day != today:
+            self._rolled_day = today
+            self.rollovers += 1
+            logger.info(f"Daily rollover to {today}: closed {closed}, reset {reset}, opened {opened}")
+        self.last = {
+            "day": today.isoformat(),
+            "closed": closed,
+            "reset": reset,
+            "opened": opened,
+            "ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+        return self.last
+
+    def day_start(self, challenge, now=None):
+        """Equity `challenge` started today with. Reads the precomputed column; rolls it over inline if stale."""
+        now = now or datetime.utcnow()
+        if (challenge.daily_start_equity is not None and challenge.last_daily_reset is not None
+                and challenge.last_daily_reset.date() >= now.date()):
+            return challenge.daily_start_equity
+
+        # The job hasn't reached this challenge today: same three steps, for one challenge
+        today = now.date()
+        equity = challenge.equity
+        DailyMetrics.query.filter(
+            DailyMetrics.challenge_id == challenge.id,
+            DailyMetrics.date < today,
+            DailyMetrics.day_end_equity.is_(None),
+        ).update({
+            DailyMetrics.day_end_equity: equity,
+            DailyMetrics.day_pnl: equity - DailyMetrics.day_start_equity,
+        }, synchronize_session=False)
+        if challenge.last_daily_reset is not None and challenge.last_daily_reset.date() >= today:
+            # Rolled already, only the start value is missing (created without one)
+            challenge.daily_start_equity = challenge.start_balance
+        else:
+            challenge.daily_start_equity = equity
+            challenge.last_daily_reset = now
+        if not DailyMetrics.query.filter_by(challenge_id=challenge.id, date=today).first():
+            db.session.add(DailyMetrics(challenge_id=challenge.id, date=today,
+                                        day_start_equity=challenge.daily_start_equity,
+                                        day_pnl=0.0, max_intraday_drawdown_pct=0.0))
+        db.session.commit()
+        self.inline += 1
+        return challenge.daily_start_equity
+
+    @staticmethod
+    def open_day(challenge, now=None):
+        """Stage today's `daily_metrics` row for a challenge being created (the caller commits)."""
+        db.session.add(DailyMetrics(challenge=challenge, date=(now or datetime.utcnow()).date(),
+                                    day_start_equity=challenge.daily_start_equity or challenge.start_balance,
+                                    day_pnl=0.0, max_intraday_drawdown_pct=0.0))
+
+    def stats(self):
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "interval": self.interval,
+            "rolled_day": self._rolled_day.isoformat() if self._rolled_day else None,
+            "rollovers": self.rollovers,
+            "inline": self.inline,
+            "last": self.last,
+        }
+
+    @staticmethod
+    def _open(today, created_since=None):
+        challenges = Challenge.__table__.c
+        metrics = DailyMetrics.__table__
+        has_row = select(metrics.c.id).where(metrics.c.challenge_id == challenges.id, metrics.c.date == today).exists()
+        source = select(
+            challenges.id,
+            literal(today, type_=metrics.c.date.type),
+            func.coalesce(challenges.daily_start_equity, challenges.start_balance),
+            literal(0.0),
+            literal(0.0),
+        ).where(challenges.status == 'active', ~has_row)
+        if created_since is not None:
+            source = source.where(challenges.created_at >= created_since)
+        return db.session.execute(
+            metrics.insert().from_select(
+                ['challenge_id', 'date', 'day_start_equity', 'day_pnl', 'max_intraday_drawdown_pct'], source)
+        ).rowcount
+
+    def _run(self):
+        while not self._stop.is_set():
+            if not shared_quotes.enabled or shared_quotes.try_elect():
+                try:
+                    with self._app.app_context():
+                        self.run_once()
+                except Exception as e:
+                    logger.error(f"Daily rollover crashed: {str(e)}")
+            # Wake at the next check or just after midnight, whichever is first
+            now = datetime.utcnow()
+            midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+            self._stop.wait(min(self.interval, (midnight - now).total_seconds() + 1))
+
+
+daily_rollover = DailyRollover()
@@ -0,0 +1,164 @@
+import threading
+import time
+from collections import OrderedDict
+
+from services.bar_store import Bars, bar_store
+
+
+# Seconds per bar for each Yahoo `interval`
+INTERVAL_SECONDS = {
+    '1m': 60, '2m': 120, '5m': 300, '15m': 900, '30m': 1800,
+    '60m': 3600, '90m': 5400, '1h': 3600, '4h': 4 * 3600,
+    '1d': 86400, '5d': 5 * 86400, '1wk': 7 * 86400, '1mo': 30 * 86400,
+}
+
+
+class _Series:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.starts = {}  # period -> time of the first bar in its last full load
+        self.loaded_at = {}  # period -> when that full load happened
+        self.last_fetch = 0.0
+        self.last_access = time.time()
+
+
+class SeriesCache:
+    """
+    Per-(symbol, interval) fetch bookkeeping over the columnar bar store.
+
+    After a full load, polls only ask upstream for bars from the last cached
+    timestamp onward (the last bar may still be forming) and merge them in.
+    Periods share the same bars (1h/1mo is a slice of 1h/3mo); each period's
+    left edge comes from its own full load, which is redone every FULL_RELOAD
+    so the window rolls forward. Series nobody asked for within IDLE_TTL are
+    evicted from memory (their history stays on disk).
+    """
+
+    IDLE_TTL = 600  # seconds
+    MAX_SERIES = 256
+    FULL_RELOAD = 3600  # seconds between full loads of the same period
+    MIN_REFRESH = 15  # never hit upstream more often than this per series
+    MAX_REFRESH = 300
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = OrderedDict()  # (symbol, interval) -> _Series
+
+        self.hits = 0
+        self.full_fetches = 0
+        self.delta_fetches = 0
+        self.bars_fetched = 0
+        self.evictions = 0
+
+    def refresh_after(self, interval):
+        """Poll upstream about once per bar, within [MIN_REFRESH, MAX_REFRESH]."""
+        step = INTERVAL_SECONDS.get(interval, 60)
+        return min(max(step, self.MIN_REFRESH), self.MAX_REFRESH)
+
+    def get(self, symbol, interval, period, fetch_full, fetch_since):
+        """
+        Return the Bars for (symbol, interval) covering `period`.
+
+        fetch_full() -> Bars for the whole period.
+        fetch_since(ts) -> Bars with time >= ts.
+        Both may raise.
+        """
+        series = self._entry(symbol, interval)
+        store = bar_store.series(symbol, interval)
+
+        with series.lock:
+            now = time.time()
+            series.last_access = now
+
+            if period not in series.starts or now - series.loaded_at[period] >= self.FULL_RELOAD:
+                bars = fetch_full()
+                if not len(bars):
+                    return Bars.empty()
+                series.starts[period] = int(bars.time[0])
+                series.loaded_at[period] = now
+                series.last_fetch = now
+                self.full_fetches += 1
+                self.bars_fetched += len(bars)
+                store.append(bars)
+            elif now - series.last_fetch >= self.refresh_after(interval):
+                try:
+                    new_bars = fetch_since(store.last_time())
+                except Exception:
+                    # Keep serving what we have; retry on the next refresh window
+                    new_bars = Bars.empty()
+                series.last_fetch = now
+                self.delta_fetches += 1
+                self.bars_fetched += len(new_bars)
+                store.append(new_bars)
+            else:
+                self.hits += 1
+
+            return store.range(start=series.starts[period])
+
+    def peek(self, symbol, interval, period):
+        """Cached Bars covering `period` however old, or None if it was never loaded. No fetch."""
+        series = self._series.get((symbol, interval))
+        if series is None or period not in series.starts:
+            return None
+        return bar_store.series(symbol, interval).range(start=series.starts[period])
+
+    def needs_fetch(self, symbol, interval, period):
+        """True if get() for this (symbol, interval, period) would call upstream now."""
+        return self.plan(symbol, interval, period)[0] is not None
+
+    def plan(self, symbol, interval, period):
+        """
+        What get() would fetch now: ('full', None), ('delta', since_ts) or
+        (None, None). Lets async callers do the upstream I/O first and hand
+        get() the result.
+        """
+        series = self._series.get((symbol, interval))
+        now = time.time()
+        if series is None or period not in series.starts or now - series.loaded_at[period] >= self.FULL_RELOAD:
+            return 'full', None
+        if now - series.last_fetch >= self.refresh_after(interval):
+            return 'delta', bar_store.series(symbol, interval).last_time()
+        return None, None
+
+    def stats(self):
+        with self._lock:
+            size = len(self._series)
+        return {
+            "series": size,
+            "max_series": self.MAX_SERIES,
+            "hits": self.hits,
+            "full_fetches": self.full_fetches,
+            "delta_fetches": self.delta_fetches,
+            "bars_fetched": self.bars_fetched,
+            "evictions": self.evictions,
+        }
+
+    def _entry(self, symbol, interval):
+        key = (symbol, interval)
+        with self._lock:
+            self._evict_idle()
+            series = self._series.get(key)
+            if series is None:
+                series = _Series()
+                self._series[key] = series
+                while len(self._series) > self.MAX_SERIES:
+                    (old_symbol, old_interval), _ = self._series.popitem(last=False)
+                    bar_store.release(old_symbol, old_interval)
+                    self.evictions += 1
+            else:
+                self._series.move_to_end(key)
+            return series
+
+    def _evict_idle(self):
+        cutoff = time.time() - self.IDLE_TTL
+        # OrderedDict is in access order, so idle series sit at the front
+        while self._series:
+            key, series = next(iter(self._series.items()))
+            if series.last_access >= cutoff:
+                break
+            del self._series[key]
+            bar_store.release(*key)
+            self.evictions += 1
+
+
+series_cache = SeriesCache()
@@ -0,0 +1,125 @@
+"""
+Wire formats for OHLCV series (GET /api/market/series).
+
+    records   [{"time": .., "open": .., ...}, ...]     default, the original shape
+    columns   {"time": [..], "open": [..], ...}         parallel arrays, no repeated keys
+    msgpack   the columns layout as MessagePack         needs `msgpack` installed
+
+Picked by ?format= or the Accept header. JSON goes through orjson when it is
+installed (NumPy columns are encoded straight from the arrays), else stdlib
+json. Bodies above MIN_COMPRESS bytes are brotli- or gzip-compressed per
+Accept-Encoding (brotli only when the `brotli` package is installed).
+"""
+import gzip
+import json
+
+import numpy as np
+from flask import Response, request
+
+from services.bar_store import COLUMNS
+
+try:
+    import orjson
+except ImportError:  # optional, stdlib json fallback
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional, format not offered
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:  # optional, gzip only
+    brotli = None
+
+JSON_MIME = 'application/json'
+COLUMNS_MIME = 'application/vnd.tradesense.columns+json'
+MSGPACK_MIME = 'application/x-msgpack'
+
+MIN_COMPRESS = 1024  # bytes; smaller bodies aren't worth the CPU
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # good ratio at gzip-like speed
+
+
+def available_formats():
+    formats = ['records', 'columns']
+    if msgpack is not None:
+        formats.append('msgpack')
+    return formats
+
+
+def negotiate_format():
+    """'records', 'columns' or 'msgpack' from ?format= or Accept; unknown values fall back to records."""
+    fmt = request.args.get('format')
+    if fmt in available_formats():
+        return fmt
+    best = request.accept_mimetypes.best_match([JSON_MIME, COLUMNS_MIME] + ([MSGPACK_MIME] if msgpack else []))
+    if best == COLUMNS_MIME:
+        return 'columns'
+    if best == MSGPACK_MIME:
+        return 'msgpack'
+    return 'records'
+
+
+def encode(bars, fmt):
+    """(body bytes, mimetype) for `bars` in `fmt`."""
+    if fmt == 'records':
+        return dumps_json(bars.to_records()), JSON_MIME
+    if fmt == 'msgpack':
+        columns = {name: getattr(bars, name).tolist() for name in COLUMNS}
+        return msgpack.packb(columns), MSGPACK_MIME
+    return dumps_json(_columns(bars)), JSON_MIME
+
+
+def dumps_json(data):
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(data, separators=(',', ':'), default=_to_list).encode()
+
+
+def compress(body):
+    """(body, content-encoding or None) per the request's Accept-Encoding."""
+    if len(body) < MIN_COMPRESS:
+        return body, None
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return brotli.compress(body, quality=BROTLI_QUALITY), 'br'
+    if accepted['gzip']:
+        return gzip.compress(body, compresslevel=GZIP_LEVEL), 'gzip'
+    return body, None
+
+
+def series_response(bars, fmt):
+    body, mimetype = encode(bars, fmt)
+    return _response(body, mimetype)
+
+
+def json_response(data):
+    """Like jsonify, through orjson (NumPy arrays allowed, NaN -> null) and compressed."""
+    return _response(dumps_json(data), JSON_MIME)
+
+
+def _response(body, mimetype):
+    body, encoding = compress(body)
+    response = Response(body, mimetype=mimetype)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept, Accept-Encoding'
+    return response
+
+
+def _columns(bars):
+    if orjson is not None:
+        # orjson serializes C-contiguous arrays directly, no Python floats in between
+        return {name: np.ascontiguousarray(getattr(bars, name)) for name in COLUMNS}
+    return {name: getattr(bars, name).tolist() for name in COLUMNS}
+
+
+def _to_list(value):
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind == 'f':
+            # stdlib json would write NaN, which isn't JSON; orjson writes null
+            return [None if v != v else v for v in value.tolist()]
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,373 @@
+"""
+Quote table shared by every worker process on the host (gunicorn -w N).
+
+In-process caches (QuoteCache, MoroccoScraper._cache) are per worker, so
+without this each of N workers would warm and refresh its own copy and
+upstream load would grow with N. Here one worker is elected writer (it holds
+a non-blocking flock on `<path>.writer` for its lifetime). Its prefetcher
+refreshes the hot symbols and publishes them into a memory-mapped file. All
+workers read that file without locks before going upstream themselves.
+
+Layout (little-endian), fixed size so any process can map it:
+
+    header   <8s I I d>  magic, slots, record size, created
+    record   <I 4x 16s d d d 8s 24s d d d>  104 bytes each
+             seq, symbol, price, change, change_pct, currency, source,
+             updated, expires, wanted
+    request  <16s d>  REQUEST_SLOTS of them after the records: symbol, time
+
+Symbols are placed by open addressing (crc32, linear probe) and never move,
+so each process memoizes symbol -> slot. The key is the whole symbol: ones
+longer than KEY_SIZE bytes are not shared (every reader then goes through
+its own cache), and a read only answers if the record's key is the symbol.
+
+Only the writer claims slots, when it publishes a real quote, so a slot
+always belongs to a symbol that resolved upstream. A slot nobody wanted or
+refreshed for EVICT_AFTER seconds is reused by the next symbol probing
+through it (readers holding the old memo see the key change and re-probe).
+
+Quote fields are guarded by a seqlock. The writer makes `seq` odd, writes
+the fields, then makes it even again. A reader retries while `seq` is odd or
+changed under it. Python has no memory fences: this relies on each step
+being a separate C-level store, which x86-64 keeps in order.
+
+`wanted` is the last time any worker asked for the symbol. Readers write it
+racily (last writer wins, which is fine for a timestamp). A symbol with no
+slot yet is asked for through the request ring instead, at crc32 % slots:
+junk only ever overwrites other requests, never takes a slot. The writer's
+prefetcher treats recently wanted and requested symbols as hot, so a symbol
+one worker requests is kept warm for all of them.
+"""
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, every worker keeps its own caches
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'TSQUOTE2'
+HEADER = struct.Struct('<8sIId')
+RECORD = struct.Struct('<I4x16sddd8s24sddd')
+SEQ = struct.Struct('<I')
+QUOTE = struct.Struct('<16sddd8s24sdd')  # the seqlock-guarded fields, after seq + padding
+WANTED = struct.Struct('<d')
+UPDATED = struct.Struct('<d')
+REQUEST = struct.Struct('<16sd')
+QUOTE_OFFSET = 8
+UPDATED_OFFSET = RECORD.size - 3 * 8
+WANTED_OFFSET = RECORD.size - WANTED.size
+REQUEST_SLOTS = 64
+
+
+KEY_SIZE = 16
+
+
+def _field(value, size):
+    return (value or '').encode()[:size]
+
+
+def _key(symbol):
+    """The record key for `symbol`, or None if it doesn't fit (never truncated: ABC...-X must not read ABC...-Y)."""
+    raw = (symbol or '').encode()
+    if not raw or len(raw) > KEY_SIZE:
+        return None
+    return raw.ljust(KEY_SIZE, b'\0')
+
+
+@contextmanager
+def _flock(path):
+    """Exclusive flock on `path` for the duration of the block (across processes)."""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)  # releases the lock
+
+
+class SharedQuoteTable:
+    DEFAULT_SLOTS = 1024
+    READ_RETRIES = 64  # seqlock retries before treating a read as a miss
+    WANT_EVERY = 10  # seconds between `wanted` stamps from one process
+    EVICT_AFTER = 900  # seconds without a want or a refresh before a slot can be reused
+    MAX_WANTED = 4096  # symbols this process remembers stamping
+
+    def __init__(self):
+        self.path = None
+        self.slots = 0
+        self._mm = None
+        self._fd = None
+        self._writer_fd = None
+        self._requests = 0  # offset of the request ring
+        self._index = {}  # symbol -> slot offset (a hint: the key is checked on every read)
+        self._wanted = {}  # symbol -> last time this process stamped it
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.retries = 0
+        self.writes = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self):
+        return self._mm is not None
+
+    @property
+    def is_writer(self):
+        return self._writer_fd is not None
+
+    def configure(self, path, slots=None):
+        if fcntl is None:
+            logger.warning("Shared quote table needs flock (POSIX); workers keep separate caches")
+            return
+        self.close()
+        slots = slots or self.DEFAULT_SLOTS
+        size = HEADER.size + slots * RECORD.size + REQUEST_SLOTS * REQUEST.size
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        with _flock(path + '.lock'):
+            head = os.pread(fd, HEADER.size, 0)
+            current = HEADER.unpack(head) if len(head) == HEADER.size else None
+            if not current or current[0] != MAGIC or current[1:3] != (slots, RECORD.size):
+                # New file, or a layout change: lay it out afresh (restart every worker after changing slots)
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, size)
+                os.pwrite(fd, HEADER.pack(MAGIC, slots, RECORD.size, time.time()), 0)
+                logger.info(f"Created shared quote table {path} ({slots} slots, {size:,} bytes)")
+
+        self.path = path
+        self.slots = slots
+        self._fd = fd
+        self._mm = mmap.mmap(fd, size)
+        self._requests = HEADER.size + slots * RECORD.size
+        self._index = {}
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            os.close(self._fd)
+            self._mm = None
+        if self._writer_fd is not None:
+            os.close(self._writer_fd)
+            self._writer_fd = None
+
+    def try_elect(self):
+        """Become the writer if no live process holds the role. True if this process is the writer."""
+        if self._mm is None or self._writer_fd is not None:
+            return self._writer_fd is not None
+        fd = os.open(self.path + '.writer', os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._writer_fd = fd  # held until exit; the kernel releases it if we die
+        logger.info(f"Process {os.getpid()} is the shared quote table writer")
+        return True
+
+    def get(self, symbol, now=None):
+        """The published quote for `symbol` if it hasn't expired, else None. Lock-free."""
+        if self._mm is None:
+            return None
+        key = _key(symbol)
+        offset = self._slot(symbol) if key else None
+        if offset is None:
+            self.misses += 1
+            return None
+
+        mm = self._mm
+        for _ in range(self.READ_RETRIES):
+            seq = SEQ.unpack_from(mm, offset)[0]
+            if seq & 1:
+                self.retries += 1
+                continue
+            fields = QUOTE.unpack_from(mm, offset + QUOTE_OFFSET)
+            if SEQ.unpack_from(mm, offset)[0] == seq:
+                break
+            self.retries += 1
+        else:
+            self.misses += 1
+            return None
+
+        name, price, change, change_pct, currency, source, updated, expires = fields
+        if name != key:
+            self._index.pop(symbol, None)  # not this symbol's record
+            self.misses += 1
+            return None
+        if not seq or expires <= (now or time.time()):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {
+            "symbol": symbol,
+            "price": price,
+            "change": change,
+            "change_pct": change_pct,
+            "currency": currency.rstrip(b'\0').decode(),
+            "source": source.rstrip(b'\0').decode(),
+        }
+
+    def put(self, symbol, quote, expires):
+        """
+        Publish `quote` until the unix time `expires`. Writer process only,
+        and only with real quotes: this is where symbols get their slot.
+        """
+        if self._mm is None or self._writer_fd is None or _key(symbol) is None:
+            return False
+        offset = self._slot(symbol) or self._claim(symbol)
+        if offset is None:
+            return False
+        mm = self._mm
+        seq = SEQ.unpack_from(mm, offset)[0]
+        SEQ.pack_into(mm, offset, (seq + 1) & 0xFFFFFFFF)
+        QUOTE.pack_into(
+            mm, offset + QUOTE_OFFSET,
+            _key(symbol),
+            float(quote.get('price') or 0.0),
+            float(quote.get('change') or 0.0),
+            float(quote.get('change_pct') or 0.0),
+            _field(quote.get('currency'), 8),
+            _field(quote.get('source'), 24),
+            time.time(),
+            expires,
+        )
+        SEQ.pack_into(mm, offset, (seq + 2) & 0xFFFFFFFF or 2)
+        self.writes += 1
+        return True
+
+    def want(self, symbol):
+        """Ask the writer to keep `symbol` warm. Cheap to call on every request; never claims a slot."""
+        key = _key(symbol)
+        if self._mm is None or key is None:
+            return
+        now = time.time()
+        if now - self._wanted.get(symbol, 0) < self.WANT_EVERY:
+            return
+        offset = self._slot(symbol)
+        if offset is not None:
+            WANTED.pack_into(self._mm, offset + WANTED_OFFSET, now)
+        else:
+            # No slot yet: leave a request, the writer claims one once it has a real quote
+            REQUEST.pack_into(self._mm, self._requests + zlib.crc32(key) % REQUEST_SLOTS * REQUEST.size, key, now)
+        if len(self._wanted) >= self.MAX_WANTED:
+            self._wanted.clear()
+        self._wanted[symbol] = now
+
+    def wanted(self, since):
+        """Symbols any worker asked for after `since`, with or without a slot (writer's hot set)."""
+        if self._mm is None:
+            return set()
+        names = []
+        for slot in range(self.slots):
+            offset = HEADER.size + slot * RECORD.size
+            if WANTED.unpack_from(self._mm, offset + WANTED_OFFSET)[0] > since:
+                names.append(self._mm[offset + QUOTE_OFFSET:offset + QUOTE_OFFSET + KEY_SIZE])
+        for slot in range(REQUEST_SLOTS):
+            name, requested = REQUEST.unpack_from(self._mm, self._requests + slot * REQUEST.size)
+            if requested > since:
+                names.append(name)
+        symbols = set()
+        for name in names:
+            try:
+                name = name.rstrip(b'\0').decode()
+            except UnicodeDecodeError:  # torn racy request write; the next want rewrites it
+                continue
+            if name:
+                symbols.add(name)
+        return symbols
+
+    def stats(self):
+        used = 0
+        if self._mm is not None:
+            used = sum(
+                1 for slot in range(self.slots)
+                if self._mm[HEADER.size + slot * RECORD.size + QUOTE_OFFSET] != 0
+            )
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "slots": self.slots,
+            "used": used,
+            "writer": self.is_writer,
+            "pid": os.getpid(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "retries": self.retries,
+            "writes": self.writes,
+            "evictions": self.evictions,
+        }
+
+    def _slot(self, symbol):
+        """Offset of the record holding `symbol`, or None if the writer hasn't published it."""
+        key = _key(symbol)
+        mm = self._mm
+        offset = self._index.get(symbol)
+        if offset is not None:
+            if mm[offset + QUOTE_OFFSET:offset + QUOTE_OFFSET + KEY_SIZE] == key:
+                return offset
+            del self._index[symbol]  # the slot was reused for another symbol
+        start = zlib.crc32(key) % self.slots
+        for i in range(self.slots):
+            offset = HEADER.size + ((start + i) % self.slots) * RECORD.size
+            name = mm[offset + QUOTE_OFFSET:offset + QUOTE_OFFSET + KEY_SIZE]
+            if name == key:
+                self._index[symbol] = offset
+                return offset
+            if not any(name):
+                return None
+        return None
+
+    def _claim(self, symbol):
+        """
+        Slot for a symbol the writer is about to publish: the first free or
+        stale slot on its probe path. Probing stops at free slots only, so a
+        reused slot stays reachable by every symbol probing through it.
+        """
+        key = _key(symbol)
+        stale_before = time.time() - self.EVICT_AFTER
+        mm = self._mm
+        with self._lock, _flock(self.path + '.lock'):
+            offset = self._slot(symbol)
+            if offset is not None:
+                return offset
+            start = zlib.crc32(key) % self.slots
+            for i in range(self.slots):
+                offset = HEADER.size + ((start + i) % self.slots) * RECORD.size
+                name = mm[offset + QUOTE_OFFSET:offset + QUOTE_OFFSET + KEY_SIZE]
+                if not any(name):
+                    mm[offset + QUOTE_OFFSET:offset + QUOTE_OFFSET + KEY_SIZE] = key
+                    self._index[symbol] = offset
+                    return offset
+                last_used = max(UPDATED.unpack_from(mm, offset + UPDATED_OFFSET)[0],
+                                WANTED.unpack_from(mm, offset + WANTED_OFFSET)[0])
+                if last_used < stale_before:
+                    self._evict(offset, key)
+                    self._index[symbol] = offset
+                    return offset
+        logger.warning(f"Shared quote table full ({self.slots} slots in use), not sharing {symbol}")
+        return None
+
+    def _evict(self, offset, key):
+        """Hand a stale slot to `key`, under the seqlock so no reader sees a mix of the two."""
+        mm = self._mm
+        seq = SEQ.unpack_from(mm, offset)[0] | 1
+        SEQ.pack_into(mm, offset, seq)
+        QUOTE.pack_into(mm, offset + QUOTE_OFFSET, key, 0.0, 0.0, 0.0, b'', b'', 0.0, 0.0)
+        WANTED.pack_into(mm, offset + WANTED_OFFSET, 0.0)
+        SEQ.pack_into(mm, offset, (seq + 1) & 0xFFFFFFFF or 2)
+        self._index = {s: o for s, o in self._index.items() if o != offset}
+        self.evictions += 1
+
+
+shared_quotes = SharedQuoteTable()
@@ -0,0 +1,116 @@
+"""
+Symbol registry: one place that knows which exchange, currency, provider and
+refresh policy an instrument belongs to.
+
+Listed instruments (BVC tickers) are registered explicitly. Anything else is
+classified on first sight from its Yahoo-style spelling (BTC-USD, EURUSD=X,
+^GSPC, AAPL) and memoized, so every lookup after the first is a dict get.
+
+Refresh policies:
+    snapshot   one upstream call refreshes the whole exchange (BVC page scrape)
+    ttl        each symbol is fetched and cached on its own (Yahoo quotes)
+"""
+import re
+import threading
+
+from services.morocco_scraper import MoroccoScraper
+from services.quote_cache import QuoteCache
+
+# exchange -> defaults for instruments listed there
+EXCHANGES = {
+    'BVC': {'currency': 'MAD', 'provider': 'bvc', 'refresh': 'snapshot', 'series_suffix': '.MA'},
+    'US': {'currency': 'USD', 'provider': 'yahoo', 'refresh': 'ttl', 'series_suffix': ''},
+    'CRYPTO': {'currency': 'USD', 'provider': 'yahoo', 'refresh': 'ttl', 'series_suffix': ''},
+    'FX': {'currency': None, 'provider': 'yahoo', 'refresh': 'ttl', 'series_suffix': ''},
+    'INDEX': {'currency': None, 'provider': 'yahoo', 'refresh': 'ttl', 'series_suffix': ''},
+}
+
+# QuoteCache symbol class -> exchange for symbols nobody registered
+CLASS_EXCHANGES = {'crypto': 'CRYPTO', 'forex': 'FX', 'index': 'INDEX', 'equity': 'US'}
+
+# Yahoo spelling of an unregistered symbol: BTC-USD, EURUSD=X, ^GSPC, IAM.MA (fits positions.symbol)
+SYMBOL_PATTERN = re.compile(r'\^?[A-Za-z0-9][A-Za-z0-9.=-]{0,18}')
+
+
+class Instrument:
+    __slots__ = ('symbol', 'exchange', 'currency', 'provider', 'refresh', 'series_symbol', 'base_price', 'listed')
+
+    def __init__(self, symbol, exchange, currency, provider, refresh, series_symbol, base_price=None, listed=False):
+        self.symbol = symbol
+        self.exchange = exchange
+        self.currency = currency
+        self.provider = provider
+        self.refresh = refresh
+        self.series_symbol = series_symbol  # symbol to request history under (IAM -> IAM.MA)
+        self.base_price = base_price  # reference price for simulated fallbacks
+        self.listed = listed
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class SymbolRegistry:
+    MAX_UNLISTED = 4096  # memoized lookups of unregistered symbols
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._listed = {}
+        self._unlisted = {}
+
+    def register_exchange(self, exchange, currency, provider, refresh, series_suffix=''):
+        EXCHANGES[exchange] = {
+            'currency': currency, 'provider': provider, 'refresh': refresh, 'series_suffix': series_suffix
+        }
+
+    def register(self, symbol, exchange, base_price=None, **overrides):
+        """List `symbol` on `exchange`; keyword overrides replace exchange defaults."""
+        defaults = EXCHANGES[exchange]
+        instrument = Instrument(
+            symbol,
+            exchange,
+            overrides.get('currency', defaults['currency']),
+            overrides.get('provider', defaults['provider']),
+            overrides.get('refresh', defaults['refresh']),
+            overrides.get('series_symbol', symbol + defaults['series_suffix']),
+            base_price,
+            listed=True,
+        )
+        with self._lock:
+            self._listed[symbol] = instrument
+            self._unlisted.pop(symbol, None)
+        return instrument
+
+    def lookup(self, symbol):
+        instrument = self._listed.get(symbol) or self._unlisted.get(symbol)
+        if instrument is not None:
+            return instrument
+
+        exchange = CLASS_EXCHANGES[QuoteCache.symbol_class(symbol)]
+        defaults = EXCHANGES[exchange]
+        currency = defaults['currency']
+        if exchange == 'CRYPTO':
+            currency = symbol.rsplit('-', 1)[-1]
+        instrument = Instrument(symbol, exchange, currency, defaults['provider'], defaults['refresh'], symbol)
+        with self._lock:
+            if len(self._unlisted) >= self.MAX_UNLISTED:
+                self._unlisted.clear()
+            self._unlisted[symbol] = instrument
+        return instrument
+
+    def is_listed(self, symbol, exchange=None):
+        instrument = self._listed.get(symbol)
+        return instrument is not None and (exchange is None or instrument.exchange == exchange)
+
+    def is_valid(self, symbol):
+        """True for registered symbols and well-formed Yahoo spellings (never '', '.', '..' or paths)."""
+        return symbol in self._listed or bool(symbol and SYMBOL_PATTERN.fullmatch(symbol))
+
+    def symbols(self, exchange=None):
+        return [s for s, i in self._listed.items() if exchange is None or i.exchange == exchange]
+
+
+symbol_registry = SymbolRegistry()
+
+# Casablanca Stock Exchange: every ticker the scraper can map to a cotations row
+for _symbol in MoroccoScraper.NAME_MAP:
+    symbol_registry.register(_symbol, 'BVC', base_price=MoroccoScraper.BASE_PRICES.get(_symbol))
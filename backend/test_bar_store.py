@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+import pytest
+
+from services.bar_store import BarStore, Bars, _safe
+from services.market_router import market_router
+
+
+def _bars(start, n, step=60):
+    time = np.arange(start, start + n * step, step, dtype=np.int64)
+    price = np.linspace(100.0, 101.0, n)
+    return Bars(time, price, price + 1, price - 1, price, np.ones(n))
+
+
+@pytest.mark.parametrize('name', ['', '.', '..'])
+def test_safe_rejects_dot_names(name):
+    with pytest.raises(ValueError):
+        _safe(name)
+
+
+def test_safe_is_one_path_component():
+    assert _safe('IAM.MA') == 'IAM%2EMA'
+    assert _safe('../x') == '%2E%2E%2Fx'
+    assert _safe('EURUSD=X') == 'EURUSD%3DX'
+    assert os.sep not in _safe('a/b\\c')
+
+
+def test_series_rejects_traversal(tmp_path):
+    store = BarStore(str(tmp_path / 'root'))
+    with pytest.raises(ValueError):
+        store.series('..', '..')
+    assert not os.path.exists(tmp_path / 'root')
+    assert market_router.series_error('..', '1d')
+    assert market_router.series_error('AAPL', '..')
+    assert market_router.series_error('AAPL', '1d') is None
+
+
+def test_nothing_on_disk_until_first_append(tmp_path):
+    store = BarStore(str(tmp_path))
+    series = store.series('AAPL', '1d')
+    assert len(series.range()) == 0 and series.last_time() is None
+    series.append(Bars.empty())
+    assert os.listdir(tmp_path) == []
+
+    series.append(_bars(1_000_000, 5, step=86400))
+    assert os.listdir(tmp_path) == ['AAPL']
+    assert len(BarStore(str(tmp_path)).series('AAPL', '1d').bars()) == 5  # another worker sees it
+
+
+def test_compact_all_applies_retention(tmp_path):
+    store = BarStore(str(tmp_path))
+    store.append('BTC-USD', '1m', _bars(1_000_000, 100))
+    store.append('^GSPC', '1d', _bars(1_000_000, 10, step=86400))
+
+    now = 1_000_000 + 8 * 86400 + 50 * 60  # 1m bars keep 8 days: the last 50 survive
+    assert store.compact_all(now=now) == 2
+    assert len(store.range('BTC-USD', '1m')) == 50
+    assert len(store.range('^GSPC', '1d')) == 10  # daily bars are kept
+    assert store.compact_all(now=now) == 0  # nothing left to do
@@ -0,0 +1,89 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+import requests
+
+from services.circuit_breaker import CircuitBreaker
+from services.http_client import HttpClient
+
+
+class _Ok(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def upstream():
+    server = HTTPServer(('127.0.0.1', 0), _Ok)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+
+
+def _half_open_client(url):
+    client = HttpClient()
+    client.SLOT_TIMEOUT = 0.01
+    host = url.split('/')[2]
+    histogram, breaker = client.monitor(host)
+    breaker._open()
+    breaker.opened_at = time.time() - CircuitBreaker.OPEN_SECONDS  # due for a trial
+    return client, host, breaker
+
+
+def test_breaker_recovers_after_slot_timeout(upstream):
+    client, host, breaker = _half_open_client(upstream)
+    limit = client._limits[host]
+    held = 0
+    while limit.acquire(blocking=False):
+        held += 1
+
+    with pytest.raises(requests.ConnectionError, match="Connection limit"):
+        client.get(upstream)
+    assert client.stats()[host]['count'] == 0  # no latency sample for a local wait
+
+    for _ in range(held):
+        limit.release()
+    assert client.get(upstream).status_code == 200
+    assert breaker.snapshot()['state'] == CircuitBreaker.CLOSED
+
+
+def test_breaker_trial_released_on_non_upstream_error(upstream, monkeypatch):
+    client, host, breaker = _half_open_client(upstream)
+    session = client._sessions[host]
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("bug, not the upstream")
+
+    monkeypatch.setattr(session, 'get', broken)
+    with pytest.raises(RuntimeError):
+        client.get(upstream)
+    assert breaker.snapshot()['state'] == CircuitBreaker.HALF_OPEN
+
+    monkeypatch.undo()
+    assert client.get(upstream).status_code == 200
+    assert breaker.snapshot()['state'] == CircuitBreaker.CLOSED
+
+
+def test_read_timeout_not_retried():
+    import socket
+
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(8)
+    accepted = []
+    threading.Thread(target=lambda: [accepted.append(server.accept()) for _ in range(8)], daemon=True).start()
+
+    client = HttpClient()
+    client.READ_TIMEOUT = 0.2
+    with pytest.raises(requests.RequestException):
+        client.get(f"http://127.0.0.1:{server.getsockname()[1]}/")
+    assert len(accepted) == 1
+    server.close()
@@ -0,0 +1,69 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+
+from models import db
+from services.news import NewsService
+
+
+@pytest.fixture
+def news(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+
+    base = datetime(2026, 10, 18, 9, 30, 0, 123456)
+    items = []
+    for i in range(12):
+        # Pairs share the same microsecond: the cursor must break ties on id
+        published = base - timedelta(minutes=i // 2)
+        title = "Ethereum rallies" if i % 3 == 0 else "Dollar slips"
+        summary = "ETH traders" if i % 4 == 0 else None
+        items.append({"guid": f"n{i}", "title": f"{title} {i}", "summary": summary,
+                      "published_at": published.isoformat() + "Z"})
+    (tmp_path / 'feed.json').write_text(json.dumps(items))
+
+    with app.app_context():
+        db.create_all()
+        service = NewsService()
+        service.HOT_SIZE = 4  # most pages come from the database
+        service.configure(drop_dir=str(tmp_path), scan_interval=3600)
+        service.ingest()
+        yield service
+        db.session.remove()
+        db.drop_all()
+
+
+def _all_pages(service, **filters):
+    seen, cursor = [], None
+    while True:
+        page = service.get_market_news(cursor=cursor, limit=3, **filters)
+        seen += [item['id'] for item in page['items']]
+        cursor = page['next_cursor']
+        if cursor is None:
+            return seen
+
+
+def test_paging_over_tied_timestamps_has_no_gaps_or_repeats(news):
+    ids = _all_pages(news)
+    assert len(ids) == 12 and len(set(ids)) == 12
+
+
+def test_search_matches_whole_tokens_on_both_paths(news):
+    eth = _all_pages(news, q='eth')
+    ethereum = _all_pages(news, q='ethereum')
+    # "eth" is only in summaries (i % 4 == 0); it must not match "Ethereum" titles
+    assert len(eth) == 3
+    assert len(ethereum) == 4
+    assert _all_pages(news, q='ethe') == []
+    assert len(_all_pages(news, q='ethereum rallies')) == 4
+
+
+def test_old_float_cursor_still_decodes():
+    import base64
+    from services.news import _decode_cursor
+
+    cursor = base64.urlsafe_b64encode(b"1760779800.123456|7").decode()
+    assert _decode_cursor(cursor) == (1760779800123456, 7)
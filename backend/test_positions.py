@@ -0,0 +1,95 @@
+import pytest
+from flask import Flask
+
+from models import db, Challenge, Position
+from services.positions import PositionBook, _Position
+
+
+@pytest.fixture
+def session():
+    # Throwaway in-memory database, separate from the app's configured one
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield db.session
+        db.session.remove()
+        db.drop_all()
+
+
+def _challenge(session, start_balance=10_000.0):
+    challenge = Challenge(user_id=1, plan_id=1, start_balance=start_balance, equity=start_balance,
+                          balance=start_balance, positions_version=0)
+    session.add(challenge)
+    session.commit()
+    return challenge
+
+
+def test_same_direction_averages_price():
+    position = _Position()
+    assert position.apply(2, 100.0) == 0.0
+    assert position.apply(2, 110.0) == 0.0
+    assert position.qty == 4
+    assert position.avg_price == pytest.approx(105.0)
+
+
+def test_reduce_realizes_closed_qty():
+    position = _Position()
+    position.apply(4, 100.0)
+    assert position.apply(-1, 120.0) == pytest.approx(20.0)
+    assert position.qty == 3
+    assert position.avg_price == pytest.approx(100.0)  # reducing keeps the cost basis
+
+    short = _Position()
+    short.apply(-2, 50.0)
+    assert short.apply(1, 40.0) == pytest.approx(10.0)  # short covered lower
+    assert short.qty == -1
+
+
+def test_flip_opens_remainder_at_fill_price():
+    position = _Position()
+    position.apply(2, 100.0)
+    assert position.apply(-5, 90.0) == pytest.approx(-20.0)  # only the 2 held are closed
+    assert position.qty == -3
+    assert position.avg_price == 90.0
+    assert position.realized_pnl == pytest.approx(-20.0)
+
+
+def test_flat_resets_avg_price():
+    position = _Position()
+    position.apply(0.3, 100.0)
+    position.apply(0.1, 100.0)
+    assert position.apply(-0.4, 105.0) == pytest.approx(2.0)
+    assert position.qty == 0.0  # 0.3 + 0.1 - 0.4 is snapped to flat
+    assert position.avg_price == 0.0
+
+
+def test_fill_many_books_fills_in_order(session):
+    challenge = _challenge(session)
+    book = PositionBook()
+
+    results = book.fill_many(challenge, [
+        ('TEST-A', 'buy', 2, 100.0, 1.0),
+        ('TEST-B', 'sell', 1, 50.0, 0.5),
+        ('TEST-A', 'buy', 2, 110.0, 1.0),
+        ('TEST-A', 'sell', 5, 120.0, 1.0),
+    ])
+    session.commit()
+
+    assert [r['qty'] for r in results] == [2, -1, 4, -1]
+    assert results[2]['avg_price'] == pytest.approx(105.0)
+    assert results[3]['realized'] == pytest.approx(4 * (120.0 - 105.0))
+    assert results[3]['side'] == 'short' and results[3]['avg_price'] == 120.0
+
+    # One row per symbol; balance = start + realized - fees; one version bump per batch
+    rows = {row.symbol: row for row in Position.query.filter_by(challenge_id=challenge.id)}
+    assert sorted(rows) == ['TEST-A', 'TEST-B']
+    assert rows['TEST-A'].qty == -1 and rows['TEST-A'].fees == pytest.approx(3.0)
+    assert challenge.balance == pytest.approx(10_000.0 + 60.0 - 3.5)
+    assert challenge.positions_version == 1
+    # No marks in memory for these symbols: equity counts the open positions at cost
+    assert challenge.equity == pytest.approx(challenge.balance)
+
+    # A worker with a cold cache rebuilds the same book from the rows
+    assert PositionBook().positions(challenge) == book.positions(challenge)
@@ -0,0 +1,69 @@
+import time
+
+import pytest
+
+from services.market_router import market_router
+from services.quote_cache import QuoteCache, quote_cache
+
+
+class UpstreamDown(Exception):
+    pass
+
+
+def _fail():
+    raise UpstreamDown("503")
+
+
+def test_failed_load_keeps_last_good_value():
+    cache = QuoteCache()
+    cache.set('AAPL', {"price": 190.0}, ttl=-1)  # expired
+
+    with pytest.raises(UpstreamDown):
+        cache.get_or_load('AAPL', _fail)
+    # Negatively cached: repeat loads fail fast, but the last good value is still there
+    with pytest.raises(UpstreamDown):
+        cache.get_or_load('AAPL', lambda: {"price": 1.0})
+    assert cache.get('AAPL') is None
+    assert cache.peek('AAPL') == {"price": 190.0}
+    assert cache.fresh('AAPL') == (None, None)
+
+    # A second failure still carries it over
+    cache.set_failure('AAPL', UpstreamDown("again"))
+    assert cache.peek('AAPL') == {"price": 190.0}
+
+
+def test_failed_forced_refresh_keeps_fresh_value():
+    cache = QuoteCache()
+    cache.set('BTC-USD', {"price": 60_000.0}, ttl=10)
+    cache.set_failure('BTC-USD', UpstreamDown("forced refresh failed"))
+    assert cache.get('BTC-USD') == {"price": 60_000.0}
+    assert cache.failure('BTC-USD') is None
+    value, remaining = cache.fresh('BTC-USD')
+    assert value == {"price": 60_000.0} and 0 < remaining <= 10
+
+
+def test_failure_without_history_peeks_none():
+    cache = QuoteCache()
+    cache.set_failure('NEVER', UpstreamDown())
+    assert cache.peek('NEVER') is None
+    assert isinstance(cache.failure('NEVER'), UpstreamDown)
+
+
+def test_last_price_survives_upstream_error():
+    symbol = 'TSTQC'
+    try:
+        quote_cache.set(symbol, {"symbol": symbol, "price": 42.0}, ttl=-1)
+        quote_cache.set_failure(symbol, UpstreamDown())
+        assert market_router.last_price(symbol) == 42.0
+    finally:
+        quote_cache.invalidate(symbol)
+
+
+def test_negative_entry_expires():
+    cache = QuoteCache()
+    cache.NEGATIVE_TTL = 0.01
+    cache.set('AAPL', {"price": 190.0}, ttl=-1)
+    with pytest.raises(UpstreamDown):
+        cache.get_or_load('AAPL', _fail)
+    time.sleep(0.02)
+    assert cache.get_or_load('AAPL', lambda: {"price": 191.0}) == {"price": 191.0}
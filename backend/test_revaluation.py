@@ -0,0 +1,84 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+from flask import Flask
+
+from models import db, Challenge
+from services.evaluator import evaluate_challenge
+from services.revaluation import (ACTIVE, FAILED_DAILY_LOSS, FAILED_TOTAL_LOSS, MAX_DAILY_LOSS, MAX_TOTAL_LOSS,
+                                  PASSED, PROFIT_TARGET, VERDICTS, revalue)
+from services.rules import rules_engine
+
+START = 10_000.0
+DAY_START = 10_400.0  # up 4% before today, so the daily limit sits above the total one
+
+
+def _judge(equity, day_start=DAY_START):
+    """revalue() for challenges with no open positions: equity is the balance."""
+    balance = np.array(equity, dtype=np.float64)
+    n = len(balance)
+    empty_int, empty_float = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+    return revalue(balance, np.full(n, START), np.full(n, day_start), empty_int, empty_float, empty_float,
+                   empty_int, np.zeros(1))
+
+
+def test_thresholds_are_inclusive():
+    equity, verdict = _judge([
+        START * MAX_TOTAL_LOSS,
+        START * MAX_TOTAL_LOSS + 0.01,
+        DAY_START * MAX_DAILY_LOSS,
+        DAY_START * MAX_DAILY_LOSS + 0.01,
+        START * PROFIT_TARGET,
+        START * PROFIT_TARGET - 0.01,
+    ])
+    assert verdict.tolist() == [FAILED_TOTAL_LOSS, FAILED_DAILY_LOSS, FAILED_DAILY_LOSS, ACTIVE, PASSED, ACTIVE]
+
+
+def test_total_loss_wins_over_daily_loss():
+    _, verdict = _judge([START * 0.85])
+    assert verdict.tolist() == [FAILED_TOTAL_LOSS]
+
+
+def test_open_positions_marked_and_unknown_marks_at_cost():
+    balance = np.array([START, START])
+    # Challenge 0: long 10 @ 100 marked at 90. Challenge 1: short 5 @ 100, no mark (NaN) -> at cost
+    equity, verdict = revalue(balance, np.full(2, START), np.full(2, START),
+                              np.array([0, 1]), np.array([10.0, -5.0]), np.array([100.0, 100.0]),
+                              np.array([0, 1]), np.array([90.0, np.nan]))
+    assert equity.tolist() == [START - 100.0, START]
+    assert verdict.tolist() == [ACTIVE, ACTIVE]
+
+
+@pytest.fixture
+def session():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield db.session
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.mark.parametrize('equity', [
+    START * MAX_TOTAL_LOSS,
+    DAY_START * MAX_DAILY_LOSS,
+    DAY_START * MAX_DAILY_LOSS + 0.01,
+    START * PROFIT_TARGET,
+])
+def test_trade_path_evaluators_agree_with_revaluation(session, equity):
+    expected = _judge([equity])[1][0]
+    statuses = []
+    for evaluate in (rules_engine.evaluate_challenge, evaluate_challenge):
+        challenge = Challenge(user_id=1, plan_id=1, start_balance=START, equity=equity, balance=equity,
+                              daily_start_equity=DAY_START, last_daily_reset=datetime.utcnow(),
+                              positions_version=0, status='active')
+        session.add(challenge)
+        session.commit()
+        evaluate(challenge.id)
+        statuses.append(session.get(Challenge, challenge.id).status)
+
+    status = 'active' if expected == ACTIVE else VERDICTS[expected].split('_')[0]
+    assert statuses == [status, status]
@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+
+from models import db, Challenge, DailyMetrics
+from services.rollover import DailyRollover
+
+NOW = datetime(2026, 10, 18, 0, 5)
+TODAY = NOW.date()
+YESTERDAY = NOW - timedelta(days=1)
+
+
+@pytest.fixture
+def session():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield db.session
+        db.session.remove()
+        db.drop_all()
+
+
+def _challenge(session, equity, status='active', last_reset=YESTERDAY, created_at=YESTERDAY, day_row=None):
+    challenge = Challenge(user_id=1, plan_id=1, start_balance=10_000.0, equity=equity, balance=equity,
+                          daily_start_equity=10_000.0, last_daily_reset=last_reset, created_at=created_at,
+                          status=status, positions_version=0)
+    session.add(challenge)
+    session.flush()
+    if day_row is not None:
+        session.add(DailyMetrics(challenge_id=challenge.id, date=day_row, day_start_equity=10_000.0,
+                                 day_pnl=0.0, max_intraday_drawdown_pct=0.0))
+    session.commit()
+    return challenge.id
+
+
+def _rows(challenge_id):
+    return {m.date: m for m in DailyMetrics.query.filter_by(challenge_id=challenge_id)}
+
+
+def test_rollover_closes_resets_and_opens(session):
+    stale = _challenge(session, 9_800.0, day_row=YESTERDAY.date())
+    rolled = _challenge(session, 10_100.0, last_reset=NOW - timedelta(minutes=1), day_row=TODAY)
+    failed = _challenge(session, 8_000.0, status='failed', day_row=YESTERDAY.date())
+
+    counts = DailyRollover().run_once(now=NOW)
+    assert (counts['closed'], counts['reset'], counts['opened']) == (1, 1, 1)
+
+    yesterday_row = _rows(stale)[YESTERDAY.date()]
+    assert yesterday_row.day_end_equity == 9_800.0 and yesterday_row.day_pnl == -200.0
+    challenge = session.get(Challenge, stale)
+    assert challenge.daily_start_equity == 9_800.0 and challenge.last_daily_reset == NOW
+    assert _rows(stale)[TODAY].day_start_equity == 9_800.0
+
+    # Already rolled today: one row, start untouched. Failed: never touched.
+    assert list(_rows(rolled)) == [TODAY]
+    assert session.get(Challenge, rolled).daily_start_equity == 10_000.0
+    assert _rows(failed)[YESTERDAY.date()].day_end_equity is None
+    assert TODAY not in _rows(failed)
+
+
+def test_rollover_is_idempotent_and_opens_new_challenges(session):
+    _challenge(session, 9_800.0, day_row=YESTERDAY.date())
+    rollover = DailyRollover()
+    rollover.run_once(now=NOW)
+
+    fresh = _challenge(session, 10_000.0, last_reset=NOW, created_at=NOW + timedelta(minutes=1))
+    counts = rollover.run_once(now=NOW + timedelta(minutes=2))
+    assert (counts['closed'], counts['reset'], counts['opened']) == (0, 0, 1)
+    assert _rows(fresh)[TODAY].day_start_equity == 10_000.0
+
+    counts = DailyRollover().run_once(now=NOW + timedelta(minutes=3))  # another worker, same day
+    assert (counts['closed'], counts['reset'], counts['opened']) == (0, 0, 0)
+    assert DailyMetrics.query.filter_by(date=TODAY).count() == 2
+
+
+def test_day_start_rolls_one_challenge_inline(session):
+    stale = _challenge(session, 9_700.0, day_row=YESTERDAY.date())
+    rollover = DailyRollover()
+    challenge = session.get(Challenge, stale)
+
+    assert rollover.day_start(challenge, now=NOW) == 9_700.0
+    assert rollover.inline == 1
+    rows = _rows(stale)
+    assert rows[YESTERDAY.date()].day_end_equity == 9_700.0
+    assert rows[TODAY].day_start_equity == 9_700.0
+    assert rollover.day_start(challenge, now=NOW) == 9_700.0 and rollover.inline == 1  # now precomputed
@@ -1,29 +1,63 @@
 import React, { useEffect, useState } from 'react';
 import { RefreshCw, Zap } from 'lucide-react';
+import api from '../services/api';
+
+const INDICATOR_SET = 'rsi14,macd,sma20,sma50,atr14';
+
+// Rule-based read of the server-side indicators (/api/market/indicators)
+const readSignal = (latest, price) => {
+    const { rsi14: rsi, macd, sma20, sma50, atr14: atr } = latest;
+    const close = price || latest.close;
+    let score = 0;
+    const reasons = [];
+
+    if (rsi !== null) {
+        if (rsi < 30) { score += 1; reasons.push(`RSI Oversold (${rsi.toFixed(0)})`); }
+        else if (rsi > 70) { score -= 1; reasons.push(`RSI Overbought (${rsi.toFixed(0)})`); }
+        else reasons.push(`RSI Neutral (${rsi.toFixed(0)})`);
+    }
+    if (macd && macd.hist !== null) {
+        if (macd.hist > 0) { score += 1; reasons.push('MACD Above Signal'); }
+        else { score -= 1; reasons.push('MACD Below Signal'); }
+    }
+    if (sma20 !== null && sma50 !== null) {
+        if (sma20 > sma50 && close > sma20) { score += 1; reasons.push('Uptrend (Price > SMA20 > SMA50)'); }
+        else if (sma20 < sma50 && close < sma20) { score -= 1; reasons.push('Downtrend (Price < SMA20 < SMA50)'); }
+        else reasons.push('No Clear Trend');
+    }
+
+    const type = score >= 2 ? 'BUY' : score <= -2 ? 'SELL' : 'NEUTRAL';
+    const risk = atr || close * 0.01;
+    return {
+        type,
+        confidence: Math.round((Math.abs(score) / 3) * 100),
+        reasons,
+        volatilityPct: atr && close ? (atr / close) * 100 : null,
+        stopLoss: close ? (type === 'SELL' ? close + 2 * risk : close - 2 * risk).toFixed(2) : '---',
+        takeProfit: close ? (type === 'SELL' ? close - 3 * risk : close + 3 * risk).toFixed(2) : '---'
+    };
+};
 
-// Mock logic for AI signals
 const AISignals = ({ symbol, price }) => {
-    const [signal, setSignal] = useState(null);
+    const [latest, setLatest] = useState(null);
 
     useEffect(() => {
-        // Generate random signal when symbol changes
-        const types = ['BUY', 'SELL', 'NEUTRAL'];
-        const randomType = types[Math.floor(Math.random() * types.length)];
-        const confidence = 65 + Math.floor(Math.random() * 30); // 65-95%
-
-        let reasons = [];
-        if (randomType === 'BUY') reasons = ['RSI Oversold', 'MACD Crossover', 'Trend Support'];
-        if (randomType === 'SELL') reasons = ['RSI Overbought', 'Resistance Hit', 'Volume Drop'];
-        if (randomType === 'NEUTRAL') reasons = ['Choppy Market', 'Low Volume', 'Wait for breakout'];
+        if (!symbol) return undefined;
+        let cancelled = false;
+        const fetchIndicators = async () => {
+            try {
+                const res = await api.get(`/market/indicators?symbol=${symbol}&interval=5m&period=1d&set=${INDICATOR_SET}&tail=1`);
+                if (!cancelled) setLatest(res.data.latest);
+            } catch (err) {
+                console.error('Indicators unavailable', err);
+            }
+        };
+        fetchIndicators();
+        const timer = setInterval(fetchIndicators, 60000); // a new 5m bar at most every 5 minutes
+        return () => { cancelled = true; clearInterval(timer); };
+    }, [symbol]);
 
-        setSignal({
-            type: randomType,
-            confidence: confidence,
-            reasons: reasons,
-            stopLoss: price ? (randomType === 'BUY' ? price * 0.98 : price * 1.02).toFixed(2) : '---',
-            takeProfit: price ? (randomType === 'BUY' ? price * 1.05 : price * 0.95).toFixed(2) : '---'
-        });
-    }, [symbol, price]); // Recalculate on symbol change
+    const signal = latest ? readSignal(latest, price) : null;
 
     if (!signal) return null;
 
@@ -48,13 +82,15 @@ const AISignals = ({ symbol, price }) => {
                 <div className="text-xs text-slate-400">Confidence: {signal.confidence}%</div>
             </div>
 
-            {/* Hazard Detection Alert */}
+            {/* Volatility from ATR */}
             <div className="mb-4 bg-orange-500/10 border border-orange-500/30 p-3 rounded-lg animate-pulse">
                 <div className="flex items-center gap-2 text-orange-400 font-bold text-xs uppercase mb-1">
-                    <Zap className="w-3 h-3" /> Hazard Detection
+                    <Zap className="w-3 h-3" /> Volatility
                 </div>
                 <div className="text-xs text-orange-200">
-                    High volatility expected in {Math.floor(Math.random() * 10) + 5} mins. Tighten stops.
+                    {signal.volatilityPct !== null
+                        ? `ATR is ${signal.volatilityPct.toFixed(2)}% of price per 5m bar. Size stops accordingly.`
+                        : 'Not enough history to measure volatility yet.'}
                 </div>
             </div>
 
@@ -9,8 +9,9 @@ const NewsWidget = () => {
     useEffect(() => {
         const fetchNews = async () => {
             try {
-                const res = await api.get('/market/news');
-                setNews(res.data);
+                // Newest page only; older items are reachable via next_cursor
+                const res = await api.get('/market/news?limit=20');
+                setNews(res.data.items || []);
             } catch (e) {
                 console.error("News fetch error", e);
             } finally {
@@ -1,6 +1,6 @@
 import React, { useEffect, useState, useCallback } from 'react';
 import { useAuth } from '../context/AuthContext';
-import api from '../services/api';
+import api, { streamQuotes } from '../services/api';
 import { Link } from 'react-router-dom';
 import { TradingChart } from '../components/TradingChart';
 import OrderPanel from '../components/OrderPanel';
@@ -56,13 +56,10 @@ function Dashboard() {
     }
   }, []);
 
-  const fetchMarket = useCallback(async () => {
+  // Candles only: the quote comes from the stream below
+  const fetchCandles = useCallback(async () => {
     if (!symbol) return;
     try {
-      // Quote
-      const quoteRes = await api.get(`/market/quote?symbol=${symbol}`);
-      setMarketData(quoteRes.data);
-
       // Chart Series
       // Map timeframe to API params (yfinance)
       let interval = '1d';
@@ -72,17 +69,20 @@ function Dashboard() {
         interval = '1h'; // or 60m
         period = '1mo'; // Get 1 month of hourly data
       } else if (timeframe === '4H') {
-        interval = '1h'; // yfinance doesn't easily support 4h free, use 1h
-        period = '3mo';  // Get 3 months of hourly data
+        interval = '4h'; // Resampled server-side from hourly bars
+        period = '3mo';  // Get 3 months of 4h candles
       } else if (timeframe === '1D') {
         interval = '1d';
         period = '1y';
       }
 
       console.log(`Fetching chart: ${symbol} ${interval} ${period}`);
-      const seriesRes = await api.get(`/market/series?symbol=${symbol}&interval=${interval}&period=${period}`);
-      // Transform if needed? The backend already sends time/open/high/low/close
-      setChartData(seriesRes.data);
+      // Columnar payload (parallel arrays) is about half the size of per-bar objects
+      const seriesRes = await api.get(`/market/series?symbol=${symbol}&interval=${interval}&period=${period}&format=columns`);
+      const { time, open, high, low, close, volume } = seriesRes.data;
+      setChartData(time.map((t, i) => ({
+        time: t, open: open[i], high: high[i], low: low[i], close: close[i], volume: volume[i]
+      })));
 
       setLastUpdate(new Date());
     } catch (e) {
@@ -97,10 +97,20 @@ function Dashboard() {
 
   // Symbol Change Effect
   useEffect(() => {
-    fetchMarket();
-    const interval = setInterval(fetchMarket, 30000); // 30s Poll as per requirements
+    fetchCandles();
+    const interval = setInterval(fetchCandles, 30000); // Candles refresh on a 30s poll
     return () => clearInterval(interval);
-  }, [symbol, fetchMarket]);
+  }, [symbol, fetchCandles]);
+
+  // Live quote pushed by the server (last known one on connect, then every change)
+  useEffect(() => {
+    if (!symbol) return;
+    setMarketData(null); // don't show the previous symbol's price
+    return streamQuotes([symbol], (_, quote) => {
+      setMarketData(quote);
+      setLastUpdate(new Date());
+    });
+  }, [symbol]);
 
   // Challenge Status Poll
   useEffect(() => {
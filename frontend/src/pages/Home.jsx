@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from 'react'
 import { Link } from 'react-router-dom'
 import { motion } from 'framer-motion'
-import api from '../services/api'
+import api, { streamQuotes } from '../services/api'
 
 const Home = () => {
   const [prices, setPrices] = useState({})
@@ -9,21 +9,19 @@ const Home = () => {
 
   // Fetch live prices for ticker display
   useEffect(() => {
+    const symbols = ['BTC-USD', 'AAPL', 'TSLA', 'IAM', 'ATW']
+
     const fetchPrices = async () => {
       try {
-        const symbols = ['BTC-USD', 'AAPL', 'TSLA', 'IAM', 'ATW']
-        const priceData = {}
-        
-        for (const symbol of symbols) {
-          try {
-            const response = await api.get(`/market/quote?symbol=${symbol}`)
-            priceData[symbol] = response.data
-          } catch (error) {
-            console.log(`Failed to fetch ${symbol}`, error)
-          }
-        }
-        
-        setPrices(priceData)
+        // One round trip; the backend fetches Yahoo and BVC in parallel
+        const response = await api.get(`/market/quotes?symbols=${symbols.join(',')}`)
+        const { quotes, errors } = response.data
+
+        Object.keys(errors || {}).forEach((symbol) => {
+          console.log(`Failed to fetch ${symbol}`, errors[symbol])
+        })
+
+        setPrices(quotes || {})
       } catch (error) {
         console.error('Failed to fetch prices:', error)
       } finally {
@@ -32,9 +30,11 @@ const Home = () => {
     }
 
     fetchPrices()
-    // Refresh prices every 30 seconds
-    const interval = setInterval(fetchPrices, 30000)
-    return () => clearInterval(interval)
+    // Then keep them live from the server push stream
+    const close = streamQuotes(symbols, (symbol, quote) => {
+      setPrices((prev) => ({ ...prev, [symbol]: quote }))
+    })
+    return close
   }, [])
 
   const tickerItems = [
@@ -33,4 +33,19 @@ api.interceptors.response.use(
   }
 );
 
+// Live quotes over server-sent events. Calls onQuote(symbol, quote) for each
+// update and returns a function that closes the stream. The browser
+// reconnects on its own if the server drops or evicts the connection.
+export const streamQuotes = (symbols, onQuote) => {
+  const source = new EventSource(`/api/market/stream?symbols=${symbols.join(',')}`);
+  source.addEventListener('quote', (event) => {
+    const { symbol, quote } = JSON.parse(event.data);
+    onQuote(symbol, quote);
+  });
+  source.addEventListener('evicted', () => {
+    console.warn('Quote stream evicted, reconnecting');
+  });
+  return () => source.close();
+};
+
 export default api;
\ No newline at end of file